@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Time per-task setup of implementation agents with and without the compiled
+agent cache.
+
+Builds the agent, prompt and run config for a series of plan tasks the way
+`run_task_implementation_agent` does, once compiling a fresh agent for every
+task and once reusing the cached one. No LLM calls are made.
+
+Usage:
+    python benchmarks/agent_setup.py [--tasks N]
+"""
+
+import argparse
+import time
+
+from langchain_anthropic import ChatAnthropic
+
+from ra_aid import agent_utils
+from ra_aid.memory import memory_session
+
+
+def build_tasks(model, tasks: int, cached: bool) -> float:
+    """Build every task's agent and return the mean setup time in seconds."""
+    plan = "1. Add the handler\n2. Register the route\n3. Test it"
+    task_list = [f"Task {n}" for n in range(tasks)]
+    agent_utils.clear_agent_cache()
+    start = time.perf_counter()
+    for task in task_list:
+        if not cached:
+            agent_utils.clear_agent_cache()
+        agent_utils._build_task_implementation_agent(
+            "Add a health check endpoint", task_list, task, plan, [], model,
+            expert_enabled=True, config={}
+        )
+    return (time.perf_counter() - start) / tasks
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=50, help='Number of tasks to set up')
+    args = parser.parse_args()
+
+    model = ChatAnthropic(api_key="benchmark", model_name="claude-3-5-sonnet-20241022")
+    with memory_session():
+        # Warm imports and lazy initialization before timing
+        build_tasks(model, 1, cached=False)
+        uncached = build_tasks(model, args.tasks, cached=False)
+        cached = build_tasks(model, args.tasks, cached=True)
+
+    print(f"tasks:            {args.tasks}")
+    print(f"compile per task: {uncached * 1000:.2f} ms/task")
+    print(f"cached agent:     {cached * 1000:.2f} ms/task")
+    print(f"speedup:          {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Replay a long research session with and without history compaction.
+
+A scripted model replays a session of search, file read and shell command
+steps through a real compiled ReAct agent, with tool outputs of typical
+sizes. The benchmark reports the tokens sent to the model over the run and
+in the largest request, and the run time. Model latency is simulated as a
+fixed cost per call plus a cost per 1k input tokens, since prefill time
+grows with the prompt; no LLM calls are made.
+
+Usage:
+    python benchmarks/history_compaction.py [--steps N] [--ms-per-1k-tokens MS] [--call-ms MS]
+"""
+
+import argparse
+import time
+from typing import Any, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+
+from ra_aid import agent_utils
+from ra_aid.compaction import CompactionLimits, configure_compaction, message_tokens
+
+# Tool called at each step, cycling, and the size of its output in characters
+STEPS = [
+    ("ripgrep_search", {"pattern": "def handle_"}, 24000),
+    ("read_file_tool", {"filepath": "ra_aid/agent_utils.py"}, 12000),
+    ("run_shell_command", {"command": "pytest -q tests/ra_aid"}, 6000),
+]
+
+
+def output(name: str, size: int) -> str:
+    line = f"{name}: ra_aid/module.py:120:    result = process(item, options)  # matched line\n"
+    return (line * (size // len(line) + 1))[:size]
+
+
+@tool
+def ripgrep_search(pattern: str) -> str:
+    """Search the code base."""
+    return output("ripgrep_search", STEPS[0][2])
+
+
+@tool
+def read_file_tool(filepath: str) -> str:
+    """Read a file."""
+    return output("read_file_tool", STEPS[1][2])
+
+
+@tool
+def run_shell_command(command: str) -> str:
+    """Run a shell command."""
+    return output("run_shell_command", STEPS[2][2])
+
+
+class ReplayModel(BaseChatModel):
+    """Replays recorded tool calls, sleeping as long as the request would take to prefill"""
+
+    replies: List[Any]
+    call_seconds: float
+    seconds_per_1k_tokens: float
+    requests: List[int] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = sum(message_tokens(message) for message in messages)
+        self.requests.append(tokens)
+        time.sleep(self.call_seconds + self.seconds_per_1k_tokens * tokens / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self.replies.pop(0))])
+
+
+def replay(steps: int, call_seconds: float, seconds_per_1k_tokens: float):
+    """Replay the session once and return the request sizes and run time."""
+    replies = []
+    for n in range(steps):
+        name, args, _ = STEPS[n % len(STEPS)]
+        replies.append(AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call-{n}"}]))
+    replies.append(AIMessage(content="Research complete."))
+    model = ReplayModel(replies=replies, call_seconds=call_seconds,
+                        seconds_per_1k_tokens=seconds_per_1k_tokens, requests=[])
+    agent_utils.clear_agent_cache()
+    agent = agent_utils.get_agent(model, [ripgrep_search, read_file_tool, run_shell_command], MemorySaver())
+    config = {"configurable": {"thread_id": "replay"}, "recursion_limit": 4 * steps + 10}
+
+    start = time.perf_counter()
+    agent.invoke({"messages": [HumanMessage(content="Find where requests are handled.")]}, config)
+    return model.requests, time.perf_counter() - start
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, default=30, help='Tool steps in the replayed session')
+    parser.add_argument('--ms-per-1k-tokens', type=float, default=10.0,
+                        help='Simulated model time per 1k input tokens')
+    parser.add_argument('--call-ms', type=float, default=50.0, help='Simulated fixed model time per call')
+    args = parser.parse_args()
+
+    results = {}
+    for label, limits in (("full history", None), ("compacted", CompactionLimits())):
+        configure_compaction(limits)
+        results[label] = replay(args.steps, args.call_ms / 1000, args.ms_per_1k_tokens / 1000)
+    configure_compaction(CompactionLimits())
+
+    print(f"steps: {args.steps}")
+    for label, (requests, seconds) in results.items():
+        print(f"{label + ':':14} {sum(requests):>9,} input tokens  {max(requests):>7,} largest request  {seconds:6.2f} s")
+    full, compacted = results["full history"], results["compacted"]
+    print(f"saved:         {1 - sum(compacted[0]) / sum(full[0]):.0%} of input tokens, "
+          f"{1 - compacted[1] / full[1]:.0%} of run time")
+
+
+if __name__ == "__main__":
+    main()
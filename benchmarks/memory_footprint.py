@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare the memory retained by stored key snippets and work log entries as
+plain dicts against the slotted record types.
+
+Snippets are decoded from a JSON tool-call payload, as the agent delivers
+them, so every snippet starts with its own copy of its file path.
+
+Usage:
+    python benchmarks/memory_footprint.py [--snippets N] [--files N]
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from ra_aid.memory.records import SnippetRecord, WorkLogRecord
+
+
+def make_payload(count: int, files: int) -> str:
+    """Build a JSON payload of snippets spread over a number of files."""
+    rng = random.Random(0)
+    snippets = []
+    for index in range(count):
+        filepath = f"src/package/module_{index % files}.py"
+        line_number = rng.randint(1, 2000)
+        snippets.append({
+            'filepath': filepath,
+            'line_number': line_number,
+            'snippet': f"def function_{index}(value):\n    return value * {index}",
+            'description': None,
+            'source': f"{filepath}:{line_number}",
+            'relevance': 0.5,
+        })
+    return json.dumps(snippets)
+
+
+def retained_bytes(build) -> int:
+    """Measure the memory still allocated after `build()` returns its result."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def store_snippets_as_dicts(payload: str):
+    return {snippet_id: snippet for snippet_id, snippet in enumerate(json.loads(payload))}
+
+
+def store_snippets_as_records(payload: str):
+    return {snippet_id: SnippetRecord.from_mapping(snippet) for snippet_id, snippet in enumerate(json.loads(payload))}
+
+
+def store_work_log_as_dicts(count: int):
+    now = time.time()
+    return [{'timestamp': datetime.fromtimestamp(now + index).isoformat(), 'event': f"Task #{index} added"}
+            for index in range(count)]
+
+
+def store_work_log_as_records(count: int):
+    now = time.time()
+    return [WorkLogRecord(now + index, f"Task #{index} added") for index in range(count)]
+
+
+def report(label: str, baseline: int, compact: int, count: int) -> None:
+    saved = baseline - compact
+    print(f"{label}:")
+    print(f"  dicts:   {baseline / 1024:9.1f} KiB ({baseline / count:6.1f} B/item)")
+    print(f"  records: {compact / 1024:9.1f} KiB ({compact / count:6.1f} B/item)")
+    print(f"  saved:   {saved / 1024:9.1f} KiB ({100 * saved / baseline:.0f}%)")
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snippets', type=int, default=10000, help='Number of snippets to store')
+    parser.add_argument('--files', type=int, default=200, help='Number of distinct files the snippets come from')
+    args = parser.parse_args()
+
+    payload = make_payload(args.snippets, args.files)
+    report(
+        f"{args.snippets} key snippets over {args.files} files",
+        retained_bytes(lambda: store_snippets_as_dicts(payload)),
+        retained_bytes(lambda: store_snippets_as_records(payload)),
+        args.snippets,
+    )
+    report(
+        f"{args.snippets} work log entries",
+        retained_bytes(lambda: store_work_log_as_dicts(args.snippets)),
+        retained_bytes(lambda: store_work_log_as_records(args.snippets)),
+        args.snippets,
+    )
+
+
+if __name__ == "__main__":
+    main()
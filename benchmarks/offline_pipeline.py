@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Time the orchestration around the model in offline research, planning and
+implementation runs.
+
+For each sample repo in benchmarks/sample_repos, a recorded transcript from
+benchmarks/transcripts is replayed through run_research_agent,
+run_planning_agent and the implementation agents that planning starts with
+request_task_implementation. Every model call is answered instantly by a
+ScriptedChatModel, while agents, tools and memory run for real against a
+copy of the repo, so the run time is all orchestration overhead. It is
+split into:
+
+    graph setup       creating compiled agents, or getting them from the cache
+    prompt rendering  building prompts and run configs
+    memory            rendering memory into prompts, and memory tools
+    tools             file and directory tools
+    console           rendering agent output and stage and task headers
+    graph execution   the rest: LangGraph steps, tool dispatch, checkpoints,
+                      history compaction and the scripted model calls
+
+Time in nested instrumented calls counts towards the innermost one only.
+Console output is rendered to an in-memory buffer. No network is used.
+
+With --record PROVIDER/MODEL, each sample repo's task is run with that live
+model instead, and the responses it gives are written as the repo's
+transcript. This needs the provider's API key and network access.
+
+Usage:
+    python benchmarks/offline_pipeline.py [--runs N] [--repo NAME] [--record PROVIDER/MODEL]
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from ra_aid import agent_utils
+from ra_aid.llm import clear_llm_clients, get_llm, register_llm_client
+from ra_aid.memory import memory_session
+from ra_aid.tools import agent as agent_tools
+from ra_aid.tools import (
+    delete_key_facts, emit_key_facts, emit_key_snippets, emit_plan, emit_related_files,
+    emit_research_notes, emit_task, fuzzy_find_project_files, list_directory_tree,
+    plan_implementation_completed, read_file_tool, task_completed,
+)
+from ra_aid.tools.memory import _global_memory
+from ra_aid.transcript import RecordingChatModel, ScriptedChatModel, load_transcript, save_transcript
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+# Task run against each sample repo
+TASKS = {
+    "todo_api": "Add a GET /health endpoint returning {\"status\": \"ok\"} and document it.",
+    "csv_report": "Add a --format option to the CLI that prints the summary as a text table or as JSON.",
+}
+
+PROVIDER, MODEL = "anthropic", "claude-3-5-sonnet-20241022"
+
+PHASES = ("graph setup", "prompt rendering", "memory", "tools", "console", "graph execution")
+
+MEMORY_TOOLS = [delete_key_facts, emit_key_facts, emit_key_snippets, emit_plan, emit_related_files,
+                emit_research_notes, emit_task, plan_implementation_completed, task_completed]
+FILE_TOOLS = [fuzzy_find_project_files, list_directory_tree, read_file_tool]
+
+
+class PhaseTimer:
+    """Totals the time spent in instrumented functions by phase."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def wrap(self, phase, func):
+        """Time calls of a function towards a phase, less their nested instrumented calls."""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with self._lock:
+                    self.totals[phase] += elapsed - nested
+        return timed
+
+
+@contextlib.contextmanager
+def instrumented(timer):
+    """Route the orchestration steps of agent runs through the timer."""
+    targets = [
+        (agent_utils, "get_agent", "graph setup"),
+        (agent_utils, "_build_research_agent", "prompt rendering"),
+        (agent_utils, "_build_planning_agent", "prompt rendering"),
+        (agent_utils, "_build_task_implementation_agent", "prompt rendering"),
+        (agent_utils, "_memory_section", "memory"),
+        (agent_utils, "print_agent_output", "console"),
+        (agent_utils, "print_stage_header", "console"),
+        (agent_tools, "print_task_header", "console"),
+    ]
+    targets += [(tool, "func", "memory") for tool in MEMORY_TOOLS]
+    targets += [(tool, "func", "tools") for tool in FILE_TOOLS]
+    originals = [(owner, name, getattr(owner, name)) for owner, name, _ in targets]
+    try:
+        for owner, name, phase in targets:
+            setattr(owner, name, timer.wrap(phase, getattr(owner, name)))
+        yield timer
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+@contextlib.contextmanager
+def sample_repo(name):
+    """Work in a fresh git checkout of a sample repo."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = os.path.join(tmp, name)
+        shutil.copytree(os.path.join(BENCHMARKS, "sample_repos", name), repo)
+        subprocess.run(["git", "init", "-q", repo], check=True)
+        os.chdir(repo)
+        try:
+            yield repo
+        finally:
+            os.chdir(cwd)
+
+
+def run_pipeline(task, model, provider=PROVIDER, model_name=MODEL):
+    """Run research, then planning and implementation, as the CLI does; return the run time."""
+    agent_utils.clear_agent_cache()
+    register_llm_client(provider, model_name, model)
+    config = {
+        "configurable": {"thread_id": "offline-pipeline"},
+        "recursion_limit": 100,
+        "research_only": False,
+        "cowboy_mode": True,
+        "web_research_enabled": False,
+        "max_parallel_tasks": 1,
+        "provider": provider,
+        "model": model_name,
+    }
+    with memory_session():
+        _global_memory['config'] = config
+        start = time.perf_counter()
+        agent_utils.run_research_agent(task, model, config=config)
+        agent_utils.run_planning_agent(task, model, config=config)
+        return time.perf_counter() - start
+
+
+def replay(name, runs):
+    """Replay a sample repo's transcript and return the mean run time and phase times."""
+    path = os.path.join(BENCHMARKS, "transcripts", f"{name}.json")
+    timer = PhaseTimer()
+    total = 0.0
+    with sample_repo(name), instrumented(timer):
+        # Warm imports and lazy initialization before timing
+        for run in range(runs + 1):
+            if run == 1:
+                timer.totals.clear()
+                total = 0.0
+            model = ScriptedChatModel(replies=load_transcript(path))
+            with contextlib.redirect_stdout(io.StringIO()):
+                total += run_pipeline(TASKS[name], model)
+            if model.remaining:
+                raise RuntimeError(f"{name}: {model.remaining} transcript responses were not used")
+    clear_llm_clients()
+    return total / runs, {phase: seconds / runs for phase, seconds in timer.totals.items()}, len(load_transcript(path))
+
+
+def record(name, provider, model_name):
+    """Run a sample repo's task with a live model and save its responses as the repo's transcript."""
+    live = get_llm(provider, model_name)
+    model = RecordingChatModel(model=live, wrapped_llm_type=live._llm_type)
+    with sample_repo(name):
+        run_pipeline(TASKS[name], model, provider, model_name)
+    clear_llm_clients()
+    path = os.path.join(BENCHMARKS, "transcripts", f"{name}.json")
+    save_transcript(path, model.responses)
+    print(f"{name}: recorded {len(model.responses)} responses to {path}")
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs per sample repo')
+    parser.add_argument('--repo', choices=sorted(TASKS), action='append', help='Sample repo to run (default: all)')
+    parser.add_argument('--record', metavar='PROVIDER/MODEL',
+                        help='Record new transcripts with a live model instead of replaying')
+    args = parser.parse_args()
+
+    repos = args.repo or sorted(TASKS)
+    if args.record:
+        provider, model_name = args.record.split('/', 1)
+        for name in repos:
+            record(name, provider, model_name)
+        return
+
+    for name in repos:
+        seconds, phases, calls = replay(name, args.runs)
+        measured = sum(phases.values())
+        phases["graph execution"] = seconds - measured
+        print(f"{name}: {calls} model calls, {seconds * 1000:.1f} ms/run, "
+              f"{seconds * 1000 / calls:.2f} ms/model call")
+        for phase in PHASES:
+            share = phases.get(phase, 0.0)
+            print(f"  {phase + ':':18} {share * 1000:8.1f} ms  {share / seconds:5.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Summaries of sales CSV files."""
@@ -0,0 +1,16 @@
+"""Command line entry point."""
+
+import argparse
+
+from csv_report.report import format_text, read_sales, summarise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a sales CSV file by region.")
+    parser.add_argument("path", help="CSV file with region and amount columns")
+    args = parser.parse_args(argv)
+    print(format_text(summarise(read_sales(args.path))))
+
+
+if __name__ == "__main__":
+    main()
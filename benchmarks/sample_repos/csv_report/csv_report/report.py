@@ -0,0 +1,29 @@
+"""Summarise sales rows by region."""
+
+import csv
+from collections import defaultdict
+
+
+def read_sales(path):
+    """Read (region, amount) pairs from a CSV file with region and amount columns."""
+    with open(path, newline="") as f:
+        return [(row["region"], float(row["amount"])) for row in csv.DictReader(f)]
+
+
+def summarise(sales):
+    """Count, total and mean amount of the sales of each region."""
+    amounts = defaultdict(list)
+    for region, amount in sales:
+        amounts[region].append(amount)
+    return {
+        region: {"count": len(values), "total": sum(values), "mean": sum(values) / len(values)}
+        for region, values in sorted(amounts.items())
+    }
+
+
+def format_text(summary):
+    """Render a summary as an aligned text table."""
+    lines = [f"{'region':<12}{'count':>8}{'total':>12}{'mean':>10}"]
+    for region, stats in summary.items():
+        lines.append(f"{region:<12}{stats['count']:>8}{stats['total']:>12.2f}{stats['mean']:>10.2f}")
+    return "\n".join(lines)
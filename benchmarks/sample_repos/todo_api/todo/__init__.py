@@ -0,0 +1 @@
+"""In-memory to-do list service."""
@@ -0,0 +1,53 @@
+"""WSGI application routing requests to the to-do store."""
+
+import json
+from wsgiref.simple_server import make_server
+
+from todo.storage import TodoStore
+
+store = TodoStore()
+
+
+def respond(start_response, status, body):
+    payload = json.dumps(body).encode("utf-8")
+    start_response(status, [("Content-Type", "application/json"), ("Content-Length", str(len(payload)))])
+    return [payload]
+
+
+def list_todos(environ, start_response):
+    return respond(start_response, "200 OK", store.list())
+
+
+def add_todo(environ, start_response):
+    length = int(environ.get("CONTENT_LENGTH") or 0)
+    data = json.loads(environ["wsgi.input"].read(length) or b"{}")
+    if not data.get("title"):
+        return respond(start_response, "400 Bad Request", {"error": "title is required"})
+    return respond(start_response, "201 Created", store.add(data["title"]))
+
+
+def remove_todo(environ, start_response, item_id):
+    if not store.remove(item_id):
+        return respond(start_response, "404 Not Found", {"error": "no such item"})
+    return respond(start_response, "204 No Content", {})
+
+
+ROUTES = {
+    ("GET", "/todos"): list_todos,
+    ("POST", "/todos"): add_todo,
+}
+
+
+def application(environ, start_response):
+    method, path = environ["REQUEST_METHOD"], environ.get("PATH_INFO", "/")
+    handler = ROUTES.get((method, path))
+    if handler is not None:
+        return handler(environ, start_response)
+    if method == "DELETE" and path.startswith("/todos/"):
+        return remove_todo(environ, start_response, int(path.rsplit("/", 1)[1]))
+    return respond(start_response, "404 Not Found", {"error": "not found"})
+
+
+if __name__ == "__main__":
+    with make_server("", 8000, application) as server:
+        server.serve_forever()
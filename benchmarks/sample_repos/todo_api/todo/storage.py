@@ -0,0 +1,27 @@
+"""Thread-safe in-memory storage of to-do items."""
+
+import itertools
+import threading
+
+
+class TodoStore:
+    """Stores to-do items by ID."""
+
+    def __init__(self):
+        self._items = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def list(self):
+        with self._lock:
+            return [{"id": item_id, "title": title} for item_id, title in sorted(self._items.items())]
+
+    def add(self, title):
+        with self._lock:
+            item_id = next(self._ids)
+            self._items[item_id] = title
+            return {"id": item_id, "title": title}
+
+    def remove(self, item_id):
+        with self._lock:
+            return self._items.pop(item_id, None) is not None
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Time saving and loading a memory session snapshot.
+
+Builds a session with key facts, snippets, work log entries and agent
+checkpoints holding long message histories, then saves it to a snapshot file
+and loads it back into a fresh session.
+
+Usage:
+    python benchmarks/session_snapshot.py [--threads N] [--messages N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from ra_aid.memory import memory_session
+from ra_aid.memory.records import SnippetRecord, WorkLogRecord
+from ra_aid.tools.memory import load_session, save_session
+
+
+def prose(rng: random.Random, words: int) -> str:
+    """Generate text that compresses about as well as real agent output."""
+    return " ".join(f"{rng.choice(VOCABULARY)}_{rng.randrange(1000)}" for _ in range(words))
+
+
+VOCABULARY = ["module", "handler", "request", "parse", "config", "cache", "route", "model", "query", "token"]
+
+
+def fill_session(session, threads: int, messages: int) -> None:
+    """Fill a session with memory and checkpointed agent threads."""
+    rng = random.Random(0)
+    memory = session.memory
+    for n in range(2000):
+        memory['key_facts'][n] = f"Fact {n}: module_{n % 50} handles request type {n} via handler_{n}."
+        memory['key_snippets'][n] = SnippetRecord(
+            f"src/module_{n % 50}.py", n + 1, f"def handler_{n}(request):\n    return respond(request, {n})\n")
+    memory['work_log'] = [WorkLogRecord(time.time() + n, f"Task #{n} added") for n in range(40)]
+
+    checkpointer = session.checkpointer
+    for thread in range(threads):
+        config = {"configurable": {"thread_id": f"thread-{thread}", "checkpoint_ns": ""}}
+        history = []
+        for n in range(messages):
+            history.append(HumanMessage(content=prose(rng, 40)))
+            history.append(AIMessage(content=prose(rng, 120)))
+        checkpoint = {
+            "v": 1,
+            "id": f"1ef0000{thread:04d}",
+            "ts": "2024-01-01T00:00:00+00:00",
+            "channel_values": {"messages": history},
+            "channel_versions": {"messages": 1},
+            "versions_seen": {},
+            "pending_sends": [],
+        }
+        checkpointer.put(config, checkpoint, {"source": "loop", "step": messages}, {"messages": 1})
+
+
+def main():
+    """Main entry point for the script."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=40, help='Number of checkpointed agent threads')
+    parser.add_argument('--messages', type=int, default=200, help='Message pairs per thread')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.bin")
+        with memory_session() as session:
+            fill_session(session, args.threads, args.messages)
+            start = time.perf_counter()
+            size = save_session(path)
+            saved = time.perf_counter() - start
+
+        with memory_session():
+            start = time.perf_counter()
+            load_session(path)
+            loaded = time.perf_counter() - start
+
+    print(f"snapshot: {size / 1024 / 1024:.2f} MiB on disk")
+    print(f"save:     {saved * 1000:.0f} ms")
+    print(f"load:     {loaded * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
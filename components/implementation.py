@@ -1,7 +1,8 @@
 import streamlit as st
 from ra_aid.agent_utils import run_task_implementation_agent
-from ra_aid.llm import initialize_llm
+from ra_aid.llm import get_llm
 from ra_aid.logger import logger
+from ra_aid.task_scheduler import SKIPPED, SUCCEEDED, TaskGraph, TaskOutcome, run_task_graph
 from components.memory import _global_memory
 from typing import Dict, Any
 
@@ -22,7 +23,7 @@ def implementation_component(task: str, research_results: Dict[str, Any], planni
             raise ValueError("No tasks found in planning results")
 
         # Initialize model
-        model = initialize_llm(config["provider"], config["model"])
+        model = get_llm(config["provider"], config["model"])
         
         # Update global memory configuration
         _global_memory['config'] = config.copy()
@@ -36,15 +37,11 @@ def implementation_component(task: str, research_results: Dict[str, Any], planni
         progress_bar = st.progress(0)
         task_count = len(tasks)
         
-        # Implement each task
-        for idx, task_spec in enumerate(tasks):
-            st.markdown(f"**Implementing task {idx + 1}/{task_count}:**")
-            st.markdown(f"_{task_spec}_")
-            
+        def implement(idx: int) -> Dict[str, Any]:
             task_result = run_task_implementation_agent(
                 base_task=task,
                 tasks=tasks,
-                task=task_spec,
+                task=tasks[idx],
                 plan=planning_results.get("plan", ""),
                 related_files=research_results.get("related_files", []),
                 model=model,
@@ -54,21 +51,32 @@ def implementation_component(task: str, research_results: Dict[str, Any], planni
             
             # Validate task result
             if not isinstance(task_result, dict):
-                raise ValueError(f"Invalid task result format for task: {task_spec}")
-            
-            results["implemented_tasks"].append(task_result)
-            
-            # Update progress
-            progress_bar.progress((idx + 1) / task_count)
-            
-            if task_result.get("success"):
+                raise ValueError(f"Invalid task result format for task: {tasks[idx]}")
+            if not task_result.get("success"):
+                raise RuntimeError(task_result.get("error", "Unknown error"))
+            return task_result
+        
+        def report(outcome: TaskOutcome) -> None:
+            # Runs on the script thread, which is the only one allowed to update the page
+            task_spec = tasks[outcome.task_id]
+            if outcome.status == SKIPPED:
+                st.warning(f"Task skipped: {task_spec}")
+                return
+            results["implemented_tasks"].append(outcome.result or {"success": False, "error": outcome.error})
+            progress_bar.progress(len(results["implemented_tasks"]) / task_count)
+            if outcome.status == SUCCEEDED:
                 st.success(f"Task completed: {task_spec}")
             else:
                 st.error(f"Task failed: {task_spec}")
-                st.error(task_result.get("error", "Unknown error"))
+                st.error(outcome.error)
                 results["success"] = False
-                results["error"] = task_result.get("error", "Unknown error")
-                break  # Stop processing tasks after the first failure
+                results["error"] = outcome.error
+        
+        # Planning results list tasks without dependencies or files, so each
+        # task runs alone in plan order, stopping after the first failure
+        for idx, task_spec in enumerate(tasks):
+            st.markdown(f"**Task {idx + 1}/{task_count}:** _{task_spec}_")
+        run_task_graph(TaskGraph(list(range(task_count))), implement, max_workers=1, on_complete=report)
         
         return results
 
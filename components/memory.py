@@ -1,5 +1,7 @@
-# Global memory store
-_global_memory = {}
+from ra_aid.memory.session import SessionDict, current_session
+
+# Component state, resolved to the memory session of the current context
+_global_memory = SessionDict('component_memory')
 
 def initialize_memory():
     """Initialize global memory with default values."""
@@ -15,4 +17,4 @@ def initialize_memory():
     
 def get_memory():
     """Retrieve the current state of global memory."""
-    return _global_memory
+    return current_session().component_memory
@@ -1,6 +1,6 @@
 import streamlit as st
 from ra_aid.agent_utils import run_research_agent
-from ra_aid.llm import initialize_llm
+from ra_aid.llm import get_llm
 from components.memory import _global_memory
 from ra_aid.logger import logger
 from typing import Dict, Any
@@ -15,7 +15,7 @@ def research_component(task: str, config: Dict[str, Any]) -> Dict[str, Any]:
                 raise ValueError(f"Missing required configuration field: {field}")
 
         # Initialize model
-        model = initialize_llm(config["provider"], config["model"])
+        model = get_llm(config["provider"], config["model"])
         
         # Update global memory configuration
         _global_memory['config'] = config.copy()
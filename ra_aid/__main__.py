@@ -3,16 +3,18 @@ import sys
 import uuid
 from rich.panel import Panel
 from rich.console import Console
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
 from ra_aid.env import validate_environment
-from ra_aid.tools.memory import _global_memory
+from ra_aid.tools.memory import _global_memory, set_memory_backend, set_work_log_archive
+from ra_aid.memory import SQLiteCheckpointer, SQLiteMemoryBackend, current_session
 from ra_aid.tools.human import ask_human
 from ra_aid import print_stage_header, print_error
 from ra_aid.tools.human import ask_human
 from ra_aid.__version__ import __version__
 from ra_aid.agent_utils import (
     AgentInterrupt,
+    get_agent,
+    resume_run,
+    stage_thread_id,
     run_agent_with_retry,
     run_research_agent,
     run_planning_agent
@@ -21,7 +23,10 @@ from ra_aid.prompts import (
     CHAT_PROMPT,
     WEB_RESEARCH_PROMPT_SECTION_CHAT
 )
-from ra_aid.llm import initialize_llm
+from ra_aid.llm import get_llm
+from ra_aid.compaction import CompactionLimits, configure_compaction
+from ra_aid.prompt_cache import log_cache_usage
+from ra_aid.response_cache import CACHE_MODES, configure_response_cache, get_response_cache
 from ra_aid.logging_config import setup_logging, get_logger
 from ra_aid.tool_configs import (
     get_chat_tools
@@ -29,6 +34,15 @@ from ra_aid.tool_configs import (
 
 logger = get_logger(__name__)
 
+PROVIDERS = ['anthropic', 'openai', 'openrouter', 'openai-compatible']
+
+def positive_int(value: str) -> int:
+    """Argparse type for integers of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def parse_arguments():
     parser = argparse.ArgumentParser(
         description='RA.Aid - AI Agent for executing programming and research tasks',
@@ -59,7 +73,7 @@ Examples:
         '--provider',
         type=str,
         default='anthropic',
-        choices=['anthropic', 'openai', 'openrouter', 'openai-compatible'],
+        choices=PROVIDERS,
         help='The LLM provider to use'
     )
     parser.add_argument(
@@ -76,7 +90,7 @@ Examples:
         '--expert-provider',
         type=str,
         default='openai',
-        choices=['anthropic', 'openai', 'openrouter', 'openai-compatible'],
+        choices=PROVIDERS,
         help='The LLM provider to use for expert knowledge queries (default: openai)'
     )
     parser.add_argument(
@@ -94,6 +108,54 @@ Examples:
         action='store_true',
         help='Enable chat mode with direct human interaction (implies --hil)'
     )
+    parser.add_argument(
+        '--fallback',
+        action='append',
+        default=[],
+        metavar='PROVIDER:MODEL',
+        help='Provider and model to fail over to while the main provider is down; repeat for more (tried in order)'
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='Also send LLM calls that run past their p95 latency to the next fallback and use the first response'
+    )
+    parser.add_argument(
+        '--memory-db',
+        type=str,
+        help='Persist agent memory to an SQLite database at this path so a session survives restarts'
+    )
+    parser.add_argument(
+        '--resume',
+        type=str,
+        metavar='RUN_ID',
+        help='Continue an interrupted run from its last completed step, given the run ID printed at start (use "latest" for the most recent run); requires --memory-db'
+    )
+    parser.add_argument(
+        '--compact-after',
+        type=int,
+        default=CompactionLimits.max_tokens,
+        metavar='TOKENS',
+        help=f'Elide old tool outputs from an agent\'s history once it exceeds this many tokens; 0 disables (default: {CompactionLimits.max_tokens})'
+    )
+    parser.add_argument(
+        '--llm-cache',
+        type=str,
+        metavar='PATH',
+        help='Cache LLM responses in an SQLite database at this path, keyed by model, tools and messages'
+    )
+    parser.add_argument(
+        '--llm-cache-mode',
+        choices=CACHE_MODES,
+        default='read-through',
+        help='read-through: answer from the cache, calling the model on a miss; record: always call and store; replay: answer only from the cache (default: read-through)'
+    )
+    parser.add_argument(
+        '--max-parallel-tasks',
+        type=positive_int,
+        default=4,
+        help='Maximum number of independent plan tasks to implement at once (default: 4)'
+    )
     parser.add_argument(
         '--verbose',
         action='store_true',
@@ -113,6 +175,23 @@ Examples:
     elif not args.model:
         parser.error(f"--model is required when using provider '{args.provider}'")
     
+    # Parse fallback providers
+    fallbacks = []
+    for fallback in args.fallback:
+        provider, _, model = fallback.partition(':')
+        if provider not in PROVIDERS or not model:
+            parser.error(f"--fallback must be PROVIDER:MODEL with PROVIDER one of {', '.join(PROVIDERS)}, got '{fallback}'")
+        fallbacks.append((provider, model))
+    args.fallback = fallbacks
+    if args.hedge and not fallbacks:
+        parser.error("--hedge requires at least one --fallback")
+
+    if args.llm_cache_mode != 'read-through' and not args.llm_cache:
+        parser.error("--llm-cache-mode requires --llm-cache")
+
+    if args.resume and not args.memory_db:
+        parser.error("--resume requires --memory-db")
+
     # Validate expert model requirement
     if args.expert_provider != 'openai' and not args.expert_model:
         parser.error(f"--expert-model is required when using expert provider '{args.expert_provider}'")
@@ -122,11 +201,6 @@ Examples:
 # Create console instance
 console = Console()
 
-# Create individual memory objects for each agent
-research_memory = MemorySaver()
-planning_memory = MemorySaver()
-implementation_memory = MemorySaver()
-
 
 def is_informational_query() -> bool:
     """Determine if the current query is informational based on implementation_requested state."""
@@ -138,6 +212,31 @@ def is_stage_requested(stage: str) -> bool:
         return _global_memory.get('implementation_requested', False)
     return False
 
+def build_config(args, web_research_enabled: bool, run_id: str) -> dict:
+    """Build the run config of a research and planning run and store it in global memory."""
+    config = {
+        "configurable": {"thread_id": run_id},
+        "recursion_limit": 100,
+        "research_only": args.research_only,
+        "cowboy_mode": args.cowboy_mode,
+        "web_research_enabled": web_research_enabled,
+        "max_parallel_tasks": args.max_parallel_tasks
+    }
+
+    # Store config in global memory for access by is_informational_query
+    _global_memory['config'] = config
+
+    # Store model configuration
+    _global_memory['config']['provider'] = args.provider
+    _global_memory['config']['model'] = args.model
+    _global_memory['config']['fallbacks'] = args.fallback
+    _global_memory['config']['hedge'] = args.hedge
+
+    # Store expert provider and model in config
+    _global_memory['config']['expert_provider'] = args.expert_provider
+    _global_memory['config']['expert_model'] = args.expert_model
+    return config
+
 def main():
     """Main entry point for the ra-aid command line tool."""
     args = parse_arguments()
@@ -166,8 +265,37 @@ def main():
                 style="yellow"
             ))
         
+        # Restore and persist agent memory if a database was given
+        if args.memory_db:
+            set_memory_backend(SQLiteMemoryBackend(args.memory_db))
+            set_work_log_archive(f"{args.memory_db}.work_log.jsonl")
+            current_session().checkpointer = SQLiteCheckpointer(args.memory_db)
+            logger.debug("Using memory database at %s", args.memory_db)
+
+        if args.llm_cache:
+            configure_response_cache(args.llm_cache, args.llm_cache_mode)
+        configure_compaction(CompactionLimits(max_tokens=args.compact_after) if args.compact_after > 0 else None)
+
         # Create the base model after validation
-        model = initialize_llm(args.provider, args.model)
+        model = get_llm(args.provider, args.model, fallbacks=args.fallback, hedge=args.hedge)
+
+        # Continue an interrupted run and exit
+        if args.resume:
+            run_id = args.resume
+            if run_id == 'latest':
+                run_id = current_session().checkpointer.latest_run_id()
+                if run_id is None:
+                    print_error(f"No agent runs recorded in {args.memory_db}")
+                    sys.exit(1)
+            config = build_config(args, web_research_enabled, run_id)
+            print_stage_header("Resuming Agent")
+            try:
+                if resume_run(run_id, model, config=config) is None:
+                    console.print(f"Run {run_id} had already completed.")
+            except ValueError as e:
+                print_error(str(e))
+                sys.exit(1)
+            return
 
         # Handle chat mode
         if args.chat:
@@ -177,10 +305,10 @@ def main():
             initial_request = ask_human.invoke({"question": "What would you like help with?"})
 
             # Create chat agent with appropriate tools
-            chat_agent = create_react_agent(
+            chat_agent = get_agent(
                 model,
                 get_chat_tools(expert_enabled=expert_enabled, web_research_enabled=web_research_enabled),
-                checkpointer=MemorySaver()
+                current_session().checkpointer
             )
             
             # Run chat agent with CHAT_PROMPT
@@ -198,6 +326,8 @@ def main():
             _global_memory['config'] = config
             _global_memory['config']['provider'] = args.provider
             _global_memory['config']['model'] = args.model
+            _global_memory['config']['fallbacks'] = args.fallback
+            _global_memory['config']['hedge'] = args.hedge
             _global_memory['config']['expert_provider'] = args.expert_provider
             _global_memory['config']['expert_model'] = args.expert_model
             
@@ -214,25 +344,12 @@ def main():
             sys.exit(1)
             
         base_task = args.message
-        config = {
-            "configurable": {"thread_id": uuid.uuid4()},
-            "recursion_limit": 100,
-            "research_only": args.research_only,
-            "cowboy_mode": args.cowboy_mode,
-            "web_research_enabled": web_research_enabled
-        }
-    
-        # Store config in global memory for access by is_informational_query
-        _global_memory['config'] = config
-        
-        # Store model configuration
-        _global_memory['config']['provider'] = args.provider
-        _global_memory['config']['model'] = args.model
-        
-        # Store expert provider and model in config
-        _global_memory['config']['expert_provider'] = args.expert_provider
-        _global_memory['config']['expert_model'] = args.expert_model
-        
+        run_id = str(uuid.uuid4())
+        config = build_config(args, web_research_enabled, run_id)
+        if args.memory_db:
+            current_session().checkpointer.record_run(run_id)
+            console.print(f"[dim]Run {run_id}; continue it after an interruption with --resume {run_id}[/dim]")
+
         # Run research stage
         print_stage_header("Research Stage")
         
@@ -242,8 +359,8 @@ def main():
             expert_enabled=expert_enabled,
             research_only=args.research_only,
             hil=args.hil,
-            memory=research_memory,
-            config=config
+            config=config,
+            thread_id=stage_thread_id(run_id, 'research')
         )
         
         # Proceed with planning and implementation if not an informational query
@@ -254,8 +371,8 @@ def main():
                 model,
                 expert_enabled=expert_enabled,
                 hil=args.hil,
-                memory=planning_memory,
-                config=config
+                config=config,
+                thread_id=stage_thread_id(run_id, 'planning')
             )
 
     except (KeyboardInterrupt, AgentInterrupt):
@@ -263,6 +380,11 @@ def main():
         print(" 👋 Bye!")
         print()
         sys.exit(0)
+    finally:
+        log_cache_usage()
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            logger.info("LLM response cache: %d hits, %d misses", response_cache.hits, response_cache.misses)
 
 if __name__ == "__main__":
     main()
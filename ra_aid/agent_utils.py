@@ -1,20 +1,28 @@
 """Utility functions for working with agents."""
 
+import asyncio
+import contextvars
+import json
 import sys
 import time
 import uuid
-from typing import Optional, Any
+from typing import Optional, Any, Tuple
 
 import signal
 import threading
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Optional
 
 from langgraph.prebuilt import create_react_agent
 from ra_aid.console.formatting import print_stage_header, print_error
 from ra_aid.console.output import print_agent_output
 from ra_aid.logging_config import get_logger
-from ra_aid.exceptions import AgentInterrupt
+from ra_aid.exceptions import AgentInterrupt, CircuitOpenError
+from ra_aid.compaction import compact_history
+from ra_aid.prompt_cache import cache_breakpoint_prompt, supports_prompt_caching
+from ra_aid.rate_limit import retry_delay
 from ra_aid.tool_configs import (
     get_implementation_tools,
     get_research_tools,
@@ -38,10 +46,11 @@ from ra_aid.prompts import (
     HUMAN_PROMPT_SECTION_PLANNING,
     WEB_RESEARCH_PROMPT,
 )
-from langgraph.checkpoint.memory import MemorySaver
+from ra_aid.memory import current_session
 
 from langchain_core.messages import HumanMessage
 from langchain_core.messages import BaseMessage
+import openai
 from anthropic import APIError, APITimeoutError, RateLimitError, InternalServerError
 from rich.console import Console
 from rich.markdown import Markdown
@@ -51,7 +60,9 @@ from ra_aid.tools.memory import (
     _global_memory,
     get_memory_value,
     get_related_files,
+    render_memory_budgeted,
 )
+from ra_aid.memory.budget import DEFAULT_TOKEN_BUDGETS
 from ra_aid.tool_configs import get_research_tools
 from ra_aid.prompts import (
     RESEARCH_PROMPT,
@@ -65,7 +76,110 @@ console = Console()
 
 logger = get_logger(__name__)
 
-def run_research_agent(
+# Errors after which an agent run is retried
+RETRYABLE_ERRORS = (
+    InternalServerError, APITimeoutError, RateLimitError, APIError,
+    openai.InternalServerError, openai.APIConnectionError, openai.RateLimitError,
+    CircuitOpenError,
+)
+
+def _memory_section(key: str, query: str, config: Optional[dict] = None) -> str:
+    """Render a memory section for a prompt within its token budget.
+
+    Budgets default to DEFAULT_TOKEN_BUDGETS and can be overridden per section
+    with a 'memory_token_budgets' dict in the config.
+
+    Args:
+        key: One of 'key_facts', 'key_snippets' or 'work_log'
+        query: Current task text used to rank items
+        config: Optional configuration dictionary
+
+    Returns:
+        The rendered section
+    """
+    budgets = (config or {}).get('memory_token_budgets') or {}
+    result = render_memory_budgeted(key, budgets.get(key, DEFAULT_TOKEN_BUDGETS[key]), query)
+    if result.omitted:
+        logger.debug("Omitted %d %s from prompt to fit budget: %s", len(result.omitted), key, result.omitted)
+    return result.text
+
+# Compiled agents, keyed by (model, tool names, checkpointer). Entries hold the
+# model and checkpointer, so the ids in their keys stay valid while cached.
+AGENT_CACHE_SIZE = 32
+_agent_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_agent_cache_lock = threading.Lock()
+
+def get_agent(model, tools: list, checkpointer: Optional[Any] = None):
+    """Get a compiled ReAct agent for a model, tool set and checkpointer.
+
+    Compiling binds the tools to the model and builds the LangGraph graph,
+    which every agent run would otherwise repeat. A compiled agent keeps no per-run state (that lives in the
+    checkpointer under the run's thread ID), so one is reused for every run
+    with the same model object, tool names and checkpointer object. The
+    least recently used agent is dropped once AGENT_CACHE_SIZE are cached.
+
+    Before each model call the agent compacts its message history with
+    `compact_history` and, for models that need them, adds prompt cache
+    breakpoints (see ra_aid.prompt_cache).
+
+    Args:
+        model: The LLM model to use
+        tools: Tools the agent can call
+        checkpointer: Optional checkpointer for the agent's state
+
+    Returns:
+        The compiled agent
+    """
+    key = (id(model), tuple(tool.name for tool in tools), id(checkpointer))
+    with _agent_cache_lock:
+        entry = _agent_cache.get(key)
+        if entry is not None:
+            _agent_cache.move_to_end(key)
+            return entry[2]
+
+    prompt = cache_breakpoint_prompt if supports_prompt_caching(model) else None
+    agent = create_react_agent(model, tools, checkpointer=checkpointer, prompt=prompt, pre_model_hook=compact_history)
+    with _agent_cache_lock:
+        # Another thread may have compiled the same agent meanwhile; keep the first
+        entry = _agent_cache.setdefault(key, (model, checkpointer, agent))
+        _agent_cache.move_to_end(key)
+        while len(_agent_cache) > AGENT_CACHE_SIZE:
+            _agent_cache.popitem(last=False)
+    return entry[2]
+
+def clear_agent_cache() -> None:
+    """Drop every cached compiled agent."""
+    with _agent_cache_lock:
+        _agent_cache.clear()
+
+# Tool set of each kind of agent, so a checkpointed run can be rebuilt on resume
+AGENT_TOOL_SETS = {
+    'research': get_research_tools,
+    'web_research': get_web_research_tools,
+    'planning': get_planning_tools,
+    'implementation': get_implementation_tools,
+}
+
+def _agent_run_config(kind: str, tool_options: dict, thread_id: str, config: Optional[dict]) -> dict:
+    """Build an agent's run config.
+
+    The agent kind and tool options are tagged as run metadata, which
+    LangGraph copies into every checkpoint of the thread for `resume_agent`.
+    The agent always runs in its own thread, even if the config carries
+    another: agents started from tools get the config of the agent that
+    called them, and must not continue its thread in the shared checkpointer.
+    """
+    run_config = {
+        "configurable": {"thread_id": thread_id},
+        "recursion_limit": 100,
+        "metadata": {"ra_aid_agent": kind, "ra_aid_tools": json.dumps(tool_options)},
+    }
+    if config:
+        run_config.update(config)
+        run_config["configurable"] = {**config.get("configurable", {}), "thread_id": thread_id}
+    return run_config
+
+def _build_research_agent(
     base_task_or_query: str,
     model,
     *,
@@ -75,57 +189,33 @@ def run_research_agent(
     web_research_enabled: bool = False,
     memory: Optional[Any] = None,
     config: Optional[dict] = None,
-    thread_id: Optional[str] = None,
-    console_message: Optional[str] = None
-) -> Optional[str]:
-    """Run a research agent with the given configuration.
-
-    Args:
-        base_task_or_query: The main task or query for research
-        model: The LLM model to use
-        expert_enabled: Whether expert mode is enabled
-        research_only: Whether this is a research-only task
-        hil: Whether human-in-the-loop mode is enabled
-        web_research_enabled: Whether web research is enabled
-        memory: Optional memory instance to use
-        config: Optional configuration dictionary
-        thread_id: Optional thread ID (defaults to new UUID)
-        console_message: Optional message to display before running
-
-    Returns:
-        Optional[str]: The completion message if task completed successfully
-
-    Example:
-        result = run_research_agent(
-            "Research Python async patterns",
-            model,
-            expert_enabled=True,
-            research_only=True
-        )
-    """
+    thread_id: Optional[str] = None
+) -> Tuple[Any, str, dict]:
+    """Create the research agent and build its prompt and run config."""
     thread_id = thread_id or str(uuid.uuid4())
     logger.debug("Starting research agent with thread_id=%s", thread_id)
     logger.debug("Research configuration: expert=%s, research_only=%s, hil=%s, web=%s",
                 expert_enabled, research_only, hil, web_research_enabled)
 
-    # Initialize memory if not provided
+    # Checkpoint to the memory session unless a checkpointer was provided
     if memory is None:
-        memory = MemorySaver()
+        memory = current_session().checkpointer
 
     # Set up thread ID
     if thread_id is None:
         thread_id = str(uuid.uuid4())
 
     # Configure tools
-    tools = get_research_tools(
-        research_only=research_only,
-        expert_enabled=expert_enabled,
-        human_interaction=hil,
-        web_research_enabled=config.get('web_research', False)
-    )
+    tool_options = {
+        'research_only': research_only,
+        'expert_enabled': expert_enabled,
+        'human_interaction': hil,
+        'web_research_enabled': config.get('web_research', False),
+    }
+    tools = get_research_tools(**tool_options)
 
     # Create agent
-    agent = create_react_agent(model, tools, checkpointer=memory)
+    agent = get_agent(model, tools, memory)
 
     # Format prompt sections
     expert_section = EXPERT_PROMPT_SECTION_RESEARCH if expert_enabled else ""
@@ -133,9 +223,9 @@ def run_research_agent(
     web_research_section = WEB_RESEARCH_PROMPT_SECTION_RESEARCH if config.get('web_research') else ""
 
     # Get research context from memory
-    key_facts = _global_memory.get("key_facts", "")
-    code_snippets = _global_memory.get("code_snippets", "")
-    related_files = _global_memory.get("related_files", "")
+    key_facts = _memory_section('key_facts', base_task_or_query, config)
+    code_snippets = _memory_section('key_snippets', base_task_or_query, config)
+    related_files = "\n".join(get_related_files())
 
     # Build prompt
     prompt = (RESEARCH_ONLY_PROMPT if research_only else RESEARCH_PROMPT).format(
@@ -150,30 +240,16 @@ def run_research_agent(
     )
 
     # Set up configuration
-    run_config = {
-         "configurable": {"thread_id": thread_id},
-        "recursion_limit": 100
-    }
-    if config:
-        run_config.update(config)
+    run_config = _agent_run_config('research', tool_options, thread_id, config)
 
-    try:
-        # Display console message if provided
-        if console_message:
-            console.print(Panel(Markdown(console_message), title="🔬 Looking into it..."))
+    return agent, prompt, run_config
 
-        # Run agent with retry logic
-        logger.debug("Research agent completed successfully")
-        return run_agent_with_retry(agent, prompt, run_config)
-    except Exception as e:
-        logger.error("Research agent failed: %s", str(e), exc_info=True)
-        raise
-
-def run_web_research_agent(
-    query: str,
+def run_research_agent(
+    base_task_or_query: str,
     model,
     *,
     expert_enabled: bool = False,
+    research_only: bool = False,
     hil: bool = False,
     web_research_enabled: bool = False,
     memory: Optional[Any] = None,
@@ -181,15 +257,16 @@ def run_web_research_agent(
     thread_id: Optional[str] = None,
     console_message: Optional[str] = None
 ) -> Optional[str]:
-    """Run a web research agent with the given configuration.
+    """Run a research agent with the given configuration.
 
     Args:
-        query: The mainquery for web research
+        base_task_or_query: The main task or query for research
         model: The LLM model to use
         expert_enabled: Whether expert mode is enabled
+        research_only: Whether this is a research-only task
         hil: Whether human-in-the-loop mode is enabled
         web_research_enabled: Whether web research is enabled
-        memory: Optional memory instance to use
+        memory: Optional checkpointer to use (defaults to the memory session's)
         config: Optional configuration dictionary
         thread_id: Optional thread ID (defaults to new UUID)
         console_message: Optional message to display before running
@@ -198,39 +275,123 @@ def run_web_research_agent(
         Optional[str]: The completion message if task completed successfully
 
     Example:
-        result = run_web_research_agent(
-            "Research latest Python async patterns",
+        result = run_research_agent(
+            "Research Python async patterns",
             model,
-            expert_enabled=True
+            expert_enabled=True,
+            research_only=True
         )
     """
+    agent, prompt, run_config = _build_research_agent(
+        base_task_or_query,
+        model,
+        expert_enabled=expert_enabled,
+        research_only=research_only,
+        hil=hil,
+        web_research_enabled=web_research_enabled,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
+
+    try:
+        # Display console message if provided
+        if console_message:
+            console.print(Panel(Markdown(console_message), title="🔬 Looking into it..."))
+
+        # Run agent with retry logic
+        logger.debug("Research agent completed successfully")
+        return run_agent_with_retry(agent, prompt, run_config)
+    except Exception as e:
+        logger.error("Research agent failed: %s", str(e), exc_info=True)
+        raise
+
+
+async def arun_research_agent(
+    base_task_or_query: str,
+    model,
+    *,
+    expert_enabled: bool = False,
+    research_only: bool = False,
+    hil: bool = False,
+    web_research_enabled: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None,
+    console_message: Optional[str] = None,
+    cancel_token: Optional['CancellationToken'] = None
+) -> Optional[str]:
+    """Async variant of `run_research_agent`, run on the event loop with `arun_agent_with_retry`.
+
+    Takes the same arguments, plus:
+
+    Args:
+        cancel_token: Token to cancel the run from another task or thread
+    """
+    agent, prompt, run_config = _build_research_agent(
+        base_task_or_query,
+        model,
+        expert_enabled=expert_enabled,
+        research_only=research_only,
+        hil=hil,
+        web_research_enabled=web_research_enabled,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
+
+    try:
+        # Display console message if provided
+        if console_message:
+            console.print(Panel(Markdown(console_message), title="🔬 Looking into it..."))
+
+        # Run agent with retry logic
+        logger.debug("Research agent completed successfully")
+        return await arun_agent_with_retry(agent, prompt, run_config, cancel_token)
+    except Exception as e:
+        logger.error("Research agent failed: %s", str(e), exc_info=True)
+        raise
+
+def _build_web_research_agent(
+    query: str,
+    model,
+    *,
+    expert_enabled: bool = False,
+    hil: bool = False,
+    web_research_enabled: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None
+) -> Tuple[Any, str, dict]:
+    """Create the web research agent and build its prompt and run config."""
     thread_id = thread_id or str(uuid.uuid4())
     logger.debug("Starting web research agent with thread_id=%s", thread_id)
     logger.debug("Web research configuration: expert=%s, hil=%s, web=%s",
                 expert_enabled, hil, web_research_enabled)
 
-    # Initialize memory if not provided
+    # Checkpoint to the memory session unless a checkpointer was provided
     if memory is None:
-        memory = MemorySaver()
+        memory = current_session().checkpointer
 
     # Set up thread ID
     if thread_id is None:
         thread_id = str(uuid.uuid4())
 
     # Configure tools using restricted web research toolset
-    tools = get_web_research_tools(expert_enabled=expert_enabled)
+    tool_options = {'expert_enabled': expert_enabled}
+    tools = get_web_research_tools(**tool_options)
 
     # Create agent
-    agent = create_react_agent(model, tools, checkpointer=memory)
+    agent = get_agent(model, tools, memory)
 
     # Format prompt sections
     expert_section = EXPERT_PROMPT_SECTION_RESEARCH if expert_enabled else ""
     human_section = HUMAN_PROMPT_SECTION_RESEARCH if hil else ""
 
     # Get research context from memory
-    key_facts = _global_memory.get("key_facts", "")
-    code_snippets = _global_memory.get("code_snippets", "")
-    related_files = _global_memory.get("related_files", "")
+    key_facts = _memory_section('key_facts', query, config)
+    code_snippets = _memory_section('key_snippets', query, config)
+    related_files = "\n".join(get_related_files())
 
     # Build prompt
     prompt = WEB_RESEARCH_PROMPT.format(
@@ -243,12 +404,55 @@ def run_web_research_agent(
     )
 
     # Set up configuration
-    run_config = {
-        "configurable": {"thread_id": thread_id},
-        "recursion_limit": 100
-    }
-    if config:
-        run_config.update(config)
+    run_config = _agent_run_config('web_research', tool_options, thread_id, config)
+
+    return agent, prompt, run_config
+
+def run_web_research_agent(
+    query: str,
+    model,
+    *,
+    expert_enabled: bool = False,
+    hil: bool = False,
+    web_research_enabled: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None,
+    console_message: Optional[str] = None
+) -> Optional[str]:
+    """Run a web research agent with the given configuration.
+
+    Args:
+        query: The mainquery for web research
+        model: The LLM model to use
+        expert_enabled: Whether expert mode is enabled
+        hil: Whether human-in-the-loop mode is enabled
+        web_research_enabled: Whether web research is enabled
+        memory: Optional checkpointer to use (defaults to the memory session's)
+        config: Optional configuration dictionary
+        thread_id: Optional thread ID (defaults to new UUID)
+        console_message: Optional message to display before running
+
+    Returns:
+        Optional[str]: The completion message if task completed successfully
+
+    Example:
+        result = run_web_research_agent(
+            "Research latest Python async patterns",
+            model,
+            expert_enabled=True
+        )
+    """
+    agent, prompt, run_config = _build_web_research_agent(
+        query,
+        model,
+        expert_enabled=expert_enabled,
+        hil=hil,
+        web_research_enabled=web_research_enabled,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
 
     try:
         # Display console message if provided
@@ -262,47 +466,79 @@ def run_web_research_agent(
         logger.error("Web research agent failed: %s", str(e), exc_info=True)
         raise
 
-def run_planning_agent(
-    base_task: str,
+
+async def arun_web_research_agent(
+    query: str,
     model,
     *,
     expert_enabled: bool = False,
     hil: bool = False,
+    web_research_enabled: bool = False,
     memory: Optional[Any] = None,
     config: Optional[dict] = None,
-    thread_id: Optional[str] = None
+    thread_id: Optional[str] = None,
+    console_message: Optional[str] = None,
+    cancel_token: Optional['CancellationToken'] = None
 ) -> Optional[str]:
-    """Run a planning agent to create implementation plans.
+    """Async variant of `run_web_research_agent`, run on the event loop with `arun_agent_with_retry`.
 
-    Args:
-        base_task: The main task to plan implementation for
-        model: The LLM model to use
-        expert_enabled: Whether expert mode is enabled
-        hil: Whether human-in-the-loop mode is enabled
-        memory: Optional memory instance to use
-        config: Optional configuration dictionary
-        thread_id: Optional thread ID (defaults to new UUID)
+    Takes the same arguments, plus:
 
-    Returns:
-        Optional[str]: The completion message if planning completed successfully
+    Args:
+        cancel_token: Token to cancel the run from another task or thread
     """
+    agent, prompt, run_config = _build_web_research_agent(
+        query,
+        model,
+        expert_enabled=expert_enabled,
+        hil=hil,
+        web_research_enabled=web_research_enabled,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
+
+    try:
+        # Display console message if provided
+        if console_message:
+            console.print(Panel(Markdown(console_message), title="🔍 Starting Web Research..."))
+
+        # Run agent with retry logic
+        logger.debug("Web research agent completed successfully")
+        return await arun_agent_with_retry(agent, prompt, run_config, cancel_token)
+    except Exception as e:
+        logger.error("Web research agent failed: %s", str(e), exc_info=True)
+        raise
+
+def _build_planning_agent(
+    base_task: str,
+    model,
+    *,
+    expert_enabled: bool = False,
+    hil: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None
+) -> Tuple[Any, str, dict]:
+    """Create the planning agent and build its prompt and run config."""
     thread_id = thread_id or str(uuid.uuid4())
     logger.debug("Starting planning agent with thread_id=%s", thread_id)
     logger.debug("Planning configuration: expert=%s, hil=%s", expert_enabled, hil)
 
-    # Initialize memory if not provided
+    # Checkpoint to the memory session unless a checkpointer was provided
     if memory is None:
-        memory = MemorySaver()
+        memory = current_session().checkpointer
 
     # Set up thread ID
     if thread_id is None:
         thread_id = str(uuid.uuid4())
 
     # Configure tools
-    tools = get_planning_tools(expert_enabled=expert_enabled, web_research_enabled=config.get('web_research', False))
+    tool_options = {'expert_enabled': expert_enabled, 'web_research_enabled': config.get('web_research', False)}
+    tools = get_planning_tools(**tool_options)
 
     # Create agent
-    agent = create_react_agent(model, tools, checkpointer=memory)
+    agent = get_agent(model, tools, memory)
 
     # Format prompt sections
     expert_section = EXPERT_PROMPT_SECTION_PLANNING if expert_enabled else ""
@@ -317,18 +553,49 @@ def run_planning_agent(
         base_task=base_task,
         research_notes=get_memory_value('research_notes'),
         related_files="\n".join(get_related_files()),
-        key_facts=get_memory_value('key_facts'),
-        key_snippets=get_memory_value('key_snippets'),
+        key_facts=_memory_section('key_facts', base_task, config),
+        key_snippets=_memory_section('key_snippets', base_task, config),
         research_only_note='' if config.get('research_only') else ' Only request implementation if the user explicitly asked for changes to be made.'
     )
 
     # Set up configuration
-    run_config = {
-        "configurable": {"thread_id": thread_id},
-        "recursion_limit": 100
-    }
-    if config:
-        run_config.update(config)
+    run_config = _agent_run_config('planning', tool_options, thread_id, config)
+
+    return agent, planning_prompt, run_config
+
+def run_planning_agent(
+    base_task: str,
+    model,
+    *,
+    expert_enabled: bool = False,
+    hil: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None
+) -> Optional[str]:
+    """Run a planning agent to create implementation plans.
+
+    Args:
+        base_task: The main task to plan implementation for
+        model: The LLM model to use
+        expert_enabled: Whether expert mode is enabled
+        hil: Whether human-in-the-loop mode is enabled
+        memory: Optional checkpointer to use (defaults to the memory session's)
+        config: Optional configuration dictionary
+        thread_id: Optional thread ID (defaults to new UUID)
+
+    Returns:
+        Optional[str]: The completion message if planning completed successfully
+    """
+    agent, planning_prompt, run_config = _build_planning_agent(
+        base_task,
+        model,
+        expert_enabled=expert_enabled,
+        hil=hil,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
 
     try:
         print_stage_header("Planning Stage")
@@ -338,7 +605,44 @@ def run_planning_agent(
         logger.error("Planning agent failed: %s", str(e), exc_info=True)
         raise
 
-def run_task_implementation_agent(
+
+async def arun_planning_agent(
+    base_task: str,
+    model,
+    *,
+    expert_enabled: bool = False,
+    hil: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None,
+    cancel_token: Optional['CancellationToken'] = None
+) -> Optional[str]:
+    """Async variant of `run_planning_agent`, run on the event loop with `arun_agent_with_retry`.
+
+    Takes the same arguments, plus:
+
+    Args:
+        cancel_token: Token to cancel the run from another task or thread
+    """
+    agent, planning_prompt, run_config = _build_planning_agent(
+        base_task,
+        model,
+        expert_enabled=expert_enabled,
+        hil=hil,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
+
+    try:
+        print_stage_header("Planning Stage")
+        logger.debug("Planning agent completed successfully")
+        return await arun_agent_with_retry(agent, planning_prompt, run_config, cancel_token)
+    except Exception as e:
+        logger.error("Planning agent failed: %s", str(e), exc_info=True)
+        raise
+
+def _build_task_implementation_agent(
     base_task: str,
     tasks: list,
     task: str,
@@ -351,43 +655,31 @@ def run_task_implementation_agent(
     memory: Optional[Any] = None,
     config: Optional[dict] = None,
     thread_id: Optional[str] = None
-) -> Optional[str]:
-    """Run an implementation agent for a specific task.
-
-    Args:
-        base_task: The main task being implemented
-        tasks: List of tasks to implement
-        plan: The implementation plan
-        related_files: List of related files
-        model: The LLM model to use
-        expert_enabled: Whether expert mode is enabled
-        web_research_enabled: Whether web research is enabled
-        memory: Optional memory instance to use
-        config: Optional configuration dictionary
-        thread_id: Optional thread ID (defaults to new UUID)
-
-    Returns:
-        Optional[str]: The completion message if task completed successfully
-    """
+) -> Tuple[Any, str, dict]:
+    """Create the implementation agent and build its prompt and run config."""
     thread_id = thread_id or str(uuid.uuid4())
     logger.debug("Starting implementation agent with thread_id=%s", thread_id)
     logger.debug("Implementation configuration: expert=%s, web=%s", expert_enabled, web_research_enabled)
     logger.debug("Task details: base_task=%s, current_task=%s", base_task, task)
     logger.debug("Related files: %s", related_files)
 
-    # Initialize memory if not provided
+    # Checkpoint to the memory session unless a checkpointer was provided
     if memory is None:
-        memory = MemorySaver()
+        memory = current_session().checkpointer
 
     # Set up thread ID
     if thread_id is None:
         thread_id = str(uuid.uuid4())
 
     # Configure tools
-    tools = get_implementation_tools(expert_enabled=expert_enabled, web_research_enabled=config.get('web_research', False))
+    tool_options = {'expert_enabled': expert_enabled, 'web_research_enabled': config.get('web_research', False)}
+    tools = get_implementation_tools(**tool_options)
 
     # Create agent
-    agent = create_react_agent(model, tools, checkpointer=memory)
+    agent = get_agent(model, tools, memory)
+
+    # Rank memory against the current task first, then the base task
+    memory_query = f"{task}\n{base_task}"
 
     # Build prompt
     prompt = IMPLEMENTATION_PROMPT.format(
@@ -396,21 +688,63 @@ def run_task_implementation_agent(
         tasks=tasks,
         plan=plan,
         related_files=related_files,
-        key_facts=get_memory_value('key_facts'),
-        key_snippets=get_memory_value('key_snippets'),
-        work_log=get_memory_value('work_log'),
+        key_facts=_memory_section('key_facts', memory_query, config),
+        key_snippets=_memory_section('key_snippets', memory_query, config),
+        work_log=_memory_section('work_log', memory_query, config),
         expert_section=EXPERT_PROMPT_SECTION_IMPLEMENTATION if expert_enabled else "",
         human_section=HUMAN_PROMPT_SECTION_IMPLEMENTATION if _global_memory.get('config', {}).get('hil', False) else "",
         web_research_section=WEB_RESEARCH_PROMPT_SECTION_CHAT if config.get('web_research') else ""
     )
 
     # Set up configuration
-    run_config = {
-        "configurable": {"thread_id": thread_id},
-        "recursion_limit": 100
-    }
-    if config:
-        run_config.update(config)
+    run_config = _agent_run_config('implementation', tool_options, thread_id, config)
+
+    return agent, prompt, run_config
+
+def run_task_implementation_agent(
+    base_task: str,
+    tasks: list,
+    task: str,
+    plan: str,
+    related_files: list,
+    model,
+    *,
+    expert_enabled: bool = False,
+    web_research_enabled: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None
+) -> Optional[str]:
+    """Run an implementation agent for a specific task.
+
+    Args:
+        base_task: The main task being implemented
+        tasks: List of tasks to implement
+        plan: The implementation plan
+        related_files: List of related files
+        model: The LLM model to use
+        expert_enabled: Whether expert mode is enabled
+        web_research_enabled: Whether web research is enabled
+        memory: Optional checkpointer to use (defaults to the memory session's)
+        config: Optional configuration dictionary
+        thread_id: Optional thread ID (defaults to new UUID)
+
+    Returns:
+        Optional[str]: The completion message if task completed successfully
+    """
+    agent, prompt, run_config = _build_task_implementation_agent(
+        base_task,
+        tasks,
+        task,
+        plan,
+        related_files,
+        model,
+        expert_enabled=expert_enabled,
+        web_research_enabled=web_research_enabled,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
 
     try:
         logger.debug("Implementation agent completed successfully")
@@ -419,14 +753,67 @@ def run_task_implementation_agent(
         logger.error("Implementation agent failed: %s", str(e), exc_info=True)
         raise
 
+
+async def arun_task_implementation_agent(
+    base_task: str,
+    tasks: list,
+    task: str,
+    plan: str,
+    related_files: list,
+    model,
+    *,
+    expert_enabled: bool = False,
+    web_research_enabled: bool = False,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None,
+    thread_id: Optional[str] = None,
+    cancel_token: Optional['CancellationToken'] = None
+) -> Optional[str]:
+    """Async variant of `run_task_implementation_agent`, run on the event loop with `arun_agent_with_retry`.
+
+    Takes the same arguments, plus:
+
+    Args:
+        cancel_token: Token to cancel the run from another task or thread
+    """
+    agent, prompt, run_config = _build_task_implementation_agent(
+        base_task,
+        tasks,
+        task,
+        plan,
+        related_files,
+        model,
+        expert_enabled=expert_enabled,
+        web_research_enabled=web_research_enabled,
+        memory=memory,
+        config=config,
+        thread_id=thread_id
+    )
+
+    try:
+        logger.debug("Implementation agent completed successfully")
+        return await arun_agent_with_retry(agent, prompt, run_config, cancel_token)
+    except Exception as e:
+        logger.error("Implementation agent failed: %s", str(e), exc_info=True)
+        raise
+
 _CONTEXT_STACK = []
 _INTERRUPT_CONTEXT = None
 _FEEDBACK_MODE = False
 
+# Token shared by agents running concurrently, see cancellation_scope
+_CANCEL_TOKEN: contextvars.ContextVar[Optional['CancellationToken']] = contextvars.ContextVar(
+    'ra_aid_cancel_token', default=None)
+
 def _request_interrupt(signum, frame):
     global _INTERRUPT_CONTEXT
     if _CONTEXT_STACK:
-        _INTERRUPT_CONTEXT = _CONTEXT_STACK[-1]
+        section = _CONTEXT_STACK[-1]
+        if section.cancel_token is not None:
+            # Stop every agent sharing the token, not just the latest to start
+            section.cancel_token.cancel()
+        else:
+            _INTERRUPT_CONTEXT = section
 
     if _FEEDBACK_MODE:
         print()
@@ -434,7 +821,24 @@ def _request_interrupt(signum, frame):
         print()
         sys.exit(0)
 
+@contextmanager
+def cancellation_scope(token: 'CancellationToken'):
+    """Run agents started in this context, and in copies of it made for
+    worker threads, under a shared cancellation token.
+
+    Interrupting any of them with SIGINT cancels the token, which stops all
+    of them at their next check.
+    """
+    reset = _CANCEL_TOKEN.set(token)
+    try:
+        yield token
+    finally:
+        _CANCEL_TOKEN.reset(reset)
+
 class InterruptibleSection:
+    def __init__(self):
+        self.cancel_token = _CANCEL_TOKEN.get()
+
     def __enter__(self):
         _CONTEXT_STACK.append(self)
         return self
@@ -443,19 +847,25 @@ class InterruptibleSection:
         _CONTEXT_STACK.remove(self)
 
 def check_interrupt():
+    cancel_token = _CANCEL_TOKEN.get()
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
     if _CONTEXT_STACK and _INTERRUPT_CONTEXT is _CONTEXT_STACK[-1]:
         raise AgentInterrupt("Interrupt requested")
 
-def run_agent_with_retry(agent, prompt: str, config: dict) -> Optional[str]:
-    """Run an agent with retry logic for API errors."""
-    logger.debug("Running agent with prompt length: %d", len(prompt))
+def run_agent_with_retry(agent, prompt: Optional[str], config: dict) -> Optional[str]:
+    """Run an agent with retry logic for API errors.
+
+    A prompt of None continues the thread from its latest checkpoint.
+    """
+    logger.debug("Running agent with prompt length: %d", len(prompt or ""))
+    agent_input = None if prompt is None else {"messages": [HumanMessage(content=prompt)]}
     original_handler = None
     if threading.current_thread() is threading.main_thread():
         original_handler = signal.getsignal(signal.SIGINT)
         signal.signal(signal.SIGINT, _request_interrupt)
 
     max_retries = 20
-    base_delay = 1
 
     with InterruptibleSection():
         try:
@@ -467,7 +877,7 @@ def run_agent_with_retry(agent, prompt: str, config: dict) -> Optional[str]:
                 logger.debug("Attempt %d/%d", attempt + 1, max_retries)
                 check_interrupt()
                 try:
-                    for chunk in agent.stream({"messages": [HumanMessage(content=prompt)]}, config):
+                    for chunk in agent.stream(agent_input, config):
                         logger.debug("Agent output: %s", chunk)
                         check_interrupt()
                         print_agent_output(chunk)
@@ -475,13 +885,13 @@ def run_agent_with_retry(agent, prompt: str, config: dict) -> Optional[str]:
                     return "Agent run completed successfully"
                 except (KeyboardInterrupt, AgentInterrupt):
                     raise
-                except (InternalServerError, APITimeoutError, RateLimitError, APIError) as e:
+                except RETRYABLE_ERRORS as e:
                     if attempt == max_retries - 1:
                         logger.error("Max retries reached, failing: %s", str(e))
                         raise RuntimeError(f"Max retries ({max_retries}) exceeded. Last error: {e}")
                     logger.warning("API error (attempt %d/%d): %s", attempt + 1, max_retries, str(e))
-                    delay = base_delay * (2 ** attempt)
-                    print_error(f"Encountered {e.__class__.__name__}: {e}. Retrying in {delay}s... (Attempt {attempt+1}/{max_retries})")
+                    delay = retry_delay(attempt, e)
+                    print_error(f"Encountered {e.__class__.__name__}: {e}. Retrying in {delay:.1f}s... (Attempt {attempt+1}/{max_retries})")
                     start = time.monotonic()
                     while time.monotonic() - start < delay:
                         check_interrupt()
@@ -492,3 +902,202 @@ def run_agent_with_retry(agent, prompt: str, config: dict) -> Optional[str]:
 
             if original_handler and threading.current_thread() is threading.main_thread():
                 signal.signal(signal.SIGINT, original_handler)
+
+
+def resume_agent(
+    thread_id: str,
+    model,
+    *,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None
+) -> Optional[str]:
+    """Continue an interrupted agent run from its last completed step.
+
+    The agent is rebuilt with the kind and tools recorded in the thread's
+    latest checkpoint and run on without new input, so steps that already
+    finished are not repeated.
+
+    Args:
+        thread_id: Thread ID of the run to resume
+        model: The LLM model to use
+        memory: Checkpointer holding the run; the memory session's if omitted
+        config: Configuration dictionary
+
+    Returns:
+        Optional[str]: The completion message, or None if the run had already finished
+
+    Raises:
+        ValueError: If the thread has no checkpoint of an RA.Aid agent
+    """
+    if memory is None:
+        memory = current_session().checkpointer
+
+    saved = memory.get_tuple({"configurable": {"thread_id": thread_id}})
+    kind = saved.metadata.get('ra_aid_agent') if saved else None
+    if kind not in AGENT_TOOL_SETS:
+        raise ValueError(f"No resumable agent checkpoint for thread {thread_id}")
+
+    tool_options = json.loads(saved.metadata['ra_aid_tools'])
+    agent = get_agent(model, AGENT_TOOL_SETS[kind](**tool_options), memory)
+    run_config = _agent_run_config(kind, tool_options, thread_id, config)
+
+    if not agent.get_state(run_config).next:
+        logger.info("Thread %s already completed", thread_id)
+        return None
+    logger.debug("Resuming %s agent with thread_id=%s", kind, thread_id)
+    return run_agent_with_retry(agent, None, run_config)
+
+
+# Top-level agents of a CLI run, in the order they run; each gets its own thread
+RUN_STAGES = ('research', 'planning')
+
+
+def stage_thread_id(run_id: str, stage: str) -> str:
+    """Thread ID of one top-level stage of a run."""
+    return f"{run_id}-{stage}"
+
+
+def resume_run(
+    run_id: str,
+    model,
+    *,
+    memory: Optional[Any] = None,
+    config: Optional[dict] = None
+) -> Optional[str]:
+    """Continue an interrupted CLI run from the last stage it checkpointed.
+
+    An ID that names no run stage is resumed as a single agent thread, see
+    `resume_agent`.
+
+    Args:
+        run_id: Run ID printed at start, or a thread ID
+        model: The LLM model to use
+        memory: Checkpointer holding the run; the memory session's if omitted
+        config: Configuration dictionary
+
+    Returns:
+        Optional[str]: The completion message, or None if the stage had already finished
+
+    Raises:
+        ValueError: If neither the run nor a thread of that ID has a checkpoint of an RA.Aid agent
+    """
+    if memory is None:
+        memory = current_session().checkpointer
+
+    for stage in reversed(RUN_STAGES):
+        thread_id = stage_thread_id(run_id, stage)
+        if memory.get_tuple({"configurable": {"thread_id": thread_id}}) is not None:
+            return resume_agent(thread_id, model, memory=memory, config=config)
+    return resume_agent(run_id, model, memory=memory, config=config)
+
+
+class CancellationToken:
+    """Cooperative cancellation for agents run with `arun_agent_with_retry`,
+    or with `run_agent_with_retry` inside a `cancellation_scope`.
+
+    The async counterpart of the SIGINT interrupt: many agents can share one
+    event loop, so each run is cancelled through its own token instead of a
+    process-wide signal. `cancel` may be called from any thread.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Request cancellation, waking every run waiting on this token."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve_waiter, future)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise AgentInterrupt("Cancellation requested")
+
+    async def sleep(self, delay: float) -> bool:
+        """Wait up to `delay` seconds, returning early once cancelled.
+
+        Returns:
+            Whether the token was cancelled
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._cancelled.is_set():
+                return True
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+        return self.cancelled
+
+
+def _resolve_waiter(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+async def arun_agent_with_retry(
+    agent,
+    prompt: str,
+    config: dict,
+    cancel_token: Optional[CancellationToken] = None
+) -> Optional[str]:
+    """Run an agent on the event loop with retry logic for API errors.
+
+    Streams with `agent.astream` and backs off with non-blocking waits, so
+    any number of agents can run concurrently on one loop. Unlike
+    `run_agent_with_retry` no SIGINT handler is installed; runs are stopped
+    through `cancel_token`, which is checked between chunks and ends backoff
+    waits immediately, or by cancelling the asyncio task.
+
+    Raises:
+        AgentInterrupt: If the token is cancelled
+    """
+    logger.debug("Running agent asynchronously with prompt length: %d", len(prompt))
+    cancel_token = cancel_token or CancellationToken()
+
+    max_retries = 20
+
+    try:
+        # Track agent execution depth
+        current_depth = _global_memory.get('agent_depth', 0)
+        _global_memory['agent_depth'] = current_depth + 1
+
+        for attempt in range(max_retries):
+            logger.debug("Attempt %d/%d", attempt + 1, max_retries)
+            cancel_token.raise_if_cancelled()
+            try:
+                async for chunk in agent.astream({"messages": [HumanMessage(content=prompt)]}, config):
+                    logger.debug("Agent output: %s", chunk)
+                    cancel_token.raise_if_cancelled()
+                    print_agent_output(chunk)
+                logger.debug("Agent run completed successfully")
+                return "Agent run completed successfully"
+            except (KeyboardInterrupt, AgentInterrupt):
+                raise
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries - 1:
+                    logger.error("Max retries reached, failing: %s", str(e))
+                    raise RuntimeError(f"Max retries ({max_retries}) exceeded. Last error: {e}")
+                logger.warning("API error (attempt %d/%d): %s", attempt + 1, max_retries, str(e))
+                delay = retry_delay(attempt, e)
+                print_error(f"Encountered {e.__class__.__name__}: {e}. Retrying in {delay:.1f}s... (Attempt {attempt+1}/{max_retries})")
+                await cancel_token.sleep(delay)
+    finally:
+        # Reset depth tracking
+        _global_memory['agent_depth'] = _global_memory.get('agent_depth', 1) - 1
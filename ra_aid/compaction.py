@@ -0,0 +1,129 @@
+"""Compaction of agent conversation history.
+
+A ReAct agent resends its whole message list on every model call, and most
+of it is the output of file reads, searches and shell commands that only
+mattered for the step that requested them. Once the history grows past a
+token threshold, `compact_history` replaces tool outputs older than the
+recent window with short stubs naming the tool and the size of what was
+dropped; the recent window is kept verbatim.
+
+Stubs replace the original messages in the agent state, by message ID, so
+the history stays compacted in later calls and in checkpoints, and the
+prompt prefix changes only when the threshold is crossed again.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, ToolMessage
+
+from ra_aid.logging_config import get_logger
+from ra_aid.memory.budget import estimate_tokens
+
+logger = get_logger(__name__)
+
+# Characters of the first output line kept in a stub
+STUB_PREVIEW_CHARS = 120
+
+
+@dataclass
+class CompactionLimits:
+    """When and how much of an agent's history is compacted.
+
+    Attributes:
+        max_tokens: Compact once the history is estimated to take more tokens than this
+        keep_recent: Most recent messages kept verbatim
+        min_tokens: Tool outputs smaller than this are kept, as a stub would save little
+    """
+    max_tokens: int = 30000
+    keep_recent: int = 6
+    min_tokens: int = 200
+
+
+_limits: Optional[CompactionLimits] = CompactionLimits()
+_limits_lock = threading.Lock()
+
+
+def configure_compaction(limits: Optional[CompactionLimits]) -> None:
+    """Set the compaction limits of every agent; None turns compaction off."""
+    global _limits
+    with _limits_lock:
+        _limits = limits
+
+
+def get_compaction_limits() -> Optional[CompactionLimits]:
+    """Get the compaction limits in effect, or None if compaction is off."""
+    return _limits
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Estimate the tokens a message takes in a model request."""
+    tokens = estimate_tokens(_content_text(message.content))
+    for tool_call in getattr(message, "tool_calls", None) or ():
+        tokens += estimate_tokens(json.dumps(tool_call.get("args", {}), default=str))
+    return tokens
+
+
+def _stub(message: ToolMessage, tokens: int) -> ToolMessage:
+    text = _content_text(message.content).strip()
+    first_line = text.split("\n", 1)[0][:STUB_PREVIEW_CHARS]
+    lines = text.count("\n") + 1
+    return message.model_copy(update={
+        "content": (f"[Output of {message.name or 'tool'} elided from history: {lines} lines, ~{tokens} tokens, "
+                    f"starting {first_line!r}. Call the tool again if it is still needed.]"),
+        "artifact": None,
+    })
+
+
+def compact_messages(
+    messages: Sequence[BaseMessage],
+    limits: Optional[CompactionLimits] = None
+) -> List[ToolMessage]:
+    """Elide old tool outputs from a history that exceeds its token threshold.
+
+    Args:
+        messages: The agent's message history, oldest first
+        limits: Limits to apply; the configured ones if omitted
+
+    Returns:
+        Stubs for the tool outputs to elide, with the IDs of the messages
+        they replace; empty if the history is within its threshold
+    """
+    limits = limits or get_compaction_limits()
+    if limits is None:
+        return []
+
+    sizes = [message_tokens(message) for message in messages]
+    total = sum(sizes)
+    if total <= limits.max_tokens:
+        return []
+
+    stubs = []
+    saved = 0
+    for message, tokens in zip(messages[:max(len(messages) - limits.keep_recent, 0)], sizes):
+        if isinstance(message, ToolMessage) and tokens >= limits.min_tokens:
+            stub = _stub(message, tokens)
+            stubs.append(stub)
+            saved += tokens - message_tokens(stub)
+    if stubs:
+        logger.debug("Compacted history of ~%d tokens: elided %d tool outputs, saving ~%d tokens",
+                     total, len(stubs), saved)
+    return stubs
+
+
+def compact_history(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Pre-model hook for ReAct agents compacting the message history.
+
+    Returns:
+        A state update replacing elided tool outputs with their stubs
+    """
+    stubs = compact_messages(state["messages"])
+    return {"messages": stubs} if stubs else {}
@@ -7,3 +7,59 @@ class AgentInterrupt(Exception):
     separate from KeyboardInterrupt which is reserved for top-level handling.
     """
     pass
+
+
+class MemoryChangesExpired(Exception):
+    """Exception raised when memory changes are requested from a version
+    older than the change log still holds.
+
+    The caller should re-read the memory it mirrors and continue from the
+    current version.
+    """
+    pass
+
+
+class SessionSnapshotError(Exception):
+    """Exception raised when a file cannot be loaded as a session snapshot,
+    either because it is not one or because it needs a newer RA.Aid or a
+    missing compression package.
+    """
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Exception raised instead of calling an LLM provider that keeps
+    failing, until its circuit breaker lets a trial call through.
+
+    Attributes:
+        provider: Provider and model whose circuit is open
+        retry_after: Seconds until a call may be tried again
+    """
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is failing; not calling it for {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class ResponseCacheMiss(Exception):
+    """Exception raised in replay mode for an LLM request the response
+    cache holds no response to.
+
+    Attributes:
+        model: Identity of the model the request was for
+        key: Cache key of the request
+    """
+
+    def __init__(self, model: str, key: str):
+        super().__init__(f"No cached response for request {key[:12]} to {model}")
+        self.model = model
+        self.key = key
+
+
+class TranscriptMismatch(Exception):
+    """Exception raised when a scripted chat model cannot answer a call
+    from its transcript, because the responses ran out or the next one
+    calls a tool the calling agent does not have.
+    """
+    pass
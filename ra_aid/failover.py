@@ -0,0 +1,240 @@
+"""Provider failover and hedged requests for LLM calls.
+
+`FailoverChatModel` wraps an ordered list of chat models, such as the same
+task on Anthropic, then OpenRouter, then an OpenAI-compatible endpoint. A
+call goes to the first model; when it fails because its provider is down,
+overloaded or rate limiting (including an open circuit, which fails at once),
+the call moves on to the next model. Errors caused by the request itself are
+raised as they are, since another provider would reject it too, though not
+while a hedged call (see below) is still running and may yet succeed.
+
+With hedging on, a call that has run longer than the model's recent p95
+latency is also sent to the next model, and the first response wins. On the
+async path the losing request is cancelled; a blocking HTTP call cannot be
+interrupted, so on the sync path the loser is abandoned and its response
+discarded when it arrives.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ra_aid.exceptions import CircuitOpenError
+from ra_aid.logging_config import get_logger
+from ra_aid.prompt_cache import strip_cache_breakpoints, supports_prompt_caching
+from ra_aid.rate_limit import is_outage_error, is_rate_limit_error
+
+logger = get_logger(__name__)
+
+
+class LatencyStats:
+    """Recent successful call latencies of one model.
+
+    Args:
+        window: Number of recent calls kept
+        min_samples: Calls needed before percentiles are reported
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency below which `fraction` of recent calls finished, or None
+        until `min_samples` calls were recorded."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+_latency: Dict[str, LatencyStats] = {}
+_latency_lock = threading.Lock()
+
+
+def latency_stats(name: str) -> LatencyStats:
+    """Get the latency stats shared by every call to a provider and model."""
+    with _latency_lock:
+        stats = _latency.get(name)
+        if stats is None:
+            stats = _latency[name] = LatencyStats()
+        return stats
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """Whether a call that failed with this error should move to another provider."""
+    return isinstance(error, CircuitOpenError) or is_rate_limit_error(error) or is_outage_error(error)
+
+
+class FailoverChatModel(BaseChatModel):
+    """Chat model that fails over, and optionally hedges, across models.
+
+    Attributes:
+        models: Chat models, or tool-bound chat models, in order of preference
+        names: Provider and model of each entry, for latency stats and logs
+        hedge: Whether to hedge calls that run past the model's p95 latency
+        hedge_percentile: Latency percentile after which a call is hedged
+    """
+
+    models: List[Any]
+    names: List[str]
+    hedge: bool = False
+    hedge_percentile: float = 0.95
+
+    @property
+    def _llm_type(self) -> str:
+        # Report the primary model's type, so provider-specific handling such as prompt caching still applies
+        return getattr(self.models[0], "_llm_type", "failover")
+
+    def _input(self, index: int, messages: List[BaseMessage]) -> List[BaseMessage]:
+        # Cache breakpoints added for the primary model are Anthropic-specific
+        if index and supports_prompt_caching(self.models[0]) and not supports_prompt_caching(self.models[index]):
+            return strip_cache_breakpoints(messages)
+        return messages
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "FailoverChatModel":
+        """Bind tools to every model, each in its provider's format."""
+        return self.model_copy(update={'models': [model.bind_tools(tools, **kwargs) for model in self.models]})
+
+    def _hedge_delay(self, index: int) -> Optional[float]:
+        if not self.hedge or index + 1 >= len(self.models):
+            return None
+        return latency_stats(self.names[index]).percentile(self.hedge_percentile)
+
+    def _invoke(self, index: int, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> BaseMessage:
+        start = time.monotonic()
+        message = self.models[index].invoke(self._input(index, messages), **kwargs)
+        latency_stats(self.names[index]).record(time.monotonic() - start)
+        return message
+
+    async def _ainvoke(self, index: int, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> BaseMessage:
+        start = time.monotonic()
+        message = await self.models[index].ainvoke(self._input(index, messages), **kwargs)
+        latency_stats(self.names[index]).record(time.monotonic() - start)
+        return message
+
+    def _failed(self, index: int, error: BaseException) -> bool:
+        """Whether a failed call should move on to the next model."""
+        if not is_failover_error(error):
+            return False
+        logger.warning("%s failed, failing over: %s", self.names[index], error)
+        return True
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        kwargs = {**kwargs, 'stop': stop} if stop else kwargs
+        remaining = list(range(len(self.models)))
+        running = {}
+        last_error: Optional[BaseException] = None
+        request_error: Optional[BaseException] = None
+
+        pool = ThreadPoolExecutor(max_workers=len(self.models))
+
+        def launch() -> None:
+            index = remaining.pop(0)
+            future = pool.submit(contextvars.copy_context().run, self._invoke, index, messages, kwargs)
+            running[future] = (index, time.monotonic())
+
+        try:
+            # After a request error, only the calls already running may still answer
+            while running or (remaining and request_error is None):
+                if not running:
+                    launch()
+                timeout = None
+                if len(running) == 1 and remaining and request_error is None:
+                    index, started = next(iter(running.values()))
+                    delay = self._hedge_delay(index)
+                    if delay is not None:
+                        timeout = max(0.0, started + delay - time.monotonic())
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    logger.debug("Hedging slow call to %s", self.names[index])
+                    launch()
+                    continue
+                for future in done:
+                    index, _ = running.pop(future)
+                    try:
+                        message = future.result()
+                    except Exception as e:
+                        if self._failed(index, e):
+                            last_error = e
+                        elif request_error is None:
+                            # Another provider would reject the request too, but a hedged call may still succeed
+                            request_error = e
+                        continue
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+            raise request_error or last_error
+        finally:
+            for future in running:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        kwargs = {**kwargs, 'stop': stop} if stop else kwargs
+        remaining = list(range(len(self.models)))
+        running = {}
+        last_error: Optional[BaseException] = None
+        request_error: Optional[BaseException] = None
+
+        def launch() -> None:
+            index = remaining.pop(0)
+            task = asyncio.ensure_future(self._ainvoke(index, messages, kwargs))
+            running[task] = (index, time.monotonic())
+
+        try:
+            # After a request error, only the calls already running may still answer
+            while running or (remaining and request_error is None):
+                if not running:
+                    launch()
+                timeout = None
+                if len(running) == 1 and remaining and request_error is None:
+                    index, started = next(iter(running.values()))
+                    delay = self._hedge_delay(index)
+                    if delay is not None:
+                        timeout = max(0.0, started + delay - time.monotonic())
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.debug("Hedging slow call to %s", self.names[index])
+                    launch()
+                    continue
+                for task in done:
+                    index, _ = running.pop(task)
+                    try:
+                        message = task.result()
+                    except Exception as e:
+                        if self._failed(index, e):
+                            last_error = e
+                        elif request_error is None:
+                            # Another provider would reject the request too, but a hedged call may still succeed
+                            request_error = e
+                        continue
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+            raise request_error or last_error
+        finally:
+            for task in running:
+                task.cancel()
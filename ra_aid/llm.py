@@ -1,9 +1,32 @@
 import os
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langchain_core.language_models import BaseChatModel
 
-def initialize_llm(provider: str, model_name: str) -> BaseChatModel:
+from ra_aid.failover import FailoverChatModel
+from ra_aid.prompt_cache import CacheUsageCallback
+from ra_aid.rate_limit import get_rate_limiter
+from ra_aid.response_cache import cache_responses
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# API key environment variable of each provider, before any EXPERT_ prefix
+_API_KEY_ENV = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "openrouter": "OPENROUTER_API_KEY",
+    "openai-compatible": "OPENAI_API_KEY",
+}
+
+_clients: Dict[Tuple[Any, ...], BaseChatModel] = {}
+_clients_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+
+def initialize_llm(provider: str, model_name: str, **client_kwargs) -> BaseChatModel:
     """Initialize a language model client based on the specified provider and model.
 
     Note: Environment variables must be validated before calling this function.
@@ -12,39 +35,46 @@ def initialize_llm(provider: str, model_name: str) -> BaseChatModel:
     Args:
         provider: The LLM provider to use ('openai', 'anthropic', 'openrouter', 'openai-compatible')
         model_name: Name of the model to use
+        **client_kwargs: Extra arguments for the client constructor
 
     Returns:
-        BaseChatModel: Configured language model client
+        BaseChatModel: Configured language model client, wrapped in the
+        response cache if one is configured (see ra_aid.response_cache)
 
     Raises:
         ValueError: If the provider is not supported
     """
     if provider == "openai":
-        return ChatOpenAI(
+        model = ChatOpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
             model=model_name,
+            **client_kwargs
         )
     elif provider == "anthropic":
-        return ChatAnthropic(
+        model = ChatAnthropic(
             api_key=os.getenv("ANTHROPIC_API_KEY"),
             model_name=model_name,
+            **client_kwargs
         )
     elif provider == "openrouter":
-        return ChatOpenAI(
+        model = ChatOpenAI(
             api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1",
+            base_url=OPENROUTER_BASE_URL,
             model=model_name,
+            **client_kwargs
         )
     elif provider == "openai-compatible":
-        return ChatOpenAI(
+        model = ChatOpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
             base_url=os.getenv("OPENAI_API_BASE"),
             model=model_name,
+            **client_kwargs
         )
     else:
         raise ValueError(f"Unsupported provider: {provider}")
+    return cache_responses(model, provider, model_name)
 
-def initialize_expert_llm(provider: str = "openai", model_name: str = "o1-preview") -> BaseChatModel:
+def initialize_expert_llm(provider: str = "openai", model_name: str = "o1-preview", **client_kwargs) -> BaseChatModel:
     """Initialize an expert language model client based on the specified provider and model.
 
     Note: Environment variables must be validated before calling this function.
@@ -54,34 +84,156 @@ def initialize_expert_llm(provider: str = "openai", model_name: str = "o1-previe
         provider: The LLM provider to use ('openai', 'anthropic', 'openrouter', 'openai-compatible').
                  Defaults to 'openai'.
         model_name: Name of the model to use. Defaults to 'o1-preview'.
+        **client_kwargs: Extra arguments for the client constructor
 
     Returns:
-        BaseChatModel: Configured expert language model client
+        BaseChatModel: Configured expert language model client, wrapped in the
+        response cache if one is configured (see ra_aid.response_cache)
 
     Raises:
         ValueError: If the provider is not supported
     """
     if provider == "openai":
-        return ChatOpenAI(
+        model = ChatOpenAI(
             api_key=os.getenv("EXPERT_OPENAI_API_KEY"),
             model=model_name,
+            **client_kwargs
         )
     elif provider == "anthropic":
-        return ChatAnthropic(
+        model = ChatAnthropic(
             api_key=os.getenv("EXPERT_ANTHROPIC_API_KEY"),
             model_name=model_name,
+            **client_kwargs
         )
     elif provider == "openrouter":
-        return ChatOpenAI(
+        model = ChatOpenAI(
             api_key=os.getenv("EXPERT_OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1",
+            base_url=OPENROUTER_BASE_URL,
             model=model_name,
+            **client_kwargs
         )
     elif provider == "openai-compatible":
-        return ChatOpenAI(
+        model = ChatOpenAI(
             api_key=os.getenv("EXPERT_OPENAI_API_KEY"),
             base_url=os.getenv("EXPERT_OPENAI_API_BASE"),
             model=model_name,
+            **client_kwargs
         )
     else:
         raise ValueError(f"Unsupported provider: {provider}")
+    return cache_responses(model, provider, model_name)
+
+def _shared_http_client() -> httpx.Client:
+    """Get the keep-alive HTTP client shared by every OpenAI-style client.
+
+    Uses the OpenAI SDK's default timeout and connection limits.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+            follow_redirects=True,
+        )
+    return _http_client
+
+def _client_key(provider: str, model_name: str, expert: bool) -> Tuple[Any, ...]:
+    """Key a client by provider, model, endpoint and the API key it would use."""
+    if provider not in _API_KEY_ENV:
+        raise ValueError(f"Unsupported provider: {provider}")
+    prefix = "EXPERT_" if expert else ""
+    base_url = {
+        "openrouter": OPENROUTER_BASE_URL,
+        "openai-compatible": os.getenv(f"{prefix}OPENAI_API_BASE"),
+    }.get(provider)
+    return (provider, model_name, base_url, os.getenv(prefix + _API_KEY_ENV[provider]))
+
+def get_llm(
+    provider: str,
+    model_name: str,
+    *,
+    expert: bool = False,
+    fallbacks: Sequence[Tuple[str, str]] = (),
+    hedge: bool = False
+) -> BaseChatModel:
+    """Get the shared language model client for a provider and model.
+
+    Clients are created once per process for each (provider, model, base URL,
+    API key) and reused by every agent, so requests share the client's
+    keep-alive connections instead of opening new ones. OpenAI-style clients
+    also share one HTTP connection pool across models. Clients are safe to
+    use from several threads at once. All clients of a provider and model
+    share its rate limiter and circuit breaker (see ra_aid.rate_limit), and
+    report their prompt cache usage (see ra_aid.prompt_cache).
+
+    With fallbacks, the client fails over to each (provider, model) in turn
+    while the ones before it are down (see ra_aid.failover).
+
+    Args:
+        provider: The LLM provider to use ('openai', 'anthropic', 'openrouter', 'openai-compatible')
+        model_name: Name of the model to use
+        expert: Whether to use the expert model's EXPERT_ credentials
+        fallbacks: (provider, model) pairs to fail over to, in order
+        hedge: Whether to also send calls running past p95 latency to the next model
+
+    Returns:
+        BaseChatModel: The shared language model client
+
+    Raises:
+        ValueError: If a provider is not supported
+    """
+    if fallbacks:
+        chain = [(provider, model_name)] + [tuple(fallback) for fallback in fallbacks]
+        models = [get_llm(chain_provider, chain_model, expert=expert) for chain_provider, chain_model in chain]
+        key = ("failover", tuple(id(model) for model in models), hedge)
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = FailoverChatModel(
+                    models=models,
+                    names=[f"{chain_provider}/{chain_model}" for chain_provider, chain_model in chain],
+                    hedge=hedge,
+                )
+        return client
+
+    key = _client_key(provider, model_name, expert)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            initialize = initialize_expert_llm if expert else initialize_llm
+            limiter = get_rate_limiter(provider, model_name)
+            client_kwargs = {
+                "rate_limiter": limiter,
+                "callbacks": [limiter.callback, CacheUsageCallback(f"{provider}/{model_name}")],
+            }
+            if provider != "anthropic":
+                client_kwargs["http_client"] = _shared_http_client()
+            client = _clients[key] = initialize(provider, model_name, **client_kwargs)
+    return client
+
+def get_llm_from_config(config: Dict[str, Any]) -> BaseChatModel:
+    """Get the shared client for the provider, model and fallbacks in an agent config."""
+    return get_llm(
+        config.get('provider', 'anthropic'),
+        config.get('model', 'claude-3-5-sonnet-20241022'),
+        fallbacks=config.get('fallbacks') or (),
+        hedge=config.get('hedge', False)
+    )
+
+def get_expert_llm(provider: str = "openai", model_name: str = "o1-preview") -> BaseChatModel:
+    """Get the shared expert language model client; see get_llm."""
+    return get_llm(provider, model_name, expert=True)
+
+def register_llm_client(provider: str, model_name: str, client: BaseChatModel, *, expert: bool = False) -> None:
+    """Make get_llm return a given client for a provider and model, e.g. a
+    scripted model (see ra_aid.transcript) for agents that get theirs from
+    the config.
+    """
+    key = _client_key(provider, model_name, expert)
+    with _clients_lock:
+        _clients[key] = client
+
+def clear_llm_clients() -> None:
+    """Drop every shared client, e.g. after API keys changed."""
+    with _clients_lock:
+        _clients.clear()
@@ -0,0 +1,6 @@
+from .backend import MemoryBackend, SQLiteMemoryBackend
+from .changes import MemoryChange
+from .checkpoint import SQLiteCheckpointer
+from .session import MemorySession, current_session, memory_session
+
+__all__ = ['MemoryBackend', 'SQLiteMemoryBackend', 'SQLiteCheckpointer', 'MemoryChange', 'MemorySession', 'current_session', 'memory_session']
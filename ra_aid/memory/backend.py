@@ -0,0 +1,124 @@
+"""Persistence backends for the agent memory store.
+
+The memory tools keep their working state in an in-process dict. A backend
+mirrors every mutation as it happens so a session can be restored after a
+crash or restart.
+"""
+
+import json
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Tuple
+
+# Items are grouped by collection name and keyed by integer ID within a collection.
+StoredItems = Dict[str, Dict[int, Any]]
+StoredValues = Dict[str, Any]
+
+
+def _encode(value: Any) -> Any:
+    """Encode record types, which are read-only mappings, as JSON objects."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MemoryBackend:
+    """In-process backend that keeps nothing.
+
+    Subclasses override the write hooks to persist state. Each hook receives
+    only the row that changed so writes stay incremental.
+    """
+
+    def load(self) -> Tuple[StoredItems, StoredValues]:
+        """Return all stored items grouped by collection, and all stored scalar values."""
+        return {}, {}
+
+    def put_item(self, collection: str, item_id: int, value: Any) -> None:
+        """Insert or replace a single item in a collection."""
+
+    def delete_items(self, collection: str, item_ids: Iterable[int]) -> None:
+        """Delete items from a collection. Missing IDs are ignored."""
+
+    def clear_collection(self, collection: str) -> None:
+        """Delete every item in a collection."""
+
+    def set_value(self, key: str, value: Any) -> None:
+        """Store a scalar value such as an ID counter or flag."""
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class SQLiteMemoryBackend(MemoryBackend):
+    """Memory backend storing one row per item in an SQLite database.
+
+    The database runs in WAL mode so writes are cheap appends and readers
+    never block the writer.
+
+    Args:
+        path: Path to the database file; created if it does not exist
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_items ("
+            " collection TEXT NOT NULL,"
+            " item_id INTEGER NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (collection, item_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_values ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def load(self) -> Tuple[StoredItems, StoredValues]:
+        items: StoredItems = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT collection, item_id, value FROM memory_items ORDER BY collection, item_id"
+            ).fetchall()
+            value_rows = self._conn.execute("SELECT key, value FROM memory_values").fetchall()
+
+        for collection, item_id, value in rows:
+            items.setdefault(collection, {})[item_id] = json.loads(value)
+        values = {key: json.loads(value) for key, value in value_rows}
+        return items, values
+
+    def put_item(self, collection: str, item_id: int, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory_items (collection, item_id, value) VALUES (?, ?, ?)",
+                (collection, item_id, json.dumps(value, default=_encode)),
+            )
+
+    def delete_items(self, collection: str, item_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM memory_items WHERE collection = ? AND item_id = ?",
+                [(collection, item_id) for item_id in item_ids],
+            )
+
+    def clear_collection(self, collection: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM memory_items WHERE collection = ?", (collection,))
+
+    def set_value(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memory_values (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, default=_encode)),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,134 @@
+"""Token-budgeted selection of memory items for prompts.
+
+When a memory section would not fit its token budget, items are ranked by
+stored relevance, recency and overlap with the current task text, and the
+best ones are kept until the budget is spent.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Set, Tuple, Union
+
+Items = Union[Mapping[int, Any], Sequence[Any]]
+
+# Ranking weights; stored relevance only applies to items that carry a score
+RELEVANCE_WEIGHT = 0.5
+RECENCY_WEIGHT = 0.2
+OVERLAP_WEIGHT = 0.3
+
+# Default token budgets for memory sections injected into prompts
+DEFAULT_TOKEN_BUDGETS = {
+    'key_facts': 4000,
+    'key_snippets': 16000,
+    'work_log': 4000,
+}
+
+_TERM_PATTERN = re.compile(r"[a-z_][a-z0-9_]{2,}")
+
+
+@dataclass
+class BudgetedRender:
+    """Result of rendering a memory section within a token budget.
+
+    Attributes:
+        text: The rendered section, including a note about omitted items
+        included: IDs (or list indexes) of the items that were rendered
+        omitted: IDs (or list indexes) of the items left out to fit the budget
+    """
+    text: str
+    included: List[int] = field(default_factory=list)
+    omitted: List[int] = field(default_factory=list)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text at roughly four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def query_terms(text: str) -> Set[str]:
+    """Extract the identifier-like words of a text used for overlap scoring."""
+    return set(_TERM_PATTERN.findall(text.lower()))
+
+
+def _ordered_pairs(items: Items) -> List[Tuple[int, Any]]:
+    return sorted(items.items()) if isinstance(items, Mapping) else list(enumerate(items))
+
+
+def rank_items(
+    items: Items,
+    query: str,
+    text_of: Callable[[Any], str],
+    relevance_of: Optional[Callable[[Any], float]] = None,
+) -> List[int]:
+    """Rank items best first by relevance, recency and overlap with the query.
+
+    Args:
+        items: ID-keyed dict or list of items
+        query: Current task text to match item text against
+        text_of: Function returning the searchable text of an item
+        relevance_of: Optional function returning an item's stored relevance in [0, 1]
+
+    Returns:
+        Item IDs (or list indexes) ordered from most to least useful
+    """
+    pairs = _ordered_pairs(items)
+    terms = query_terms(query)
+    last_position = max(len(pairs) - 1, 1)
+
+    scored = []
+    for position, (key, value) in enumerate(pairs):
+        score = RECENCY_WEIGHT * position / last_position
+        if terms:
+            score += OVERLAP_WEIGHT * len(terms & query_terms(text_of(value))) / len(terms)
+        if relevance_of is not None:
+            relevance = relevance_of(value) or 0.0
+            score += RELEVANCE_WEIGHT * min(max(relevance, 0.0), 1.0)
+        scored.append((score, position, key))
+
+    # Ties go to the more recent item
+    scored.sort(key=lambda entry: (entry[0], entry[1]), reverse=True)
+    return [key for _, _, key in scored]
+
+
+def render_within_budget(
+    items: Items,
+    format_item: Callable[[int, Any], str],
+    ranking: List[int],
+    max_tokens: int,
+    separator: str = "\n\n",
+) -> BudgetedRender:
+    """Render the best-ranked items that fit the budget, in their original order.
+
+    Items are taken greedily in ranking order; an item too large for the
+    remaining budget is skipped so smaller, lower-ranked items can still fit.
+
+    Args:
+        items: ID-keyed dict or list of items
+        format_item: Function formatting one (ID or index, value) pair into a block
+        ranking: Item IDs ordered from most to least useful
+        max_tokens: Token budget for the rendered section
+        separator: Text placed between blocks
+
+    Returns:
+        The rendered section with the included and omitted item IDs
+    """
+    separator_tokens = estimate_tokens(separator)
+    chosen = set()
+    used = 0
+    for key in ranking:
+        cost = estimate_tokens(format_item(key, items[key])) + (separator_tokens if chosen else 0)
+        if used + cost <= max_tokens:
+            chosen.add(key)
+            used += cost
+
+    included = []
+    omitted = []
+    blocks = []
+    for key, value in _ordered_pairs(items):
+        if key in chosen:
+            included.append(key)
+            blocks.append(format_item(key, value))
+        else:
+            omitted.append(key)
+
+    return BudgetedRender(separator.join(blocks), included, omitted)
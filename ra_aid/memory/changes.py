@@ -0,0 +1,95 @@
+"""Append-only change log of memory collections.
+
+Every item added to, updated in or removed from a tracked collection is
+recorded with a version that increases by one per change. Consumers such as
+the WebUI remember the last version they saw and ask for the changes after
+it instead of re-reading whole collections.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from ra_aid.exceptions import MemoryChangesExpired
+
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
+
+
+@dataclass(frozen=True)
+class MemoryChange:
+    """One change to a memory collection.
+
+    Attributes:
+        version: Position of the change in the log, starting at 1
+        collection: Memory key of the collection, e.g. 'key_facts'
+        action: One of 'added', 'updated' or 'removed'
+        item_id: ID of the changed item
+        value: New value of the item; None for removals
+    """
+    version: int
+    collection: str
+    action: str
+    item_id: int
+    value: Any = None
+
+
+class ChangeFeed:
+    """Versioned log of memory changes with a bounded history.
+
+    Args:
+        max_changes: Number of most recent changes kept for `changes_since`
+    """
+
+    def __init__(self, max_changes: int = 10000):
+        self._max_changes = max_changes
+        self._changes: List[MemoryChange] = []
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Version of the latest change, or 0 if nothing changed yet."""
+        return self._version
+
+    def record(self, collection: str, action: str, item_id: int, value: Any = None) -> int:
+        """Append a change.
+
+        Returns:
+            The version assigned to the change
+        """
+        with self._lock:
+            self._version += 1
+            self._changes.append(MemoryChange(self._version, collection, action, item_id, value))
+            # Trim in batches so appends stay amortized O(1)
+            if len(self._changes) > 2 * self._max_changes:
+                del self._changes[:len(self._changes) - self._max_changes]
+            return self._version
+
+    def changes_since(self, version: int = 0, collection: Optional[str] = None) -> List[MemoryChange]:
+        """Get the changes made after a version, oldest first.
+
+        Args:
+            version: Last version the caller has seen; 0 for every change
+            collection: Only return changes of this collection
+
+        Returns:
+            The changes with a version greater than `version`
+
+        Raises:
+            MemoryChangesExpired: If changes after `version` were already
+                dropped from the bounded history
+        """
+        version = max(version, 0)
+        with self._lock:
+            # Versions are contiguous, so the position of a version is an offset
+            first = self._changes[0].version if self._changes else self._version + 1
+            if version + 1 < first:
+                raise MemoryChangesExpired(
+                    f"Changes after version {version} are no longer available; oldest kept is {first}"
+                )
+            changes = self._changes[max(version + 1 - first, 0):]
+        if collection is not None:
+            changes = [change for change in changes if change.collection == collection]
+        return changes
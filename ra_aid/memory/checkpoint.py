@@ -0,0 +1,364 @@
+"""Durable LangGraph checkpointer backed by SQLite.
+
+Agents checkpoint their full message history after every step. Kept in an
+in-process saver, every superseded checkpoint stays in RAM for the life of
+the process and is lost if it crashes. This checkpointer writes each
+checkpoint to an SQLite database instead, compressed, and drops superseded
+ones as it goes, so memory stays flat and an interrupted agent can be
+resumed from its last completed step.
+
+Only the newest `keep` checkpoints of each thread are retained, with their
+pending writes. That is enough to resume, and to reconstruct state for
+graphs built from ordinary channels such as RA.Aid's ReAct agents, but not
+for graphs using `DeltaChannel`, whose state is spread over the whole
+parent chain.
+"""
+
+import asyncio
+import functools
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+try:
+    from langgraph.checkpoint.base import get_checkpoint_metadata
+except ImportError:  # pragma: no cover - older langgraph-checkpoint
+    def get_checkpoint_metadata(config: RunnableConfig, metadata: CheckpointMetadata) -> CheckpointMetadata:
+        return metadata
+
+# Serialized values smaller than this are stored uncompressed
+_COMPRESS_MIN_SIZE = 1024
+
+_CODEC_NONE = 0
+_CODEC_ZLIB = 1
+
+# Serialized checkpoint: type, codec, data, metadata type, metadata, parent ID
+_Row = Tuple[str, int, bytes, str, bytes, Optional[str]]
+
+
+def _compress(data: bytes) -> Tuple[int, bytes]:
+    if len(data) < _COMPRESS_MIN_SIZE:
+        return _CODEC_NONE, data
+    return _CODEC_ZLIB, zlib.compress(data, 1)
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    return zlib.decompress(data) if codec == _CODEC_ZLIB else bytes(data)
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver):
+    """Checkpointer storing compressed checkpoints in an SQLite database.
+
+    Thread IDs are stored as strings, so UUID thread IDs work as well.
+
+    Recently written or read checkpoints are kept in a bounded in-memory
+    cache, so the per-step read of a thread's latest checkpoint does not hit
+    the disk. The database runs in WAL mode and may be shared with a
+    `SQLiteMemoryBackend`.
+
+    Args:
+        path: Path to the database file; created if it does not exist
+        keep: Newest checkpoints retained per thread and namespace
+        cache_size: Serialized checkpoints kept in memory
+        serde: Serializer for checkpoints and writes
+    """
+
+    def __init__(self, path: str, *, keep: int = 2, cache_size: int = 16, serde: Optional[Any] = None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep = max(keep, 1)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str, str], _Row]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " thread_id TEXT NOT NULL,"
+            " checkpoint_ns TEXT NOT NULL,"
+            " checkpoint_id TEXT NOT NULL,"
+            " parent_id TEXT,"
+            " type TEXT NOT NULL,"
+            " codec INTEGER NOT NULL,"
+            " checkpoint BLOB NOT NULL,"
+            " metadata_type TEXT NOT NULL,"
+            " metadata BLOB NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_writes ("
+            " thread_id TEXT NOT NULL,"
+            " checkpoint_ns TEXT NOT NULL,"
+            " checkpoint_id TEXT NOT NULL,"
+            " task_id TEXT NOT NULL,"
+            " idx INTEGER NOT NULL,"
+            " channel TEXT NOT NULL,"
+            " type TEXT NOT NULL,"
+            " codec INTEGER NOT NULL,"
+            " value BLOB NOT NULL,"
+            " task_path TEXT NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY)")
+
+    def _remember(self, key: Tuple[str, str, str], row: _Row) -> None:
+        self._cache[key] = row
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _row(self, key: Tuple[str, str, str]) -> Optional[_Row]:
+        """Read a checkpoint row from the cache or the database. Call with the lock held."""
+        row = self._cache.get(key)
+        if row is not None:
+            self._cache.move_to_end(key)
+            return row
+        row = self._conn.execute(
+            "SELECT type, codec, checkpoint, metadata_type, metadata, parent_id FROM checkpoints"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            key,
+        ).fetchone()
+        if row is not None:
+            type_, codec, data, metadata_type, metadata, parent_id = row
+            row = (type_, _CODEC_NONE, _decompress(codec, data), metadata_type, bytes(metadata), parent_id)
+            self._remember(key, row)
+        return row
+
+    def _tuple(self, key: Tuple[str, str, str], row: _Row) -> CheckpointTuple:
+        """Build a checkpoint tuple, with its pending writes. Call with the lock held."""
+        thread_id, checkpoint_ns, checkpoint_id = key
+        type_, _, data, metadata_type, metadata, parent_id = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, codec, value FROM checkpoint_writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_path, task_id, idx",
+            key,
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, data)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+            if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, _decompress(codec, value))))
+                for task_id, channel, value_type, codec, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id is None:
+                latest = self._conn.execute(
+                    "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+                checkpoint_id = latest[0]
+                if checkpoint_id is None:
+                    return None
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            row = self._row(key)
+            return self._tuple(key, row) if row is not None else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if config is not None:
+            configurable = config["configurable"]
+            clauses.append("thread_id = ?")
+            params.append(str(configurable["thread_id"]))
+            if "checkpoint_ns" in configurable:
+                clauses.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before is not None and get_checkpoint_id(before):
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            keys = self._conn.execute(
+                f"SELECT thread_id, checkpoint_ns, checkpoint_id FROM checkpoints{where}"
+                " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC",
+                params,
+            ).fetchall()
+
+        for key in keys:
+            if limit is not None and limit <= 0:
+                break
+            with self._lock:
+                row = self._row(key)
+                if row is None:
+                    continue
+                saved = self._tuple(key, row)
+            if filter and not all(saved.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield saved
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        codec, stored = _compress(data)
+        key = (thread_id, checkpoint_ns, checkpoint["id"])
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_id,"
+                    " type, codec, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    key + (parent_id, type_, codec, stored, metadata_type, metadata_data),
+                )
+                self._prune(thread_id, checkpoint_ns)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._remember(key, (type_, _CODEC_NONE, data, metadata_type, metadata_data, parent_id))
+
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Delete all but the newest `keep` checkpoints of a thread. Call with the lock held."""
+        superseded = [row[0] for row in self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            " ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep),
+        )]
+        for checkpoint_id in superseded:
+            for table in ("checkpoints", "checkpoint_writes"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+            self._cache.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            codec, stored = _compress(data)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, type_, codec, stored, task_path))
+        # Special writes (errors, interrupts) replace earlier ones; regular writes are kept once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        with self._lock:
+            self._conn.executemany(
+                f"{verb} INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx,"
+                " channel, type, codec, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        thread_id = str(thread_id)
+        with self._lock:
+            for table in ("checkpoints", "checkpoint_writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            for key in [key for key in self._cache if key[0] == thread_id]:
+                del self._cache[key]
+
+    def record_run(self, run_id: str) -> None:
+        """Record the ID of a top-level run, as opposed to the agents it starts."""
+        with self._lock:
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (str(run_id),))
+            self._conn.execute("INSERT INTO runs (run_id) VALUES (?)", (str(run_id),))
+
+    def latest_run_id(self) -> Optional[str]:
+        """ID of the most recently started top-level run, if any."""
+        with self._lock:
+            row = self._conn.execute("SELECT run_id FROM runs ORDER BY rowid DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(method, *args, **kwargs))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._run(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        saved = await self._run(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in saved:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._run(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._run(self.delete_thread, thread_id)
@@ -0,0 +1,166 @@
+"""Near-duplicate index over the key facts collection.
+
+Agents tend to restate the same fact in research, sub-research and planning.
+Each fact is reduced to a set of word shingles and a MinHash signature, and
+the signatures are bucketed by band (locality-sensitive hashing), so a new
+fact is only compared against the few stored facts that share a band with it
+instead of against every fact. Candidates are confirmed with the exact
+Jaccard similarity of their shingle sets.
+"""
+
+import hashlib
+import random
+import re
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+_STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was',
+    'which', 'with',
+))
+
+# Mersenne prime modulus for the universal hash family
+_PRIME = (1 << 61) - 1
+
+
+def fact_shingles(text: str) -> FrozenSet[str]:
+    """Reduce a fact to its words and adjacent word pairs.
+
+    Words are lowercased, stopwords dropped and plural "s" trimmed, so
+    rewordings that only differ in articles, casing or number match.
+    """
+    words = []
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return frozenset(words + [f"{first} {second}" for first, second in zip(words, words[1:])])
+
+
+def jaccard(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    """Jaccard similarity of two shingle sets."""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class FactIndex:
+    """MinHash LSH index kept alongside an ID to fact dict.
+
+    The ID to fact dict stays the source of truth. The index is rebuilt from
+    it whenever it is replaced or changed behind the index's back.
+
+    Args:
+        threshold: Jaccard similarity at or above which two facts are duplicates
+        bands: Number of LSH bands
+        rows: Signature rows per band; with the defaults, facts sharing half
+            their shingles are candidates with a probability of about 64%
+            and facts sharing 70% with a probability of about 99%
+    """
+
+    def __init__(self, threshold: float = 0.7, bands: int = 16, rows: int = 4):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(0)
+        self._coefficients = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(bands * rows)
+        ]
+        self._facts: Optional[Dict[int, str]] = None
+        self._size = 0
+        self._shingles: Dict[int, FrozenSet[str]] = {}
+        self._keys: Dict[int, List[Tuple[int, int]]] = {}
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+
+    def bind(self, facts: Dict[int, str]) -> "FactIndex":
+        """Point the index at an ID to fact dict, rebuilding it if needed.
+
+        Returns:
+            The index itself, for chaining
+        """
+        if facts is not self._facts or len(facts) != self._size:
+            self._facts = facts
+            self._shingles.clear()
+            self._keys.clear()
+            self._buckets.clear()
+            for fact_id, fact in facts.items():
+                self._index(fact_id, fact)
+            self._size = len(facts)
+        return self
+
+    def find_duplicate(self, fact: str) -> Optional[int]:
+        """Find the stored fact most similar to a new one.
+
+        Returns:
+            ID of the closest fact at or above the threshold, or None
+        """
+        shingles = fact_shingles(fact)
+        if not shingles:
+            return None
+        candidates = set()
+        for key in self._band_keys(shingles):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_id, best_similarity = None, self.threshold
+        for fact_id in sorted(candidates):
+            similarity = jaccard(shingles, self._shingles[fact_id])
+            if similarity >= best_similarity:
+                best_id, best_similarity = fact_id, similarity
+        return best_id
+
+    def add(self, fact_id: int, fact: str) -> None:
+        """Store a fact under the given ID, replacing any fact already there."""
+        self._unindex(fact_id)
+        self._facts[fact_id] = fact
+        self._index(fact_id, fact)
+        self._size = len(self._facts)
+
+    def remove(self, fact_id: int) -> Optional[str]:
+        """Remove a fact by ID.
+
+        Returns:
+            The removed fact, or None if the ID was not present
+        """
+        if fact_id not in self._facts:
+            return None
+        self._unindex(fact_id)
+        fact = self._facts.pop(fact_id)
+        self._size = len(self._facts)
+        return fact
+
+    def _signature(self, shingles: FrozenSet[str]) -> List[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+            for shingle in shingles
+        ]
+        return [min((a * value + b) % _PRIME for value in hashes) for a, b in self._coefficients]
+
+    def _band_keys(self, shingles: FrozenSet[str]) -> List[Tuple[int, int]]:
+        signature = self._signature(shingles)
+        return [
+            (band, hash(tuple(signature[band * self.rows:(band + 1) * self.rows])))
+            for band in range(self.bands)
+        ]
+
+    def _index(self, fact_id: int, fact: str) -> None:
+        shingles = fact_shingles(fact)
+        if not shingles:
+            return
+        keys = self._band_keys(shingles)
+        self._shingles[fact_id] = shingles
+        self._keys[fact_id] = keys
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(fact_id)
+
+    def _unindex(self, fact_id: int) -> None:
+        self._shingles.pop(fact_id, None)
+        for key in self._keys.pop(fact_id, ()):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(fact_id)
+                if not bucket:
+                    del self._buckets[key]
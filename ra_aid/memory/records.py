@@ -0,0 +1,136 @@
+"""Compact record types for stored snippets and work log entries.
+
+Stored items used to be plain dicts, each paying for its own hash table, and
+every snippet held its own copy of its file path. These records keep their
+fields in `__slots__`, intern file paths so snippets of one file share a
+single string, and keep work log times as epoch seconds. Markdown and ISO
+timestamps are only produced when an item is rendered.
+
+Both record types are read-only mappings with the same keys as the dicts
+they replace, so code indexing them by key and comparisons against plain
+dicts keep working. Records are never changed in place; `replace()` returns
+a new record, which is what the identity-keyed render caches rely on.
+"""
+
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+
+class SnippetRecord(Mapping):
+    """A stored key snippet.
+
+    Keys are 'filepath', 'line_number', 'snippet', 'description', 'source'
+    and 'relevance', plus 'stale' (always True) for snippets whose file
+    changed under them. The source location is only stored when it differs
+    from the usual "filepath:line_number".
+    """
+
+    __slots__ = ('filepath', 'line_number', 'snippet', 'description', 'relevance', 'stale', '_source')
+
+    _KEYS = ('filepath', 'line_number', 'snippet', 'description', 'source', 'relevance')
+
+    def __init__(
+        self,
+        filepath: str,
+        line_number: Optional[int],
+        snippet: str,
+        description: Optional[str] = None,
+        source: Optional[str] = None,
+        relevance: Optional[float] = None,
+        stale: bool = False,
+    ):
+        self.filepath = sys.intern(filepath)
+        self.line_number = line_number
+        self.snippet = snippet
+        self.description = description
+        self.relevance = relevance
+        self.stale = stale
+        self._source = None if source == f"{filepath}:{line_number}" else source
+
+    @classmethod
+    def from_mapping(cls, snippet: Mapping) -> "SnippetRecord":
+        """Build a record from a snippet dict, or return it if it already is a record."""
+        if isinstance(snippet, cls):
+            return snippet
+        return cls(
+            snippet['filepath'],
+            snippet['line_number'],
+            snippet['snippet'],
+            snippet.get('description'),
+            snippet.get('source'),
+            snippet.get('relevance'),
+            bool(snippet.get('stale')),
+        )
+
+    @property
+    def source(self) -> str:
+        """Source location in "file:line" format."""
+        return self._source if self._source is not None else f"{self.filepath}:{self.line_number}"
+
+    def replace(self, **changes: Any) -> "SnippetRecord":
+        """Get a copy of the record with some fields changed."""
+        fields = dict(self, stale=self.stale, source=self._source)
+        fields.update(changes)
+        return SnippetRecord(**fields)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._KEYS or (key == 'stale' and self.stale):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._KEYS
+        if self.stale:
+            yield 'stale'
+
+    def __len__(self) -> int:
+        return len(self._KEYS) + self.stale
+
+    def __repr__(self) -> str:
+        return f"SnippetRecord({dict(self)!r})"
+
+
+class WorkLogRecord(Mapping):
+    """A work log entry with keys 'timestamp' (ISO format) and 'event'.
+
+    The time is stored as epoch seconds in `time` and formatted on access.
+    """
+
+    __slots__ = ('time', 'event')
+
+    _KEYS = ('timestamp', 'event')
+
+    def __init__(self, time: float, event: str):
+        self.time = time
+        self.event = event
+
+    @classmethod
+    def from_mapping(cls, entry: Mapping) -> "WorkLogRecord":
+        """Build a record from a work log dict, or return it if it already is a record."""
+        if isinstance(entry, cls):
+            return entry
+        timestamp = entry['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        return cls(timestamp, entry['event'])
+
+    @property
+    def timestamp(self) -> str:
+        """Local time of the entry in ISO format."""
+        return datetime.fromtimestamp(self.time).isoformat()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"WorkLogRecord({dict(self)!r})"
@@ -0,0 +1,92 @@
+"""Bidirectional index over the related files collection."""
+
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+def normalize_path(path: str) -> str:
+    """Normalize a file path so equivalent spellings compare equal.
+
+    Collapses `./` prefixes, redundant separators and `..` segments, and turns
+    absolute paths inside the current working directory into relative ones.
+
+    Args:
+        path: The file path as given by the agent
+
+    Returns:
+        The normalized path
+    """
+    normalized = os.path.normpath(path)
+    if os.path.isabs(normalized):
+        relative = os.path.relpath(normalized, os.getcwd())
+        if relative != os.pardir and not relative.startswith(os.pardir + os.sep):
+            normalized = relative
+    return normalized
+
+
+class RelatedFilesIndex:
+    """Path to ID index kept alongside an ID to path dict.
+
+    The ID to path dict stays the source of truth and keeps insertion order.
+    The index is rebuilt from it whenever it is replaced or changed behind
+    the index's back, so lookups never return stale IDs.
+    """
+
+    def __init__(self):
+        self._files: Optional[Dict[int, str]] = None
+        self._ids: Dict[str, int] = {}
+        self._size = 0
+
+    def bind(self, files: Dict[int, str]) -> "RelatedFilesIndex":
+        """Point the index at an ID to path dict, rebuilding it if needed.
+
+        Args:
+            files: The ID to path mapping to index
+
+        Returns:
+            The index itself, for chaining
+        """
+        if files is not self._files or len(files) != self._size:
+            self._files = files
+            self._ids = {normalize_path(path): file_id for file_id, path in files.items()}
+            self._size = len(files)
+        return self
+
+    def get_id(self, path: str) -> Optional[int]:
+        """Look up the ID of a path, or None if it is not indexed."""
+        return self._ids.get(normalize_path(path))
+
+    def add(self, file_id: int, path: str) -> str:
+        """Add a path under the given ID.
+
+        Returns:
+            The normalized path that was stored
+        """
+        normalized = normalize_path(path)
+        self._files[file_id] = normalized
+        self._ids[normalized] = file_id
+        self._size = len(self._files)
+        return normalized
+
+    def remove(self, file_id: int) -> Optional[str]:
+        """Remove a file by ID.
+
+        Returns:
+            The removed path, or None if the ID was not present
+        """
+        if file_id not in self._files:
+            return None
+        path = self._files.pop(file_id)
+        normalized = normalize_path(path)
+        if self._ids.get(normalized) == file_id:
+            del self._ids[normalized]
+        self._size = len(self._files)
+        return path
+
+    def items(self) -> Iterator[Tuple[int, str]]:
+        """Iterate over (ID, path) pairs in insertion order."""
+        return iter(self._files.items())
+
+    def paths(self) -> List[str]:
+        """Get all paths in insertion order."""
+        return list(self._files.values())
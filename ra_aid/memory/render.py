@@ -0,0 +1,139 @@
+"""Cached markdown rendering of memory collections."""
+
+import threading
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+Items = Union[Mapping[int, Any], Sequence[Any]]
+
+
+class CachedRenderer:
+    """Render a memory collection to markdown, reusing previous work.
+
+    Each item is formatted once into a block and the joined text is cached
+    against the collection's version counter. While the version is unchanged
+    the cached text is returned as-is. When items were only appended since the
+    last render, just the new blocks are formatted and appended; this also
+    holds across snapshots, which are new containers sharing the same items.
+
+    Dict collections are rendered in ascending ID order, list collections in
+    list order. A renderer may be shared by threads rendering the same session.
+
+    Args:
+        format_item: Function formatting one (ID or index, value) pair into a block
+        separator: Text placed between blocks
+    """
+
+    def __init__(self, format_item: Callable[[int, Any], str], separator: str = "\n\n"):
+        self._format_item = format_item
+        self._separator = separator
+        self._blocks: Dict[int, Tuple[Any, str]] = {}
+        self._text = ""
+        self._container: Optional[Items] = None
+        self._version: Optional[int] = None
+        self._count = 0
+        self._last: Optional[Tuple[int, Any]] = None
+        self._lock = threading.RLock()
+
+    def invalidate(self) -> None:
+        """Drop the cached text so the next render rejoins every block.
+
+        Needed when an existing item is replaced in place, which a version bump
+        alone cannot distinguish from an append.
+        """
+        with self._lock:
+            self._container = None
+            self._last = None
+
+    def render(self, items: Items, version: int) -> str:
+        """Render the collection.
+
+        Args:
+            items: The collection to render
+            version: Counter bumped whenever the collection changes
+
+        Returns:
+            The rendered blocks joined by the separator, or an empty string
+        """
+        with self._lock:
+            if not items:
+                self._reset(items, version)
+                return ""
+
+            if self._container is items and self._version == version and self._count == len(items):
+                return self._text
+            appended = self._appended_items(items)
+            if appended is not None:
+                self._text += self._separator + self._separator.join(
+                    self.block(key, value) for key, value in appended
+                )
+                self._remember(items, version, appended[-1])
+                return self._text
+
+            return self._rebuild(items, version)
+
+    def _reset(self, items: Items, version: int) -> None:
+        self._blocks = {}
+        self._text = ""
+        self._container = items
+        self._version = version
+        self._count = 0
+        self._last = None
+
+    def _remember(self, items: Items, version: int, last: Tuple[int, Any]) -> None:
+        self._container = items
+        self._version = version
+        self._count = len(items)
+        self._last = last
+
+    def block(self, key: int, value: Any) -> str:
+        """Format a single item, reusing its block if the value is unchanged."""
+        with self._lock:
+            cached = self._blocks.get(key)
+            if cached is not None and cached[0] is value:
+                return cached[1]
+            block = self._format_item(key, value)
+            self._blocks[key] = (value, block)
+            return block
+
+    def _appended_items(self, items: Items) -> Optional[List[Tuple[int, Any]]]:
+        """Return the items added after the last rendered one, or None if the
+        collection changed in any other way."""
+        extra = len(items) - self._count
+        if extra <= 0 or self._last is None:
+            return None
+        last_key, last_value = self._last
+
+        if isinstance(items, Mapping):
+            # Mappings, and mappingproxy in particular, are only reversible from Python 3.9
+            keys = reversed(list(items))
+            new_keys = [next(keys) for _ in range(extra)]
+            boundary = next(keys)
+            if boundary != last_key or items[boundary] is not last_value:
+                return None
+            new_keys.reverse()
+            previous = last_key
+            for key in new_keys:
+                if key <= previous:
+                    return None
+                previous = key
+            return [(key, items[key]) for key in new_keys]
+
+        if items[last_key] is not last_value:
+            return None
+        return list(enumerate(items[self._count:], start=self._count))
+
+    def _rebuild(self, items: Items, version: int) -> str:
+        pairs = sorted(items.items()) if isinstance(items, Mapping) else list(enumerate(items))
+        previous_blocks = self._blocks
+        self._blocks = {}
+        blocks = []
+        for key, value in pairs:
+            cached = previous_blocks.get(key)
+            if cached is not None and cached[0] is value:
+                self._blocks[key] = cached
+                blocks.append(cached[1])
+            else:
+                blocks.append(self.block(key, value))
+        self._text = self._separator.join(blocks)
+        self._remember(items, version, pairs[-1])
+        return self._text
@@ -0,0 +1,241 @@
+"""Context-local memory sessions.
+
+All agent memory lives in a `MemorySession`: the memory dict the tools read
+and write, the expert context, the WebUI component state, the LangGraph
+checkpoints of the session's agents, and everything
+derived from them (persistence backend, indexes, render caches). The session
+in effect is resolved through a context variable, so concurrent agent runs in
+one process, whether threads or asyncio tasks, each see their own state.
+
+Code outside any `memory_session()` block uses a process-wide default
+session, which keeps single-run use such as the CLI unchanged.
+
+Within a session each collection has its own lock, held by writers for the
+length of one tool call, and ID counters are advanced under their own lock so
+concurrent sub-agents never hand out the same ID. Readers render from
+immutable snapshots that are copied at most once per collection version.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, MutableMapping, Optional, Tuple
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from .backend import MemoryBackend
+from .changes import ChangeFeed
+from .facts import FactIndex
+from .related_files import RelatedFilesIndex
+from .snippets import SnippetIntervalIndex
+from .work_log import WorkLogArchive, WorkLogLimits
+
+
+def new_memory_state() -> Dict[str, Any]:
+    """Create the initial agent memory dict of a session."""
+    return {
+        'research_notes': [],
+        'plans': [],
+        'tasks': {},  # Dict[int, str] - ID to task mapping
+        'task_completed': False,  # Flag indicating if task is complete
+        'completion_message': '',  # Message explaining completion
+        'task_id_counter': 1,  # Counter for generating unique task IDs
+        'task_dependencies': {},  # Dict[int, List[int]] - IDs of the tasks each task depends on
+        'task_files': {},  # Dict[int, List[str]] - Files each task writes
+        'key_facts': {},  # Dict[int, str] - ID to fact mapping
+        'key_fact_id_counter': 1,  # Counter for generating unique fact IDs
+        'key_snippets': {},  # Dict[int, SnippetRecord] - ID to snippet mapping
+        'key_snippet_id_counter': 1,  # Counter for generating unique snippet IDs
+        'key_snippet_aliases': {},  # Dict[int, int] - IDs of merged-away snippets to the snippet holding them
+        'key_snippet_stamps': {},  # Dict[int, SnippetStamp] - File mtime, size and region hash per snippet
+        'implementation_requested': False,
+        'related_files': {},  # Dict[int, str] - ID to filepath mapping
+        'related_file_id_counter': 1,  # Counter for generating unique file IDs
+        'plan_completed': False,
+        'agent_depth': 0,
+        'work_log': [],  # List[WorkLogRecord] - Most recent timestamped work events
+        'work_log_digest': None,  # Optional[WorkLogDigest] - Counts by kind of compacted entries
+    }
+
+
+class MemorySession:
+    """Memory and derived state of one agent run.
+
+    Args:
+        backend: Persistence backend for the memory; the default keeps nothing
+    """
+
+    def __init__(self, backend: Optional[MemoryBackend] = None):
+        self.memory: Dict[str, Any] = new_memory_state()
+        self.expert_context: Dict[str, Any] = {
+            'text': [],    # Additional textual context
+            'files': []    # File paths to include
+        }
+        # State of the WebUI components for this run
+        self.component_memory: Dict[str, Any] = {}
+        # LangGraph checkpoints of every agent run in this session, one thread each
+        self.checkpointer = MemorySaver()
+
+        self.backend: MemoryBackend = backend or MemoryBackend()
+        # Per-collection change counters, bumped by every tool that mutates a collection
+        self.versions: Dict[str, int] = {}
+        # Item-level log of changes to facts, snippets, tasks and related files
+        self.changes = ChangeFeed()
+        # Near-duplicate index over memory['key_facts']
+        self.key_facts_index = FactIndex()
+        # Path to ID index over memory['related_files']
+        self.related_files_index = RelatedFilesIndex()
+        # Per-file line range index over memory['key_snippets']
+        self.key_snippets_index = SnippetIntervalIndex()
+        # Markdown renderers reused across prompt builds, created on first use
+        self.renderers: Dict[str, Any] = {}
+        # Caps on the in-memory work log and the file compacted entries are moved to
+        self.work_log_limits = WorkLogLimits()
+        self.work_log_archive = WorkLogArchive()
+        # Copy of the parent's memory this session was forked from, if any
+        self.forked_from: Optional[Dict[str, Any]] = None
+
+        self._locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+        # Collection -> (version, live container, length, snapshot)
+        self._snapshots: Dict[str, Tuple[int, Any, int, Any]] = {}
+
+    def lock(self, key: str) -> threading.RLock:
+        """Get the reentrant lock guarding one memory key.
+
+        Take collection locks before counter locks and the work log lock last,
+        which is the order the memory tools nest them in.
+        """
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(key, threading.RLock())
+        return lock
+
+    def allocate_id(self, counter: str) -> int:
+        """Atomically take the next value of an ID counter in memory.
+
+        Args:
+            counter: Memory key of the counter, e.g. 'key_fact_id_counter'
+
+        Returns:
+            The allocated ID; the counter is left one past it
+        """
+        with self.lock(counter):
+            allocated = self.memory[counter]
+            self.memory[counter] = allocated + 1
+            return allocated
+
+    def bump_version(self, collection: str) -> None:
+        """Record that a collection changed, invalidating its snapshot."""
+        with self.lock(collection):
+            self.versions[collection] = self.versions.get(collection, 0) + 1
+
+    def snapshot(self, collection: str) -> Any:
+        """Get an immutable copy of a collection.
+
+        Dicts are returned as read-only mappings and lists as tuples; other
+        values as they are. The copy is taken under the collection lock and
+        reused until the collection's version changes, so repeated reads
+        between writes cost nothing and never hold up writers afterwards.
+        """
+        live = self.memory.get(collection)
+        version = self.versions.get(collection, 0)
+        cached = self._snapshots.get(collection)
+        if (cached is not None and cached[0] == version and cached[1] is live
+                and cached[2] == len(live)):
+            return cached[3]
+
+        with self.lock(collection):
+            live = self.memory.get(collection)
+            version = self.versions.get(collection, 0)
+            if isinstance(live, dict):
+                frozen = MappingProxyType(dict(live))
+            elif isinstance(live, list):
+                frozen = tuple(live)
+            else:
+                return live
+            self._snapshots[collection] = (version, live, len(live), frozen)
+        return frozen
+
+
+_default_session = MemorySession()
+_current_session: ContextVar[Optional[MemorySession]] = ContextVar('ra_aid_memory_session', default=None)
+
+
+def current_session() -> MemorySession:
+    """Get the memory session in effect for the current context."""
+    session = _current_session.get()
+    return _default_session if session is None else session
+
+
+@contextmanager
+def memory_session(session: Optional[MemorySession] = None) -> Iterator[MemorySession]:
+    """Run a block against its own memory session.
+
+    Agents and memory tools called inside the block, including from asyncio
+    tasks and from threads started with a copy of the context, read and write
+    the given session only.
+
+    Args:
+        session: Session to use; a fresh one if omitted
+
+    Yields:
+        The session in effect
+    """
+    session = MemorySession() if session is None else session
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
+
+class SessionDict(MutableMapping):
+    """Dict view of one attribute of the current memory session.
+
+    Module-level names like `_global_memory` are instances of this class, so
+    existing `name[key]` reads and writes resolve to the session in effect at
+    the time of the access.
+
+    Args:
+        attribute: Name of the MemorySession dict attribute to expose
+    """
+
+    def __init__(self, attribute: str):
+        self._attribute = attribute
+
+    def target(self) -> Dict[str, Any]:
+        """Get the underlying dict of the current session."""
+        return getattr(current_session(), self._attribute)
+
+    def __getitem__(self, key):
+        return self.target()[key]
+
+    def __setitem__(self, key, value):
+        self.target()[key] = value
+
+    def __delitem__(self, key):
+        del self.target()[key]
+
+    def __iter__(self):
+        return iter(self.target())
+
+    def __len__(self):
+        return len(self.target())
+
+    def __contains__(self, key):
+        return key in self.target()
+
+    def get(self, key, default=None):
+        return self.target().get(key, default)
+
+    def clear(self):
+        self.target().clear()
+
+    def copy(self) -> Dict[str, Any]:
+        return self.target().copy()
+
+    def __repr__(self):
+        return repr(self.target())
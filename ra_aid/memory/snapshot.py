@@ -0,0 +1,139 @@
+"""Compact binary snapshots of a memory session.
+
+A snapshot holds everything needed to resume a session on another worker
+without replaying LLM calls: the agent memory, the expert context and every
+LangGraph checkpoint of the session. It is one msgpack document, compressed
+with zstd when the `zstandard` package is installed and with zlib otherwise.
+
+Checkpoints are read and written through the public checkpointer API and
+serialized with the checkpointer's own serializer, so any checkpointer can be
+snapshotted and the restored one holds the same checkpoint IDs and writes.
+"""
+
+import os
+import struct
+import tempfile
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, List
+
+import ormsgpack
+
+from ra_aid.exceptions import SessionSnapshotError
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+_MAGIC = b"RAAIDSES"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct(">8sBB")
+
+_CODEC_ZLIB = 1
+_CODEC_ZSTD = 2
+
+
+def _encode(value: Any) -> Any:
+    """Encode record types, which are read-only mappings, as msgpack maps."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} cannot be stored in a session snapshot")
+
+
+def dump_checkpoints(checkpointer: Any) -> List[List[Any]]:
+    """Serialize every checkpoint and pending write held by a checkpointer.
+
+    Returns:
+        One [config, parent config, checkpoint, metadata, writes] entry per
+        checkpoint, with checkpoint, metadata and write values as
+        (type, bytes) pairs from the checkpointer's serializer
+    """
+    serde = checkpointer.serde
+    dumped = []
+    for saved in checkpointer.list(None):
+        dumped.append([
+            dict(saved.config['configurable']),
+            dict(saved.parent_config['configurable']) if saved.parent_config else None,
+            list(serde.dumps_typed(saved.checkpoint)),
+            list(serde.dumps_typed(saved.metadata)),
+            [[task_id, channel, list(serde.dumps_typed(value))]
+             for task_id, channel, value in saved.pending_writes or ()],
+        ])
+    return dumped
+
+
+def restore_checkpoints(checkpointer: Any, dumped: List[List[Any]]) -> None:
+    """Write checkpoints produced by `dump_checkpoints` into a checkpointer."""
+    serde = checkpointer.serde
+    for configurable, parent, checkpoint, metadata, writes in dumped:
+        checkpoint = serde.loads_typed(tuple(checkpoint))
+        if parent is None:
+            parent = {key: configurable[key] for key in ('thread_id', 'checkpoint_ns')}
+        checkpointer.put(
+            {'configurable': parent},
+            checkpoint,
+            serde.loads_typed(tuple(metadata)),
+            checkpoint['channel_versions'],
+        )
+
+        # Writes are stored per task, in the order the task made them
+        by_task: Dict[str, List[Any]] = {}
+        for task_id, channel, value in writes:
+            by_task.setdefault(task_id, []).append((channel, serde.loads_typed(tuple(value))))
+        for task_id, task_writes in by_task.items():
+            checkpointer.put_writes({'configurable': configurable}, task_writes, task_id)
+
+
+def write_snapshot(path: str, state: Dict[str, Any]) -> int:
+    """Write a state dict to a snapshot file, replacing it atomically.
+
+    Returns:
+        Size of the written file in bytes
+    """
+    packed = ormsgpack.packb(state, default=_encode, option=ormsgpack.OPT_NON_STR_KEYS)
+    if zstandard is not None:
+        codec, body = _CODEC_ZSTD, zstandard.ZstdCompressor(level=3).compress(packed)
+    else:
+        codec, body = _CODEC_ZLIB, zlib.compress(packed, 6)
+    data = _HEADER.pack(_MAGIC, _FORMAT_VERSION, codec) + body
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".ra-aid-session-", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(data)
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """Read the state dict stored in a snapshot file.
+
+    Raises:
+        SessionSnapshotError: If the file is not a snapshot, was written by a
+            newer format version, or needs `zstandard` and it is not installed
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise SessionSnapshotError(f"{path} is not a session snapshot")
+    magic, version, codec = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise SessionSnapshotError(f"{path} is not a session snapshot")
+    if version > _FORMAT_VERSION:
+        raise SessionSnapshotError(f"{path} uses snapshot format {version}; this version reads up to {_FORMAT_VERSION}")
+
+    body = memoryview(data)[_HEADER.size:]
+    if codec == _CODEC_ZSTD:
+        if zstandard is None:
+            raise SessionSnapshotError(f"{path} is zstd-compressed; install the zstandard package to load it")
+        packed = zstandard.ZstdDecompressor().decompress(body)
+    elif codec == _CODEC_ZLIB:
+        packed = zlib.decompress(body)
+    else:
+        raise SessionSnapshotError(f"{path} uses unknown compression codec {codec}")
+    return ormsgpack.unpackb(packed, option=ormsgpack.OPT_NON_STR_KEYS)
@@ -0,0 +1,147 @@
+"""Per-file interval index over key snippets.
+
+Snippets of the same file whose line ranges overlap or touch are merged into
+one snippet at insert time, so each region of code is stored and rendered once.
+"""
+
+from bisect import bisect_right, insort
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .related_files import normalize_path
+
+
+def snippet_span(snippet: Mapping[str, Any]) -> Optional[Tuple[int, int]]:
+    """Get the first and last line covered by a snippet.
+
+    Returns:
+        The inclusive (start, end) line range, or None if the snippet has no
+        usable line number
+    """
+    start = snippet.get('line_number')
+    if not isinstance(start, int) or start < 1:
+        return None
+    return start, start + max(len(snippet['snippet'].splitlines()), 1) - 1
+
+
+def merge_snippets(snippets: List[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Merge snippets of one file covering overlapping or adjacent ranges.
+
+    Lines are laid out by line number; where snippets overlap, later snippets
+    in the list win. The merged snippet keeps the highest relevance and every
+    distinct description.
+
+    Args:
+        snippets: Snippets to merge, oldest first
+
+    Returns:
+        A single snippet covering the union of the input ranges
+    """
+    lines: Dict[int, str] = {}
+    for snippet in snippets:
+        for offset, line in enumerate(snippet['snippet'].splitlines()):
+            lines[snippet['line_number'] + offset] = line
+
+    start = min(snippet['line_number'] for snippet in snippets)
+    end = max(lines) if lines else start
+    descriptions = []
+    for snippet in snippets:
+        if snippet.get('description') and snippet['description'] not in descriptions:
+            descriptions.append(snippet['description'])
+
+    return {
+        'filepath': snippets[0]['filepath'],
+        'line_number': start,
+        'snippet': "\n".join(lines.get(number, "") for number in range(start, end + 1)),
+        'description': "\n".join(descriptions) or None,
+        'source': f"{snippets[0]['filepath']}:{start}",
+        'relevance': max((snippet.get('relevance') or 0.0) for snippet in snippets),
+    }
+
+
+class SnippetIntervalIndex:
+    """Sorted line ranges of the stored snippets, grouped by normalized file path.
+
+    Like the related files index, it mirrors an ID to snippet dict and is
+    rebuilt whenever that dict is replaced or changed behind its back. Ranges
+    within a file need not be disjoint, e.g. after snippets were relocated;
+    a lookup scans back from its end line only as far as the longest range
+    of the file could reach.
+    """
+
+    def __init__(self):
+        self._snippets: Optional[Dict[int, Any]] = None
+        self._ranges: Dict[str, List[Tuple[int, int, int]]] = {}
+        # Longest range ever indexed per file, in lines minus one
+        self._longest: Dict[str, int] = {}
+        self._size = 0
+
+    def bind(self, snippets: Dict[int, Any]) -> "SnippetIntervalIndex":
+        """Point the index at an ID to snippet dict, rebuilding it if needed."""
+        if snippets is not self._snippets or len(snippets) != self._size:
+            self._snippets = snippets
+            self._ranges = {}
+            self._longest = {}
+            for snippet_id, snippet in snippets.items():
+                self._insert(snippet_id, snippet)
+            self._size = len(snippets)
+        return self
+
+    def overlapping(self, snippet: Mapping[str, Any]) -> List[int]:
+        """Get the IDs of stored snippets overlapping or adjacent to a snippet, lowest first."""
+        span = snippet_span(snippet)
+        path = normalize_path(snippet['filepath'])
+        ranges = self._ranges.get(path)
+        if span is None or not ranges:
+            return []
+        start, end = span
+
+        matches = []
+        # No range starting before this can reach the snippet
+        earliest = start - 1 - self._longest[path]
+        position = bisect_right(ranges, (end + 1, float('inf'), float('inf')))
+        while position > 0:
+            position -= 1
+            range_start, range_end, snippet_id = ranges[position]
+            if range_start < earliest:
+                break
+            if range_end >= start - 1:
+                matches.append(snippet_id)
+        return sorted(matches)
+
+    def files(self) -> Dict[str, List[int]]:
+        """Get the IDs of indexed snippets grouped by normalized file path."""
+        return {path: [snippet_id for _, _, snippet_id in ranges] for path, ranges in self._ranges.items()}
+
+    def add(self, snippet_id: int, snippet: Any) -> None:
+        """Store a snippet under an ID and index its range."""
+        self._snippets[snippet_id] = snippet
+        self._insert(snippet_id, snippet)
+        self._size = len(self._snippets)
+
+    def remove(self, snippet_id: int) -> Optional[Any]:
+        """Remove a snippet by ID.
+
+        Returns:
+            The removed snippet, or None if the ID was not present
+        """
+        if snippet_id not in self._snippets:
+            return None
+        snippet = self._snippets.pop(snippet_id)
+        span = snippet_span(snippet)
+        path = normalize_path(snippet['filepath'])
+        if span is not None and path in self._ranges:
+            entry = (span[0], span[1], snippet_id)
+            ranges = self._ranges[path]
+            if entry in ranges:
+                ranges.remove(entry)
+            if not ranges:
+                del self._ranges[path]
+        self._size = len(self._snippets)
+        return snippet
+
+    def _insert(self, snippet_id: int, snippet: Any) -> None:
+        span = snippet_span(snippet)
+        if span is not None:
+            path = normalize_path(snippet['filepath'])
+            insort(self._ranges.setdefault(path, []), (span[0], span[1], snippet_id))
+            self._longest[path] = max(self._longest.get(path, 0), span[1] - span[0])
@@ -0,0 +1,161 @@
+"""Staleness tracking for key snippets.
+
+Each snippet is stamped with the modification time and size of its file and
+a hash of the file lines it covers. Revalidation costs one `stat` per file
+and only re-reads files whose stat changed. A changed snippet is relocated if
+its lines moved, refreshed from the file if only its anchor line can be
+found, or flagged as stale otherwise.
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .snippets import snippet_span
+
+# Stamp: {'mtime_ns': int, 'size': int, 'hash': str}
+SnippetStamp = Dict[str, Any]
+# Cache of file reads shared across one batch: path -> (stat result, lines), or None if unreadable
+FileCache = Dict[str, Optional[Tuple[os.stat_result, List[str]]]]
+
+
+def region_hash(lines: List[str], start: int, count: int) -> str:
+    """Hash `count` file lines starting at 1-based line `start`, ignoring trailing whitespace."""
+    region = lines[start - 1:start - 1 + count]
+    return hashlib.sha1("\n".join(line.rstrip() for line in region).encode('utf-8')).hexdigest()
+
+
+def _read_file(path: str, cache: FileCache) -> Optional[Tuple[os.stat_result, List[str]]]:
+    if path not in cache:
+        try:
+            stat = os.stat(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                cache[path] = (stat, f.read().splitlines())
+        except (OSError, UnicodeDecodeError):
+            cache[path] = None
+    return cache[path]
+
+
+def stamp_snippet(snippet: Mapping[str, Any], cache: Optional[FileCache] = None) -> Optional[SnippetStamp]:
+    """Record the current state of the file region a snippet covers.
+
+    Args:
+        snippet: The snippet to stamp
+        cache: Optional cache of file reads shared across a batch of snippets
+
+    Returns:
+        The stamp, or None if the snippet has no line range or its file cannot be read
+    """
+    span = snippet_span(snippet)
+    if span is None:
+        return None
+    read = _read_file(snippet['filepath'], {} if cache is None else cache)
+    if read is None:
+        return None
+    stat, lines = read
+    return {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'hash': region_hash(lines, span[0], span[1] - span[0] + 1),
+    }
+
+
+def _anchor_line(snippet: Mapping[str, Any]) -> Optional[str]:
+    for line in snippet['snippet'].splitlines():
+        if line.strip():
+            return line.strip()
+    return None
+
+
+def _revalidate(snippet: Dict[str, Any], stamp: SnippetStamp, stat: os.stat_result,
+                lines: List[str]) -> Tuple[Dict[str, Any], SnippetStamp]:
+    start, end = snippet_span(snippet)
+    count = end - start + 1
+    fresh_stamp = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'hash': stamp['hash']}
+
+    # Unchanged region: the file changed elsewhere
+    if region_hash(lines, start, count) == stamp['hash']:
+        return _without_stale_flag(snippet), fresh_stamp
+
+    anchor = _anchor_line(snippet)
+    anchor_offset = 0
+    if anchor is not None:
+        anchor_offset = next(offset for offset, line in enumerate(snippet['snippet'].splitlines())
+                             if line.strip() == anchor)
+    candidates = [number - anchor_offset for number, line in enumerate(lines, start=1)
+                  if anchor is not None and line.strip() == anchor and number - anchor_offset >= 1]
+    candidates.sort(key=lambda candidate: abs(candidate - start))
+
+    # Region moved intact: relocate
+    for candidate in candidates:
+        if region_hash(lines, candidate, count) == stamp['hash']:
+            relocated = _without_stale_flag(snippet)
+            relocated.update(line_number=candidate, source=f"{snippet['filepath']}:{candidate}")
+            return relocated, fresh_stamp
+
+    # Region changed but its anchor line is unambiguous: refresh from the file
+    if len(candidates) == 1:
+        candidate = candidates[0]
+        refreshed = _without_stale_flag(snippet)
+        refreshed.update(
+            line_number=candidate,
+            source=f"{snippet['filepath']}:{candidate}",
+            snippet="\n".join(lines[candidate - 1:candidate - 1 + count]),
+        )
+        fresh_stamp['hash'] = region_hash(lines, candidate, count)
+        return refreshed, fresh_stamp
+
+    # Keep the stale stamp so a later revert of the file is still recognized
+    flagged = dict(snippet, stale=True) if not snippet.get('stale') else snippet
+    return flagged, dict(fresh_stamp, hash=stamp['hash'])
+
+
+def _without_stale_flag(snippet: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in snippet.items() if key != 'stale'}
+
+
+def revalidate_snippets(
+    snippets: Mapping[int, Dict[str, Any]],
+    stamps: Mapping[int, SnippetStamp],
+    files: Mapping[str, List[int]],
+) -> Dict[int, Tuple[Dict[str, Any], SnippetStamp]]:
+    """Check stamped snippets against their files.
+
+    Args:
+        snippets: ID to snippet mapping
+        stamps: ID to stamp mapping; unstamped snippets are not checked
+        files: Snippet IDs grouped by file path
+
+    Returns:
+        The new (snippet, stamp) pair of every snippet whose stamp or content
+        changed. A returned snippet is a new dict whenever its content changed;
+        stale snippets carry a 'stale': True flag.
+    """
+    changes = {}
+    for path, snippet_ids in files.items():
+        stamped = [snippet_id for snippet_id in snippet_ids if snippet_id in stamps and snippet_id in snippets]
+        if not stamped:
+            continue
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            for snippet_id in stamped:
+                if not snippets[snippet_id].get('stale'):
+                    changes[snippet_id] = (dict(snippets[snippet_id], stale=True), stamps[snippet_id])
+            continue
+
+        if all(stamps[snippet_id]['mtime_ns'] == stat.st_mtime_ns and stamps[snippet_id]['size'] == stat.st_size
+               for snippet_id in stamped):
+            continue
+
+        read = _read_file(path, {})
+        if read is None:
+            continue
+        stat, lines = read
+        for snippet_id in stamped:
+            snippet, stamp = _revalidate(snippets[snippet_id], stamps[snippet_id], stat, lines)
+            if snippet == snippets[snippet_id]:
+                snippet = snippets[snippet_id]
+            changes[snippet_id] = (snippet, stamp)
+    return changes
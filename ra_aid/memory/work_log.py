@@ -0,0 +1,172 @@
+"""Bounded work log with rolling compaction.
+
+The in-memory work log is capped by entry count and size. When it grows past
+either cap, the oldest entries are folded into a digest of event counts by
+kind and moved to an append-only JSONL archive on disk, leaving the most
+recent entries verbatim. The digest is deterministic and costs nothing to
+render, so prompts see a short summary of earlier work instead of every event.
+"""
+
+import json
+import os
+import re
+import tempfile
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Digest: {'entries': int, 'first_timestamp': str, 'last_timestamp': str, 'kinds': {kind: count}}
+WorkLogDigest = Dict[str, Any]
+
+_ID_PATTERN = re.compile(r"#?\d+|\[[^\]]*\]")
+
+
+@dataclass(frozen=True)
+class WorkLogLimits:
+    """Caps on the in-memory work log.
+
+    Attributes:
+        max_entries: Compact once the log holds more entries than this
+        max_bytes: Compact once the events take more UTF-8 bytes than this
+        keep_recent: Entries kept verbatim after compacting
+    """
+    max_entries: int = 40
+    max_bytes: int = 16 * 1024
+    keep_recent: int = 10
+
+
+def event_kind(event: str) -> str:
+    """Classify an event by its first line with IDs, counts and ID lists removed.
+
+    For example "Task #3 added:" and "Task #7 added:" are both "Task added".
+    """
+    first_line = event.strip().split("\n", 1)[0]
+    kind = " ".join(_ID_PATTERN.sub(" ", first_line).rstrip(" :.").split())
+    return kind or "Other"
+
+
+def entry_size(entry: Mapping[str, Any]) -> int:
+    """Size of an entry's event in UTF-8 bytes."""
+    return len(entry['event'].encode('utf-8'))
+
+
+def needs_compaction(entries: Sequence[Mapping[str, Any]], limits: WorkLogLimits) -> bool:
+    """Check whether the log exceeds its entry or byte cap."""
+    if len(entries) > limits.max_entries:
+        return True
+    return sum(entry_size(entry) for entry in entries) > limits.max_bytes
+
+
+def split_for_compaction(entries: Sequence[Mapping[str, Any]], limits: WorkLogLimits) -> int:
+    """Get how many of the oldest entries to compact.
+
+    Keeps at most `keep_recent` entries, fewer if they still exceed the byte
+    cap, but always keeps the latest entry.
+    """
+    cut = max(len(entries) - limits.keep_recent, 0)
+    size = sum(entry_size(entry) for entry in entries[cut:])
+    while cut < len(entries) - 1 and size > limits.max_bytes:
+        size -= entry_size(entries[cut])
+        cut += 1
+    return cut
+
+
+def fold_into_digest(digest: Optional[WorkLogDigest], entries: Sequence[Mapping[str, Any]]) -> WorkLogDigest:
+    """Add entries to a digest, returning a new digest."""
+    if digest is None:
+        digest = {'entries': 0, 'first_timestamp': entries[0]['timestamp'], 'last_timestamp': None, 'kinds': {}}
+    kinds = dict(digest['kinds'])
+    for entry in entries:
+        kind = event_kind(entry['event'])
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return {
+        'entries': digest['entries'] + len(entries),
+        'first_timestamp': digest['first_timestamp'],
+        'last_timestamp': entries[-1]['timestamp'],
+        'kinds': kinds,
+    }
+
+
+def format_digest(digest: WorkLogDigest) -> str:
+    """Render a digest as a markdown section, most frequent kinds first."""
+    lines = [
+        "## Earlier work (compacted)",
+        f"{digest['entries']} earlier entries from {digest['first_timestamp']} to {digest['last_timestamp']}:",
+    ]
+    # Stable sort keeps first-seen order among equal counts
+    for kind, count in sorted(digest['kinds'].items(), key=lambda item: -item[1]):
+        lines.append(f"- {kind}: {count}")
+    return "\n".join(lines)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class WorkLogArchive:
+    """Append-only JSONL file holding compacted work log entries.
+
+    A temporary file is deleted by `discard`, or once the archive itself is
+    garbage collected, e.g. with the session or fork it belongs to. A file
+    given by path is kept.
+
+    Args:
+        path: File to append to; a temporary file is created on first write if omitted
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def append(self, entries: Sequence[Mapping[str, Any]]) -> None:
+        """Append entries to the archive."""
+        if self.path is None:
+            fd, self.path = tempfile.mkstemp(prefix="ra-aid-work-log-", suffix=".jsonl")
+            os.close(fd)
+            self._finalizer = weakref.finalize(self, _remove_file, self.path)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(dict(entry)) + "\n")
+
+    def read(self) -> List[Dict[str, Any]]:
+        """Read every archived entry, oldest first."""
+        if self.path is None or not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def clear(self) -> None:
+        """Remove every archived entry."""
+        if self.path is not None and os.path.exists(self.path):
+            open(self.path, 'w').close()
+
+    def discard(self) -> None:
+        """Delete the archive's temporary file, emptying the archive."""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self.path = None
+
+
+def compact(
+    entries: List[Dict[str, Any]],
+    digest: Optional[WorkLogDigest],
+    limits: WorkLogLimits,
+) -> Tuple[List[Dict[str, Any]], Optional[WorkLogDigest]]:
+    """Compact a log in place if it exceeds its caps.
+
+    Returns:
+        The entries removed from the front of the log and the updated digest;
+        no entries and the unchanged digest if the log is within its caps
+    """
+    if not needs_compaction(entries, limits):
+        return [], digest
+    cut = split_for_compaction(entries, limits)
+    evicted = entries[:cut]
+    if not evicted:
+        return [], digest
+    del entries[:cut]
+    return evicted, fold_into_digest(digest, evicted)
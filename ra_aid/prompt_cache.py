@@ -0,0 +1,188 @@
+"""Provider prompt-prefix caching for agent prompts.
+
+Agent prompts put their instructions, which are the same for every task,
+before `TASK_CONTEXT_HEADER` and the task and memory context after it. With
+the tool schemas, which providers place ahead of the messages, the
+instructions form a prefix shared by every run of the same kind of agent,
+and each turn of a run repeats the previous turn's request as its prefix.
+
+OpenAI caches such prefixes automatically. Anthropic caches up to explicit
+breakpoints, so for Anthropic models `add_cache_breakpoints` marks the end
+of the instructions and the end of the latest message before every model
+call. The breakpoints are added to the model input only; the agent state
+keeps plain messages, so a run can resume or fail over on any provider.
+
+`CacheUsageCallback` records the cache-read and cache-write tokens and the
+latency of every call, per provider and model, whatever the provider.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from ra_aid.logging_config import get_logger
+from ra_aid.prompts import TASK_CONTEXT_HEADER
+
+logger = get_logger(__name__)
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def supports_prompt_caching(model: Any) -> bool:
+    """Whether a model caches prompt prefixes up to explicit breakpoints."""
+    return getattr(model, "_llm_type", None) == "anthropic-chat"
+
+
+def _with_breakpoint(content: Any) -> Any:
+    """Copy message content with a cache breakpoint on its last text block."""
+    if isinstance(content, str):
+        return [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}] if content else content
+    blocks = list(content)
+    for index in range(len(blocks) - 1, -1, -1):
+        block = blocks[index]
+        if isinstance(block, str):
+            block = {"type": "text", "text": block}
+        if isinstance(block, dict) and block.get("type") == "text" and block.get("text"):
+            blocks[index] = {**block, "cache_control": CACHE_CONTROL}
+            return blocks
+    return content
+
+
+def add_cache_breakpoints(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Copy an agent's messages with cache breakpoints for the model input.
+
+    The first human message is split after its instructions, which get a
+    breakpoint, and the last message gets one, so a call reuses both the
+    instructions cached by earlier runs and the history cached by the
+    previous turn.
+    """
+    messages = list(messages)
+    for index, message in enumerate(messages):
+        if isinstance(message, HumanMessage):
+            if isinstance(message.content, str) and TASK_CONTEXT_HEADER in message.content:
+                instructions, context = message.content.split(TASK_CONTEXT_HEADER, 1)
+                messages[index] = message.model_copy(update={"content": [
+                    {"type": "text", "text": instructions, "cache_control": CACHE_CONTROL},
+                    {"type": "text", "text": TASK_CONTEXT_HEADER.lstrip() + context},
+                ]})
+            break
+    if messages:
+        messages[-1] = messages[-1].model_copy(update={"content": _with_breakpoint(messages[-1].content)})
+    return messages
+
+
+def strip_cache_breakpoints(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Copy messages without cache breakpoints, for models of other providers."""
+    stripped = []
+    for message in messages:
+        if isinstance(message.content, list) and any(
+                isinstance(block, dict) and "cache_control" in block for block in message.content):
+            message = message.model_copy(update={"content": [
+                {key: value for key, value in block.items() if key != "cache_control"}
+                if isinstance(block, dict) else block
+                for block in message.content
+            ]})
+        stripped.append(message)
+    return stripped
+
+
+def cache_breakpoint_prompt(state: Dict[str, Any]) -> List[BaseMessage]:
+    """ReAct agent prompt sending the (compacted) history with cache breakpoints."""
+    return add_cache_breakpoints(state["messages"])
+
+
+@dataclass
+class CacheUsage:
+    """Input token and latency totals of the calls to one model.
+
+    Attributes:
+        calls: Calls that reported usage
+        input_tokens: Input tokens, including those read from or written to the cache
+        cache_read_tokens: Input tokens read from the prompt cache
+        cache_write_tokens: Input tokens written to the prompt cache
+        seconds: Total call latency
+    """
+    calls: int = 0
+    input_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of input tokens read from the cache."""
+        return self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0
+
+
+_usage: Dict[str, CacheUsage] = {}
+_usage_lock = threading.Lock()
+
+
+def get_cache_usage() -> Dict[str, CacheUsage]:
+    """Get a copy of the cache usage totals of every model called so far."""
+    with _usage_lock:
+        return {name: replace(usage) for name, usage in _usage.items()}
+
+
+def log_cache_usage() -> None:
+    """Log the cache usage totals of every model called so far."""
+    for name, usage in get_cache_usage().items():
+        logger.info("%s: %d calls, %d input tokens, %.0f%% read from cache, %d written to cache, %.1fs",
+                    name, usage.calls, usage.input_tokens, usage.hit_rate * 100,
+                    usage.cache_write_tokens, usage.seconds)
+
+
+def clear_cache_usage() -> None:
+    """Reset the cache usage totals."""
+    with _usage_lock:
+        _usage.clear()
+
+
+class CacheUsageCallback(BaseCallbackHandler):
+    """Records the prompt cache usage and latency of each call to a model.
+
+    Args:
+        name: Provider and model, e.g. "anthropic/claude-3-5-sonnet-20241022"
+    """
+
+    run_inline = True
+
+    def __init__(self, name: str):
+        self.name = name
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.monotonic()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+    def on_llm_end(self, response: Any, *, run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        seconds = time.monotonic() - started if started is not None else 0.0
+        for generations in getattr(response, "generations", None) or ():
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.record(usage, seconds)
+
+    def record(self, usage: Dict[str, Any], seconds: float) -> None:
+        """Add one call's usage metadata to the totals and log it."""
+        details = usage.get("input_token_details") or {}
+        input_tokens = usage.get("input_tokens", 0) or 0
+        cache_read = details.get("cache_read", 0) or 0
+        cache_write = details.get("cache_creation", 0) or 0
+        with _usage_lock:
+            total = _usage.setdefault(self.name, CacheUsage())
+            total.calls += 1
+            total.input_tokens += input_tokens
+            total.cache_read_tokens += cache_read
+            total.cache_write_tokens += cache_write
+            total.seconds += seconds
+        logger.debug("%s: %d input tokens, %d read from cache, %d written to cache, %.2fs",
+                     self.name, input_tokens, cache_read, cache_write, seconds)
@@ -10,6 +10,16 @@ These updated prompts include instructions to scale complexity:
 - Whenever logic, correctness, or debugging is in doubt, consult the expert (if the expert is available) for deeper analysis, even if the scenario seems straightforward.
 """
 
+# Divides the instructions of an agent prompt, which are the same for every
+# task, from the task and memory context after them, so the instructions form
+# a prefix that provider prompt caches can reuse across turns and agents.
+TASK_CONTEXT_HEADER = """
+
+Task Context
+============
+
+"""
+
 # Expert-specific prompt sections
 EXPERT_PROMPT_SECTION_RESEARCH = """
 Expert Consultation (if expert is available):
@@ -96,19 +106,7 @@ Web Research:
 """
 
 # Research stage prompt - guides initial codebase analysis
-RESEARCH_PROMPT = """User query: {base_task} --keep it simple
-
-Context from Previous Research (if available):
-Key Facts:
-{key_facts}
-
-Relevant Code Snippets:
-{code_snippets}
-
-Related Files:
-{related_files}
-
-Be very thorough in your research and emit lots of snippets, key facts. If you take more than a few steps, be eager to emit research subtasks.{research_only_note}
+RESEARCH_PROMPT = """Be very thorough in your research and emit lots of snippets, key facts. If you take more than a few steps, be eager to emit research subtasks.{research_only_note}
 
 Objective
     Investigate and understand the codebase as it relates to the query.
@@ -225,11 +223,9 @@ You have often been criticized for:
 {human_section}
 
 NEVER ANNOUNCE WHAT YOU ARE DOING, JUST DO IT!
-"""
-
-# Web research prompt - guides web search and information gathering
-WEB_RESEARCH_PROMPT = """User query: {web_research_query}
+""" + TASK_CONTEXT_HEADER + """User query: {base_task} --keep it simple
 
+Context from Previous Research (if available):
 Key Facts:
 {key_facts}
 
@@ -238,8 +234,10 @@ Relevant Code Snippets:
 
 Related Files:
 {related_files}
+"""
 
-Objective:
+# Web research prompt - guides web search and information gathering
+WEB_RESEARCH_PROMPT = """Objective:
     Research and gather comprehensive information from web sources to fully answer the provided query.
     Focus solely on the specific query - do not expand scope or explore tangential topics.
     Continue searching until you have exhaustively answered all aspects of the query.
@@ -297,12 +295,8 @@ You have often been criticized for:
     - Not indicating confidence levels or noting uncertainties
 
 NEVER ANNOUNCE WHAT YOU ARE DOING, JUST DO IT!
-"""
-
-# Research-only prompt - similar to research prompt but without implementation references
-RESEARCH_ONLY_PROMPT = """User query: {base_task} --keep it simple
+""" + TASK_CONTEXT_HEADER + """User query: {web_research_query}
 
-Context from Previous Research (if available):
 Key Facts:
 {key_facts}
 
@@ -311,8 +305,10 @@ Relevant Code Snippets:
 
 Related Files:
 {related_files}
+"""
 
-Be very thorough in your research and emit lots of snippets, key facts. If you take more than a few steps, be eager to emit research subtasks.
+# Research-only prompt - similar to research prompt but without implementation references
+RESEARCH_ONLY_PROMPT = """Be very thorough in your research and emit lots of snippets, key facts. If you take more than a few steps, be eager to emit research subtasks.
 
 Objective
     Investigate and understand the codebase as it relates to the query.
@@ -400,28 +396,22 @@ You have often been criticized for:
   - Not requesting more research tasks when it is truly called for, e.g. to dig deeper into a specific aspect of a monorepo project.
 
 NEVER ANNOUNCE WHAT YOU ARE DOING, JUST DO IT!
-"""
-
-# Planning stage prompt - guides task breakdown and implementation planning
-# Includes a directive to scale complexity with request size and consult the expert (if available) for logic verification and debugging.
-PLANNING_PROMPT = """Base Task:
-{base_task} --keep it simple
-
-Research Notes:
-<notes>
-{research_notes}
-</notes>
-
-Relevant Files:
-{related_files}
+""" + TASK_CONTEXT_HEADER + """User query: {base_task} --keep it simple
 
+Context from Previous Research (if available):
 Key Facts:
 {key_facts}
 
-Key Snippets:
-{key_snippets}
+Relevant Code Snippets:
+{code_snippets}
 
-Fact Management:
+Related Files:
+{related_files}
+"""
+
+# Planning stage prompt - guides task breakdown and implementation planning
+# Includes a directive to scale complexity with request size and consult the expert (if available) for logic verification and debugging.
+PLANNING_PROMPT = """Fact Management:
     Each fact is identified with [Fact ID: X].
     Facts may be deleted if they become outdated, irrelevant, or duplicates.
     Use delete_key_facts([id1, id2, ...]) with a list of numeric Fact IDs to remove unnecessary facts.
@@ -461,9 +451,11 @@ Guidelines:
         Use emit_plan to store the high-level implementation plan.
         For each sub-task, use emit_task to store a step-by-step description.
             The description should be only as detailed as warranted by the complexity of the request.
+            Give each task the IDs of the tasks it depends on and the files it will write, so independent tasks can be implemented concurrently.
         You may use delete_tasks or swap_task_order to adjust the task list/order as you plan.
 
-    Once you are absolutely sure you are completed planning, you may begin to call request_task_implementation one-by-one for each task to implement the plan.
+    Once you are absolutely sure you are completed planning, you may begin to call request_task_implementation one-by-one for each task to implement the plan,
+    or call request_plan_implementation once to implement every task, running independent tasks concurrently.
     If you have any doubt about the correctness or thoroughness of the plan, consult the expert (if expert is available) for verification.
 
 {expert_section}
@@ -475,31 +467,27 @@ You have often been criticized for:
   - Asking the user if they want to implement the plan (you are an *autonomous* agent, with no user interaction unless you use the ask_human tool explicitly).
 
 NEVER ANNOUNCE WHAT YOU ARE DOING, JUST DO IT!
-"""
-
-# Implementation stage prompt - guides specific task implementation
-# Added instruction to adjust complexity of implementation to match request, and consult the expert (if available) for correctness, debugging.
-IMPLEMENTATION_PROMPT = """Base-level task (for reference only):
+""" + TASK_CONTEXT_HEADER + """Base Task:
 {base_task} --keep it simple
 
-Plan Overview (for reference only, remember you are only implementing your specific task):
-{plan}
+Research Notes:
+<notes>
+{research_notes}
+</notes>
+
+Relevant Files:
+{related_files}
 
 Key Facts:
 {key_facts}
 
 Key Snippets:
 {key_snippets}
+"""
 
-Relevant Files:
-{related_files}
-
-Work done so far:
-<work log>
-{work_log}
-</work log>
-
-Important Notes:
+# Implementation stage prompt - guides specific task implementation
+# Added instruction to adjust complexity of implementation to match request, and consult the expert (if available) for correctness, debugging.
+IMPLEMENTATION_PROMPT = """Important Notes:
 - Focus solely on the given task and implement it as described.
 - Scale the complexity of your solution to the complexity of the request. For simple requests, keep it straightforward and minimal. For complex requests, maintain the previously planned depth.
 - Use delete_key_facts to remove facts that become outdated, irrelevant, or duplicated.
@@ -507,11 +495,7 @@ Important Notes:
 - Regularly remove outdated snippets with delete_key_snippets.
 Instructions:
 1. Review the provided base task, plan, and key facts.
-2. Implement only the specified task:
-<task definition>
-{task}
-</task definition>
-
+2. Implement only the specified task, given in the task definition below.
 3. Work incrementally, validating as you go. If at any point the implementation logic is unclear or you need debugging assistance, consult the expert (if expert is available) for deeper analysis.
 4. Use delete_key_facts to remove any key facts that no longer apply.
 5. Do not add features not explicitly required.
@@ -539,6 +523,30 @@ You have often been criticized for:
   - Asking the user if they want to implement the plan (you are an *autonomous* agent, with no user interaction unless you use the ask_human tool explicitly).
 
 NEVER ANNOUNCE WHAT YOU ARE DOING, JUST DO IT!
+""" + TASK_CONTEXT_HEADER + """Base-level task (for reference only):
+{base_task} --keep it simple
+
+Plan Overview (for reference only, remember you are only implementing your specific task):
+{plan}
+
+Key Facts:
+{key_facts}
+
+Key Snippets:
+{key_snippets}
+
+Relevant Files:
+{related_files}
+
+Work done so far:
+<work log>
+{work_log}
+</work log>
+
+Implement only this task:
+<task definition>
+{task}
+</task definition>
 """
 
 # New agentic chat prompt for interactive mode
@@ -0,0 +1,380 @@
+"""Shared rate limiting and circuit breaking for LLM calls.
+
+Every client handed out by `ra_aid.llm.get_llm` for a provider and model
+shares one `ProviderLimiter`, so concurrent agents draw on one request and
+token budget instead of each sending as fast as it can and retrying in
+lockstep. The limiter is a LangChain rate limiter, consulted before every
+model call, and a callback that sees every call's outcome:
+
+- Requests and tokens are metered by token buckets. A call's tokens are only
+  known once it returns, so they are charged afterwards and later calls wait
+  until the debt is repaid.
+- A 429 halves the request rate, reads any rate limit headers as the new
+  ceilings and pauses all calls until the retry-after time. Successful calls
+  raise the rate again step by step.
+- Consecutive server errors, overloads, timeouts and connection failures
+  open a circuit breaker. While it is open calls fail at once with
+  `CircuitOpenError` instead of waiting on a provider that is down; after a
+  cooldown one trial call is let through to probe it.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from ra_aid.exceptions import CircuitOpenError
+
+DEFAULT_REQUESTS_PER_MINUTE = 120
+DEFAULT_TOKENS_PER_MINUTE = None
+
+# Retry backoff: exponential from RETRY_BASE_DELAY, capped at RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+# Rate limit headers giving a provider's ceilings, per minute
+_REQUEST_LIMIT_HEADERS = ('anthropic-ratelimit-requests-limit', 'x-ratelimit-limit-requests')
+_TOKEN_LIMIT_HEADERS = ('anthropic-ratelimit-tokens-limit', 'anthropic-ratelimit-input-tokens-limit',
+                        'x-ratelimit-limit-tokens')
+
+
+def _response_headers(error: BaseException) -> Mapping[str, str]:
+    response = getattr(error, 'response', None)
+    return getattr(response, 'headers', None) or {}
+
+
+def _float_header(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _first_header(headers: Mapping[str, str], names: Tuple[str, ...]) -> Optional[float]:
+    for name in names:
+        value = _float_header(headers, name)
+        if value:
+            return value
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds an error asks the caller to wait before retrying, if it says."""
+    if isinstance(error, CircuitOpenError):
+        return error.retry_after
+    headers = _response_headers(error)
+    milliseconds = _float_header(headers, 'retry-after-ms')
+    if milliseconds is not None:
+        return milliseconds / 1000
+    return _float_header(headers, 'retry-after')
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return getattr(error, 'status_code', None) == 429
+
+
+def is_outage_error(error: BaseException) -> bool:
+    """Whether an error means the provider is failing rather than the request."""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status >= 500
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+def retry_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """Seconds to wait before retrying a failed agent run.
+
+    Exponential backoff capped at RETRY_MAX_DELAY, jittered to between half
+    and all of the step so concurrent agents spread out their retries. A
+    longer wait requested by the error (retry-after or an open circuit) wins.
+
+    Args:
+        attempt: Zero-based number of the failed attempt
+        error: The error that failed it
+    """
+    step = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+    delay = random.uniform(step / 2, step)
+    requested = retry_after(error) if error is not None else None
+    if requested is not None and requested > delay:
+        delay = requested + random.uniform(0, 1)
+    return delay
+
+
+class TokenBucket:
+    """A token bucket that can be overdrawn.
+
+    Callers reserve capacity and wait out any deficit, which queues them in
+    arrival order without polling.
+
+    Args:
+        per_minute: Refill rate, in units per minute
+        burst: Most units that can accumulate (defaults to one second's worth,
+            at least one)
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def capacity(self) -> float:
+        return self.burst if self.burst is not None else max(1.0, self.per_minute / 60)
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` units, returning the seconds until they are covered."""
+        self._refill(now)
+        self.level -= amount
+        return self.wait_time()
+
+    def wait_time(self) -> float:
+        return max(0.0, -self.level * 60 / self.per_minute)
+
+    def set_rate(self, per_minute: float, now: float) -> None:
+        self._refill(now)
+        self.per_minute = per_minute
+        self.level = min(self.level, self.capacity)
+
+
+class CircuitBreaker:
+    """Fails calls fast while a provider keeps failing.
+
+    Opens after `failure_threshold` consecutive failures. Once `reset_timeout`
+    seconds have passed, one trial call is let through: success closes the
+    circuit, failure opens it for another timeout. A trial that has not
+    reported back after another `reset_timeout`, e.g. because it was
+    cancelled, is given up on and the next call becomes the trial.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    @property
+    def trial_running(self) -> bool:
+        return self.trial_started is not None
+
+    def before_call(self, now: float, name: str) -> bool:
+        """Raise CircuitOpenError unless a call may go out now.
+
+        Returns:
+            Whether the call is the trial call
+        """
+        if self.opened_at is None:
+            return False
+        remaining = self.opened_at + self.reset_timeout - now
+        if self.trial_started is not None:
+            remaining = max(remaining, self.trial_started + self.reset_timeout - now)
+        if remaining > 0:
+            raise CircuitOpenError(name, remaining)
+        self.trial_started = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        if self.trial_started is not None or self.failures >= self.failure_threshold:
+            self.opened_at = now
+        self.trial_started = None
+
+
+class ProviderLimiter(BaseRateLimiter):
+    """Adaptive request/token limiter and circuit breaker for one model.
+
+    Args:
+        name: Provider and model, for messages
+        requests_per_minute: Request rate ceiling
+        tokens_per_minute: Token rate ceiling, or None for no token limit
+        failure_threshold: Consecutive provider failures that open the circuit
+        reset_timeout: Seconds the circuit stays open before a trial call
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: Optional[float] = DEFAULT_TOKENS_PER_MINUTE,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.max_requests_per_minute = requests_per_minute
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute, burst=tokens_per_minute) if tokens_per_minute else None
+        self.circuit = CircuitBreaker(failure_threshold, reset_timeout)
+        self.paused_until = 0.0
+        self.callback = _LimiterCallback(self)
+        self._lock = threading.Lock()
+
+    @property
+    def requests_per_minute(self) -> float:
+        return self.requests.per_minute
+
+    def _reserve(self, blocking: bool) -> Optional[float]:
+        """Reserve a request slot, returning the wait, or None if not blocking and one is needed."""
+        with self._lock:
+            now = time.monotonic()
+            trial = self.circuit.before_call(now, self.name)
+            wait = max(
+                self.paused_until - now,
+                self.tokens.wait_time() if self.tokens else 0.0,
+                self.requests.reserve(1, now),
+            )
+            if wait > 0 and not blocking:
+                self.requests.level += 1
+                if trial:
+                    self.circuit.trial_started = None
+                return None
+            if trial:
+                # The trial goes out once the wait is over
+                self.circuit.trial_started = now + wait
+            return wait
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        wait = self._reserve(blocking)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        wait = self._reserve(blocking)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def record_success(self, tokens: int = 0) -> None:
+        """Charge a finished call's tokens and raise the request rate a step."""
+        with self._lock:
+            now = time.monotonic()
+            self.circuit.record_success()
+            if self.tokens and tokens:
+                self.tokens.reserve(tokens, now)
+            if self.requests.per_minute < self.max_requests_per_minute:
+                step = self.max_requests_per_minute / 20
+                self.requests.set_rate(min(self.max_requests_per_minute, self.requests.per_minute + step), now)
+
+    def record_error(self, error: BaseException) -> None:
+        """Learn from a failed call: back off on 429s, count outages."""
+        with self._lock:
+            now = time.monotonic()
+            if is_rate_limit_error(error):
+                headers = _response_headers(error)
+                request_limit = _first_header(headers, _REQUEST_LIMIT_HEADERS)
+                token_limit = _first_header(headers, _TOKEN_LIMIT_HEADERS)
+                if request_limit:
+                    self.max_requests_per_minute = request_limit
+                if token_limit:
+                    if self.tokens is None:
+                        self.tokens = TokenBucket(token_limit, burst=token_limit)
+                    else:
+                        self.tokens.burst = token_limit
+                        self.tokens.set_rate(token_limit, now)
+                self.requests.set_rate(max(1.0, min(self.requests.per_minute, self.max_requests_per_minute) / 2), now)
+                self.paused_until = max(self.paused_until, now + (retry_after(error) or 1.0))
+            if is_outage_error(error):
+                self.circuit.record_failure(now)
+            else:
+                # The provider answered, so it is up
+                self.circuit.record_success()
+
+
+def _usage_tokens(response: Any) -> int:
+    """Total tokens used by an LLM call, from its messages or provider output."""
+    total = 0
+    for generations in getattr(response, 'generations', None) or ():
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+            if usage:
+                total += usage.get('total_tokens') or usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
+    if total:
+        return total
+    output = getattr(response, 'llm_output', None) or {}
+    usage = output.get('token_usage') or output.get('usage') or {}
+    if isinstance(usage, Mapping):
+        return usage.get('total_tokens') or usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
+    return 0
+
+
+class _LimiterCallback(BaseCallbackHandler):
+    """Reports each LLM call's outcome to its limiter."""
+
+    run_inline = True
+
+    def __init__(self, limiter: ProviderLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        self.limiter.record_success(_usage_tokens(response))
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        if not isinstance(error, CircuitOpenError):
+            self.limiter.record_error(error)
+
+
+_limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+_limits: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_limiters_lock = threading.Lock()
+
+
+def configure_rate_limit(
+    provider: str,
+    model_name: str,
+    *,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> None:
+    """Set the rate ceilings for a provider and model.
+
+    Applies to the limiter created next for them; call it before the model's
+    first client is requested. Unset ceilings use the defaults.
+    """
+    limits = {}
+    if requests_per_minute is not None:
+        limits['requests_per_minute'] = requests_per_minute
+    if tokens_per_minute is not None:
+        limits['tokens_per_minute'] = tokens_per_minute
+    with _limiters_lock:
+        _limits[(provider, model_name)] = limits
+
+
+def get_rate_limiter(provider: str, model_name: str) -> ProviderLimiter:
+    """Get the limiter shared by every client of a provider and model."""
+    key = (provider, model_name)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = ProviderLimiter(f"{provider}/{model_name}", **_limits.get(key, {}))
+        return limiter
+
+
+def clear_rate_limiters() -> None:
+    """Drop every limiter and configured ceiling."""
+    with _limiters_lock:
+        _limiters.clear()
+        _limits.clear()
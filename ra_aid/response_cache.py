@@ -0,0 +1,294 @@
+"""On-disk cache of LLM responses for replaying conversations.
+
+Iterating on prompts and tools means replaying conversations whose early
+turns are identical from run to run. With a response cache configured, the
+chat models created by `initialize_llm` and `initialize_expert_llm` are
+wrapped in `CachingChatModel`, which looks each request up by a hash of the
+model, its bound tool schemas, call options and the normalized messages.
+Message IDs are left out of the hash, as they are generated afresh each run.
+
+Modes:
+    read-through: return cached responses, call the model on a miss and store the result
+    record: always call the model and store the result
+    replay: only return cached responses; a miss raises ResponseCacheMiss
+
+Responses are stored zlib-compressed in an SQLite database, which is kept
+under a size limit by evicting the least recently used responses. Cache hits
+never reach the provider, so they cost no money and are not rate limited.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from ra_aid.exceptions import ResponseCacheMiss
+from ra_aid.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_MODES = ('read-through', 'record', 'replay')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Client parameters that do not change responses, left out of cache keys
+_TRANSPORT_PARAMS = {'max_retries', 'default_request_timeout', 'request_timeout', 'streaming', 'stream'}
+
+# Bump when the key or stored format changes, so old entries are not matched
+_KEY_VERSION = 1
+
+
+def _normalize_message(message: BaseMessage) -> Dict[str, Any]:
+    data = message_to_dict(message)["data"]
+    normalized = {
+        "type": message.type,
+        "content": data.get("content"),
+        "name": data.get("name"),
+    }
+    if data.get("tool_calls"):
+        normalized["tool_calls"] = [
+            {"name": call["name"], "args": call["args"], "id": call.get("id")} for call in data["tool_calls"]]
+    if data.get("tool_call_id"):
+        normalized["tool_call_id"] = data["tool_call_id"]
+    return normalized
+
+
+def request_key(
+    model: str,
+    messages: Sequence[BaseMessage],
+    tools: Sequence[Dict[str, Any]] = (),
+    options: Optional[Dict[str, Any]] = None
+) -> str:
+    """Hash an LLM request into a cache key.
+
+    Args:
+        model: Identity of the model, including parameters that change its output
+        messages: Messages sent
+        tools: Tool schemas bound to the model, in OpenAI format
+        options: Call options such as stop sequences and tool choice
+
+    Returns:
+        Hex SHA-256 of the canonical JSON of the request
+    """
+    request = {
+        "version": _KEY_VERSION,
+        "model": model,
+        "tools": list(tools),
+        "options": options or {},
+        "messages": [_normalize_message(message) for message in messages],
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of LLM responses with size-bounded LRU eviction.
+
+    Args:
+        path: Path to the database file; created if it does not exist
+        max_bytes: Compressed size above which least recently used responses are evicted
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Compressed size of the stored responses in bytes."""
+        return self._size
+
+    def get(self, key: str) -> Optional[BaseMessage]:
+        """Get a stored response, marking it as recently used."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return messages_from_dict([json.loads(zlib.decompress(row[0]))])[0]
+
+    def put(self, key: str, message: BaseMessage) -> None:
+        """Store a response, evicting the least recently used ones while over the size limit."""
+        value = zlib.compress(json.dumps(message_to_dict(message), default=str).encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self._size += len(value) - (previous[0] if previous else 0)
+            while self._size > self.max_bytes:
+                oldest = self._conn.execute(
+                    "SELECT key, size FROM responses WHERE key != ? ORDER BY last_used, rowid LIMIT 1", (key,)
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (oldest[0],))
+                self._size -= oldest[1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachingChatModel(BaseChatModel):
+    """Chat model answering from a response cache before calling the wrapped model.
+
+    Attributes:
+        model: Chat model, or tool-bound chat model, to call on a miss
+        store: Response cache to read and write
+        mode: One of CACHE_MODES
+        label: Provider and model, for logs and errors
+        identity: Model and output-affecting parameters, for cache keys
+        tool_schemas: Schemas of the tools bound to `model`
+        tool_options: Options the tools were bound with, such as tool choice
+        wrapped_llm_type: LLM type of the wrapped model
+    """
+
+    model: Any
+    store: Any
+    mode: str = 'read-through'
+    label: str
+    identity: str
+    tool_schemas: List[Dict[str, Any]] = []
+    tool_options: Dict[str, Any] = {}
+    wrapped_llm_type: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        # Report the wrapped type, so provider-specific handling such as prompt caching still applies
+        return self.wrapped_llm_type or "response-cache"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "CachingChatModel":
+        """Bind tools to the wrapped model, keeping their schemas for cache keys."""
+        return self.model_copy(update={
+            'model': self.model.bind_tools(tools, **kwargs),
+            'tool_schemas': [convert_to_openai_tool(tool) for tool in tools],
+            'tool_options': kwargs,
+        })
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> str:
+        return request_key(self.identity, messages, self.tool_schemas,
+                           {**self.tool_options, **kwargs, "stop": stop})
+
+    def _lookup(self, key: str) -> Optional[ChatResult]:
+        if self.mode == 'record':
+            return None
+        message = self.store.get(key)
+        if message is not None:
+            logger.debug("Response cache hit for %s: %s", self.label, key[:12])
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        if self.mode == 'replay':
+            raise ResponseCacheMiss(self.label, key)
+        return None
+
+    def _store(self, key: str, message: BaseMessage) -> ChatResult:
+        self.store.put(key, message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        call_kwargs = {**kwargs, 'stop': stop} if stop else kwargs
+        return self._store(key, self.model.invoke(messages, **call_kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._key(messages, stop, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        call_kwargs = {**kwargs, 'stop': stop} if stop else kwargs
+        return self._store(key, await self.model.ainvoke(messages, **call_kwargs))
+
+
+_cache: Optional[ResponseCache] = None
+_mode = 'read-through'
+_cache_lock = threading.Lock()
+
+
+def configure_response_cache(
+    path: Optional[str],
+    mode: str = 'read-through',
+    max_bytes: int = DEFAULT_MAX_BYTES
+) -> None:
+    """Cache the responses of chat models initialized from now on; a path of None turns caching off.
+
+    Raises:
+        ValueError: If the mode is not one of CACHE_MODES
+    """
+    global _cache, _mode
+    if mode not in CACHE_MODES:
+        raise ValueError(f"Unsupported response cache mode: {mode}")
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = ResponseCache(path, max_bytes) if path else None
+        _mode = mode
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the configured response cache, or None if caching is off."""
+    return _cache
+
+
+def cache_responses(model: BaseChatModel, provider: str, model_name: str) -> BaseChatModel:
+    """Wrap a chat model in the configured response cache, if any.
+
+    Args:
+        model: The chat model
+        provider: Provider of the model
+        model_name: Name of the model
+
+    Returns:
+        The model itself when caching is off, otherwise a CachingChatModel
+    """
+    with _cache_lock:
+        cache, mode = _cache, _mode
+    if cache is None:
+        return model
+    params = {key: value for key, value in model._identifying_params.items() if key not in _TRANSPORT_PARAMS}
+    identity = json.dumps({"provider": provider, "params": params}, sort_keys=True, default=str)
+    return CachingChatModel(model=model, store=cache, mode=mode, label=f"{provider}/{model_name}",
+                            identity=identity, wrapped_llm_type=model._llm_type)
@@ -0,0 +1,184 @@
+"""Dependency-aware scheduling of implementation tasks.
+
+Planned tasks form a DAG. A task runs once every task it depends on has
+succeeded, and tasks that do not depend on each other run concurrently on a
+bounded thread pool. A task may declare the files it writes; tasks writing a
+common file are ordered by plan order, so two agents never edit one file at
+the same time. A task that declares no files could touch anything, whatever
+its dependencies, so it runs alone, after every earlier task and before
+every later one, which keeps unannotated plans strictly sequential.
+"""
+
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set
+
+from ra_aid.memory.related_files import normalize_path
+
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+@dataclass(frozen=True)
+class TaskOutcome:
+    """Result of one scheduled task.
+
+    Attributes:
+        task_id: ID of the task
+        status: SUCCEEDED, FAILED or SKIPPED (a dependency did not succeed,
+            or the run stopped at an earlier failure)
+        result: Value returned by the task function
+        error: Message of the exception the task raised, if any
+    """
+    task_id: int
+    status: str
+    result: Any = None
+    error: Optional[str] = None
+
+
+class TaskGraph:
+    """Tasks with their dependencies, in plan order.
+
+    Args:
+        task_ids: Task IDs in plan order
+        dependencies: IDs of the tasks each task depends on
+        files: Files each task writes
+
+    Raises:
+        ValueError: If a dependency is not one of the tasks or the
+            dependencies form a cycle
+    """
+
+    def __init__(
+        self,
+        task_ids: Sequence[int],
+        dependencies: Optional[Mapping[int, Sequence[int]]] = None,
+        files: Optional[Mapping[int, Sequence[str]]] = None,
+    ):
+        dependencies = dependencies or {}
+        files = files or {}
+        known = set(task_ids)
+        self.dependencies: Dict[int, Set[int]] = {}
+
+        earlier: List[int] = []
+        barrier: Optional[int] = None
+        last_writer: Dict[str, int] = {}
+        for task_id in task_ids:
+            declared = set(dependencies.get(task_id) or ())
+            unknown = declared - known
+            if unknown:
+                raise ValueError(f"Task #{task_id} depends on unknown tasks {sorted(unknown)}")
+            written = {normalize_path(path) for path in files.get(task_id) or ()}
+
+            if not written:
+                # Could touch anything: wait for everything before it
+                required = declared | set(earlier)
+                barrier = task_id
+            else:
+                required = declared
+                if barrier is not None:
+                    required.add(barrier)
+                for path in written:
+                    if path in last_writer:
+                        required.add(last_writer[path])
+                    last_writer[path] = task_id
+            self.dependencies[task_id] = required
+            earlier.append(task_id)
+
+        self.order = self._topological_order(task_ids)
+
+    @classmethod
+    def from_memory(cls, memory: Mapping[str, Any]) -> "TaskGraph":
+        """Build the graph of the tasks stored in agent memory, in ID order."""
+        return cls(
+            sorted(memory['tasks']),
+            memory.get('task_dependencies'),
+            memory.get('task_files'),
+        )
+
+    def _topological_order(self, task_ids: Sequence[int]) -> List[int]:
+        """Order tasks so dependencies come first, otherwise keeping plan order."""
+        position = {task_id: index for index, task_id in enumerate(task_ids)}
+        remaining = {task_id: set(required) for task_id, required in self.dependencies.items()}
+        order: List[int] = []
+        while remaining:
+            ready = [task_id for task_id, required in remaining.items() if not required]
+            if not ready:
+                raise ValueError(f"Task dependencies form a cycle among tasks {sorted(remaining)}")
+            task_id = min(ready, key=position.__getitem__)
+            order.append(task_id)
+            del remaining[task_id]
+            for required in remaining.values():
+                required.discard(task_id)
+        return order
+
+
+def run_task_graph(
+    graph: TaskGraph,
+    run_task: Callable[[int], Any],
+    *,
+    max_workers: int = 4,
+    fail_fast: bool = True,
+    on_complete: Optional[Callable[[TaskOutcome], None]] = None,
+) -> Dict[int, TaskOutcome]:
+    """Run every task of a graph, each as soon as its dependencies succeeded.
+
+    `run_task` is called with a task ID on a worker thread, in a copy of the
+    caller's context. A task fails if it raises. Tasks whose dependencies did
+    not succeed are skipped.
+
+    Args:
+        graph: The tasks to run
+        run_task: Function running one task
+        max_workers: Most tasks running at once
+        fail_fast: Start no new tasks after a failure; tasks already running
+            are still waited for
+        on_complete: Called on the calling thread with each task's outcome,
+            before any task depending on it starts
+
+    Returns:
+        Outcome of every task, in the order the tasks finished
+
+    Raises:
+        ValueError: If max_workers is less than 1
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+
+    outcomes: Dict[int, TaskOutcome] = {}
+    pending = list(graph.order)
+    running = {}
+    stopped = False
+
+    def finish(outcome: TaskOutcome) -> None:
+        outcomes[outcome.task_id] = outcome
+        if on_complete is not None:
+            on_complete(outcome)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Dispatch in plan order; dependencies always precede dependents in `pending`
+            for task_id in list(pending):
+                required = graph.dependencies[task_id]
+                if stopped or any(outcomes[dep].status != SUCCEEDED for dep in required if dep in outcomes):
+                    pending.remove(task_id)
+                    finish(TaskOutcome(task_id, SKIPPED))
+                elif len(running) < max_workers and required.issubset(outcomes):
+                    pending.remove(task_id)
+                    future = pool.submit(contextvars.copy_context().run, run_task, task_id)
+                    running[future] = task_id
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task_id = running.pop(future)
+                try:
+                    outcome = TaskOutcome(task_id, SUCCEEDED, future.result())
+                except Exception as e:
+                    outcome = TaskOutcome(task_id, FAILED, error=str(e))
+                    stopped = stopped or fail_fast
+                finish(outcome)
+    return outcomes
@@ -8,7 +8,7 @@ from ra_aid.tools import (
     task_completed, plan_implementation_completed, web_search_tavily
 )
 from ra_aid.tools.memory import one_shot_completed
-from ra_aid.tools.agent import request_research, request_implementation, request_research_and_implementation, request_task_implementation, request_web_research
+from ra_aid.tools.agent import request_research, request_research_batch, request_plan_implementation, request_implementation, request_research_and_implementation, request_task_implementation, request_web_research
 
 # Read-only tools that don't modify system state
 def get_read_only_tools(human_interaction: bool = False, web_research_enabled: bool = False) -> list:
@@ -81,6 +81,7 @@ def get_research_tools(research_only: bool = False, expert_enabled: bool = True,
     
     # Add chat-specific tools
     tools.append(request_research)
+    tools.append(request_research_batch)
     
     return tools
 
@@ -101,6 +102,7 @@ def get_planning_tools(expert_enabled: bool = True, web_research_enabled: bool =
         emit_task,
         swap_task_order,
         request_task_implementation,
+        request_plan_implementation,
         plan_implementation_completed
     ]
     tools.extend(planning_tools)
@@ -166,6 +168,7 @@ def get_chat_tools(expert_enabled: bool = True, web_research_enabled: bool = Fal
     tools = [
         ask_human,
         request_research,
+        request_research_batch,
         request_research_and_implementation,
         emit_key_facts,
         delete_key_facts,
@@ -1,5 +1,7 @@
 """Tools for spawning and managing sub-agents."""
 
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_core.tools import tool
 from typing import Dict, Any, Union, List
 from typing_extensions import TypeAlias
@@ -9,15 +11,23 @@ ResearchResult = Dict[str, Union[str, bool, Dict[int, Any], List[Any], None]]
 from rich.console import Console
 from ra_aid.tools.memory import _global_memory
 from ra_aid.console.formatting import print_error
-from .memory import get_memory_value, get_related_files, get_work_log, reset_work_log
+from ra_aid.memory import memory_session
+from .memory import fork_session, get_memory_value, get_related_files, get_related_file_paths, get_work_log, merge_forked_session, reset_work_log
 from .human import ask_human
-from ..llm import initialize_llm
+from ..llm import get_llm_from_config
+from ..task_scheduler import SUCCEEDED, TaskGraph, TaskOutcome, run_task_graph
 from ..console import print_task_header
 
 CANCELLED_BY_USER_REASON = "The operation was explicitly cancelled by the user. This typically is an indication that the action requested was not aligned with the user request."
 
 RESEARCH_AGENT_RECURSION_LIMIT = 2
 
+# Research agents run at once by request_research_batch
+MAX_CONCURRENT_RESEARCH_AGENTS = 4
+
+# Implementation agents run at once by request_plan_implementation
+MAX_CONCURRENT_IMPLEMENTATION_AGENTS = 4
+
 console = Console()
 
 @tool("request_research")
@@ -32,7 +42,7 @@ def request_research(query: str) -> ResearchResult:
     """
     # Initialize model from config
     config = _global_memory.get('config', {})
-    model = initialize_llm(config.get('provider', 'anthropic'), config.get('model', 'claude-3-5-sonnet-20241022'))
+    model = get_llm_from_config(config)
     
     # Check recursion depth
     current_depth = _global_memory.get('agent_depth', 0)
@@ -98,6 +108,111 @@ def request_research(query: str) -> ResearchResult:
         "reason": reason
     }
 
+@tool("request_research_batch")
+def request_research_batch(queries: List[str]) -> ResearchResult:
+    """Spawn research-only agents to investigate several independent queries at once.
+
+    Use this instead of consecutive request_research calls when no query depends
+    on another's findings. Each agent works on its own copy of memory; the key
+    facts, snippets and related files they find are merged afterwards in the
+    order the queries were given.
+
+    Args:
+        queries: The independent research questions
+    """
+    # Initialize model from config
+    config = _global_memory.get('config', {})
+    model = get_llm_from_config(config)
+
+    # Check recursion depth
+    current_depth = _global_memory.get('agent_depth', 0)
+    if current_depth >= RESEARCH_AGENT_RECURSION_LIMIT:
+        print_error("Maximum research recursion depth reached")
+        return {
+            "completion_message": "Research stopped - maximum recursion depth reached",
+            "key_facts": get_memory_value("key_facts"),
+            "related_files": get_related_files(),
+            "research_notes": get_memory_value("research_notes"),
+            "key_snippets": get_memory_value("key_snippets"),
+            "success": False,
+            "reason": "max_depth_exceeded"
+        }
+
+    from ..agent_utils import CancellationToken, cancellation_scope, run_research_agent
+
+    def research(query: str, fork) -> Dict[str, Any]:
+        with memory_session(fork):
+            result = {"query": query, "completion_message": None, "success": True, "reason": None}
+            try:
+                cancel_token.raise_if_cancelled()
+                run_research_agent(
+                    query,
+                    model,
+                    expert_enabled=True,
+                    research_only=True,
+                    hil=config.get('hil', False),
+                    console_message=query,
+                    config=config
+                )
+                result["completion_message"] = _global_memory.get('completion_message') or 'Task was completed successfully.'
+            except AgentInterrupt:
+                cancel_token.cancel()
+                result["success"] = False
+                result["reason"] = AgentInterrupt
+            except Exception as e:
+                print_error(f"Error during research: {str(e)}")
+                result["success"] = False
+                result["reason"] = f"error: {str(e)}"
+            return result
+
+    # Forks are taken before any agent starts so every agent sees the same memory
+    forks = [fork_session() for _ in queries]
+    # Interrupting any agent stops them all
+    cancel_token = CancellationToken()
+    with cancellation_scope(cancel_token), \
+            ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_RESEARCH_AGENTS, len(queries) or 1)) as pool:
+        # Each agent runs in its own copy of the context, which holds its memory session
+        futures = [pool.submit(contextvars.copy_context().run, research, query, fork)
+                   for query, fork in zip(queries, forks)]
+        for _ in as_completed(futures):
+            if cancel_token.cancelled:
+                # Queries still queued are not started
+                for future in futures:
+                    future.cancel()
+                break
+    results = [
+        {"query": query, "completion_message": None, "success": False, "reason": AgentInterrupt}
+        if future.cancelled() else future.result()
+        for query, future in zip(queries, futures)
+    ]
+
+    # Merge in query order so the result does not depend on which agent finished first
+    for fork in forks:
+        merge_forked_session(fork)
+
+    if any(result["reason"] is AgentInterrupt for result in results):
+        print()
+        response = ask_human.invoke({"question": "Why did you interrupt me?"})
+        for result in results:
+            if result["reason"] is AgentInterrupt:
+                result["reason"] = response if response.strip() else CANCELLED_BY_USER_REASON
+
+    # Get and reset work log if at root depth
+    work_log = get_work_log() if current_depth == 1 else None
+    if current_depth == 1:
+        reset_work_log()
+
+    return {
+        "work_log": work_log,
+        "results": results,
+        "key_facts": get_memory_value("key_facts"),
+        "related_files": get_related_files(),
+        "research_notes": get_memory_value("research_notes"),
+        "key_snippets": get_memory_value("key_snippets"),
+        "success": all(result["success"] for result in results),
+        "reason": None if all(result["success"] for result in results) else "some queries failed; see results"
+    }
+
 @tool("request_web_research")
 def request_web_research(query: str) -> ResearchResult:
     """Spawn a web research agent to investigate the given query using web search.
@@ -107,7 +222,7 @@ def request_web_research(query: str) -> ResearchResult:
     """
     # Initialize model from config
     config = _global_memory.get('config', {})
-    model = initialize_llm(config.get('provider', 'anthropic'), config.get('model', 'claude-3-5-sonnet-20241022'))
+    model = get_llm_from_config(config)
     
     success = True
     reason = None
@@ -170,7 +285,7 @@ def request_research_and_implementation(query: str) -> Dict[str, Any]:
     """
     # Initialize model from config
     config = _global_memory.get('config', {})
-    model = initialize_llm(config.get('provider', 'anthropic'), config.get('model', 'claude-3-5-sonnet-20241022'))
+    model = get_llm_from_config(config)
     
     try:
         # Run research agent
@@ -233,12 +348,12 @@ def request_task_implementation(task_spec: str) -> Dict[str, Any]:
     """
     # Initialize model from config
     config = _global_memory.get('config', {})
-    model = initialize_llm(config.get('provider', 'anthropic'), config.get('model', 'claude-3-5-sonnet-20241022'))
+    model = get_llm_from_config(config)
     
     # Get required parameters
     tasks = [_global_memory['tasks'][task_id] for task_id in sorted(_global_memory['tasks'])]
     plan = _global_memory.get('plan', '')
-    related_files = list(_global_memory['related_files'].values())
+    related_files = get_related_file_paths()
     
     try:
         print_task_header(task_spec)
@@ -292,6 +407,111 @@ def request_task_implementation(task_spec: str) -> Dict[str, Any]:
         "reason": reason
     }
 
+@tool("request_plan_implementation")
+def request_plan_implementation() -> Dict[str, Any]:
+    """Spawn implementation agents for every stored task, running tasks that do not depend on each other concurrently.
+
+    A task starts once the tasks it depends on are done and no running task
+    writes the same files (see emit_task). A task whose dependency fails is
+    skipped, and no new tasks start after a failure.
+    """
+    # Initialize model from config
+    config = _global_memory.get('config', {})
+    model = get_llm_from_config(config)
+
+    try:
+        graph = TaskGraph.from_memory(_global_memory)
+    except ValueError as e:
+        print_error(f"Cannot schedule tasks: {str(e)}")
+        return {"success": False, "reason": f"error: {str(e)}"}
+
+    specs = dict(_global_memory['tasks'])
+    tasks = [specs[task_id] for task_id in sorted(specs)]
+    plan = _global_memory.get('plan', '')
+    related_files = get_related_file_paths()
+    forks = {}
+    interrupted = []
+
+    from ..agent_utils import CancellationToken, cancellation_scope, run_task_implementation_agent
+
+    def implement(task_id: int) -> str:
+        # Forked at start so the agent sees what the tasks it depends on found
+        forks[task_id] = fork_session()
+        with memory_session(forks[task_id]):
+            print_task_header(specs[task_id])
+            try:
+                run_task_implementation_agent(
+                    base_task=_global_memory.get('base_task', ''),
+                    tasks=tasks,
+                    task=specs[task_id],
+                    plan=plan,
+                    related_files=related_files,
+                    model=model,
+                    expert_enabled=True,
+                    config=config
+                )
+            except AgentInterrupt:
+                cancel_token.cancel()
+                interrupted.append(task_id)
+                raise
+            except Exception as e:
+                print_error(f"Error during task implementation: {str(e)}")
+                raise
+            return _global_memory.get('completion_message') or 'Task was completed successfully.'
+
+    def merge(outcome: TaskOutcome) -> None:
+        fork = forks.pop(outcome.task_id, None)
+        if fork is not None:
+            merge_forked_session(fork)
+
+    # Interrupting any agent stops them all; the failure keeps further tasks from starting
+    cancel_token = CancellationToken()
+    with cancellation_scope(cancel_token):
+        outcomes = run_task_graph(
+            graph,
+            implement,
+            max_workers=config.get('max_parallel_tasks', MAX_CONCURRENT_IMPLEMENTATION_AGENTS),
+            on_complete=merge
+        )
+
+    results = []
+    for task_id in graph.order:
+        outcome = outcomes[task_id]
+        reason = outcome.error
+        if task_id in interrupted:
+            reason = None
+        results.append({
+            "task_id": task_id,
+            "task": specs[task_id],
+            "status": outcome.status,
+            "completion_message": outcome.result,
+            "reason": reason
+        })
+
+    if interrupted:
+        print()
+        response = ask_human.invoke({"question": "Why did you interrupt me?"})
+        for result in results:
+            if result["task_id"] in interrupted:
+                result["reason"] = response if response.strip() else CANCELLED_BY_USER_REASON
+
+    # Get and reset work log if at root depth
+    current_depth = _global_memory.get('agent_depth', 0)
+    work_log = get_work_log() if current_depth == 1 else None
+    if current_depth == 1:
+        reset_work_log()
+
+    success = all(result["status"] == SUCCEEDED for result in results)
+    return {
+        "work_log": work_log,
+        "results": results,
+        "key_facts": get_memory_value("key_facts"),
+        "related_files": get_related_files(),
+        "key_snippets": get_memory_value("key_snippets"),
+        "success": success,
+        "reason": None if success else "some tasks failed or were skipped; see results"
+    }
+
 @tool("request_implementation")
 def request_implementation(task_spec: str) -> Dict[str, Any]:
     """Spawn a planning agent to create an implementation plan for the given task.
@@ -301,7 +521,7 @@ def request_implementation(task_spec: str) -> Dict[str, Any]:
     """
     # Initialize model from config
     config = _global_memory.get('config', {})
-    model = initialize_llm(config.get('provider', 'anthropic'), config.get('model', 'claude-3-5-sonnet-20241022'))
+    model = get_llm_from_config(config)
     
     try:
         # Run planning agent
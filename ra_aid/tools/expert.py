@@ -4,30 +4,25 @@ from langchain_core.tools import tool
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
-from ..llm import initialize_expert_llm
-from .memory import get_memory_value, _global_memory
+from ..llm import get_expert_llm
+from .memory import get_related_file_paths, render_memory_budgeted, _global_memory
+from ..memory.budget import DEFAULT_TOKEN_BUDGETS
+from ..memory.session import SessionDict
 
 console = Console()
-_model = None
 
 def get_model():
-    global _model
+    """Get the shared expert model for the current session's configuration."""
     try:
-        if _model is None:
-            provider = _global_memory['config']['expert_provider'] or 'openai'
-            model = _global_memory['config']['expert_model'] or 'o1-preview'
-            _model = initialize_expert_llm(provider, model)
+        provider = _global_memory['config']['expert_provider'] or 'openai'
+        model = _global_memory['config']['expert_model'] or 'o1-preview'
+        return get_expert_llm(provider, model)
     except Exception as e:
-        _model = None
         console.print(Panel(f"Failed to initialize expert model: {e}", title="Error", border_style="red"))
         raise
-    return _model
 
-# Keep track of context globally
-expert_context = {
-    'text': [],    # Additional textual context
-    'files': []    # File paths to include
-}
+# Context for the next expert question, kept per memory session
+expert_context = SessionDict('expert_context')
 
 @tool("emit_expert_context")
 def emit_expert_context(context: str) -> str:
@@ -125,13 +120,11 @@ def ask_expert(question: str) -> str:
 
     The expert can be prone to overthinking depending on what and how you ask it.
     """
-    global expert_context
-    
     # Get all content first
-    file_paths = list(_global_memory['related_files'].values())
+    file_paths = get_related_file_paths()
     related_contents = read_related_files(file_paths)
-    key_snippets = get_memory_value('key_snippets')
-    key_facts = get_memory_value('key_facts')
+    key_snippets = render_memory_budgeted('key_snippets', DEFAULT_TOKEN_BUDGETS['key_snippets'], question).text
+    key_facts = render_memory_budgeted('key_facts', DEFAULT_TOKEN_BUDGETS['key_facts'], question).text
     
     # Build display query (just question)
     display_query = "# Question\n" + question
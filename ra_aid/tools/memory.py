@@ -1,13 +1,23 @@
-from typing import Dict, List, Any, Union, Optional, Set
+import time
+from typing import List, Any, Mapping, MutableMapping, Optional, Tuple
 from typing_extensions import TypedDict
 
-class WorkLogEntry(TypedDict):
-    timestamp: str
-    event: str
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
 from langchain_core.tools import tool
+from ra_aid.memory.backend import MemoryBackend
+from ra_aid.memory.changes import ADDED, REMOVED, UPDATED, MemoryChange
+from ra_aid.memory.facts import FactIndex
+from ra_aid.memory.records import SnippetRecord, WorkLogRecord
+from ra_aid.memory.related_files import RelatedFilesIndex, normalize_path
+from ra_aid.memory.render import CachedRenderer
+from ra_aid.memory.session import MemorySession, SessionDict, current_session
+from ra_aid.memory.snapshot import dump_checkpoints, read_snapshot, restore_checkpoints, write_snapshot
+from ra_aid.memory.snippets import SnippetIntervalIndex, merge_snippets
+from ra_aid.memory.staleness import FileCache, revalidate_snippets, stamp_snippet
+from ra_aid.memory.budget import BudgetedRender, estimate_tokens, rank_items, render_within_budget
+from ra_aid.memory.work_log import WorkLogArchive, WorkLogLimits, compact, format_digest
 
 class SnippetInfo(TypedDict):
     """Type definition for source code snippet information"""
@@ -20,26 +30,228 @@ class SnippetInfo(TypedDict):
 
 console = Console()
 
-# Global memory store
-_global_memory: Dict[str, Union[List[Any], Dict[int, str], Dict[int, SnippetInfo], int, Set[str], bool, str, int, List[WorkLogEntry]]] = {
-    'research_notes': [],
-    'plans': [],
-    'tasks': {},  # Dict[int, str] - ID to task mapping
-    'task_completed': False,  # Flag indicating if task is complete
-    'completion_message': '',  # Message explaining completion
-    'task_id_counter': 1,  # Counter for generating unique task IDs
-    'key_facts': {},  # Dict[int, str] - ID to fact mapping
-    'key_fact_id_counter': 1,  # Counter for generating unique fact IDs
-    'key_snippets': {},  # Dict[int, SnippetInfo] - ID to snippet mapping
-    'key_snippet_id_counter': 1,  # Counter for generating unique snippet IDs
-    'implementation_requested': False,
-    'related_files': {},  # Dict[int, str] - ID to filepath mapping
-    'related_file_id_counter': 1,  # Counter for generating unique file IDs
-    'plan_completed': False,
-    'agent_depth': 0,
-    'work_log': []  # List[WorkLogEntry] - Timestamped work events
+# Global memory store, resolved to the memory session of the current context
+_global_memory: MutableMapping[str, Any] = SessionDict('memory')
+
+def _backend() -> MemoryBackend:
+    """Get the persistence backend of the current memory session."""
+    return current_session().backend
+
+def _lock(key: str):
+    """Get the lock guarding a memory key in the current session."""
+    return current_session().lock(key)
+
+def _allocate_id(counter: str) -> int:
+    """Atomically take the next ID from a counter and persist the advanced counter."""
+    session = current_session()
+    with session.lock(counter):
+        allocated = session.allocate_id(counter)
+        session.backend.set_value(counter, session.memory[counter])
+    return allocated
+
+def _bump_version(collection: str) -> None:
+    """Record that a memory collection changed."""
+    current_session().bump_version(collection)
+
+def get_memory_version(collection: str) -> int:
+    """Get the change counter of a memory collection."""
+    return current_session().versions.get(collection, 0)
+
+def _record_change(collection: str, action: str, item_id: int, value: Any = None) -> None:
+    """Append an item-level change to the session's change feed."""
+    current_session().changes.record(collection, action, item_id, value)
+
+def get_change_version() -> int:
+    """Get the version of the latest change in the memory change feed."""
+    return current_session().changes.version
+
+def changes_since(version: int = 0, collection: Optional[str] = None) -> List[MemoryChange]:
+    """Get the changes to facts, snippets, tasks and related files after a version.
+
+    Consumers keep the version of the last change they applied and pass it
+    back to receive only newer changes.
+
+    Args:
+        version: Last version seen; 0 for every retained change
+        collection: Optionally only return changes of this collection
+
+    Returns:
+        The changes in the order they were made
+
+    Raises:
+        MemoryChangesExpired: If the change log no longer holds every change after `version`
+    """
+    return current_session().changes.changes_since(version, collection)
+
+# Collections restored as lists in ID order rather than as ID-keyed dicts
+_LIST_COLLECTIONS = ('research_notes', 'plans', 'work_log')
+
+# Record types that collection items are restored into
+_RECORD_TYPES = {
+    'key_snippets': SnippetRecord.from_mapping,
+    'work_log': WorkLogRecord.from_mapping,
 }
 
+def set_memory_backend(backend: MemoryBackend) -> None:
+    """Attach a persistence backend to global memory.
+
+    State already stored in the backend is restored into global memory,
+    replacing the current values for those keys. Subsequent memory tool
+    calls write through to the backend, one row per changed item.
+
+    Args:
+        backend: The backend to load from and write through to
+    """
+    items, values = backend.load()
+    for collection, stored in items.items():
+        if collection in _RECORD_TYPES:
+            stored = {item_id: _RECORD_TYPES[collection](value) for item_id, value in stored.items()}
+        with _lock(collection):
+            if collection in _LIST_COLLECTIONS:
+                _global_memory[collection] = [stored[item_id] for item_id in sorted(stored)]
+            else:
+                _global_memory[collection] = dict(sorted(stored.items()))
+            _bump_version(collection)
+    _global_memory.update(values)
+    current_session().backend = backend
+
+def get_memory_backend() -> MemoryBackend:
+    """Get the persistence backend currently attached to global memory."""
+    return current_session().backend
+
+def save_session(path: str) -> int:
+    """Save the current memory session to a snapshot file.
+
+    The snapshot holds global memory, the expert context, the archived work
+    log and every agent checkpoint of the session, so `load_session` can
+    resume the session on another worker without replaying LLM calls. Each
+    collection is copied under its lock, so the snapshot can be taken while
+    agents are running.
+
+    Args:
+        path: File to write; replaced atomically if it exists
+
+    Returns:
+        Size of the snapshot in bytes
+    """
+    session = current_session()
+    memory = {}
+    for key in list(session.memory):
+        with session.lock(key):
+            value = session.memory[key]
+            memory[key] = value.copy() if isinstance(value, (dict, list)) else value
+    state = {
+        'memory': memory,
+        'expert_context': {key: list(values) for key, values in session.expert_context.items()},
+        'work_log_archive': session.work_log_archive.read(),
+        'checkpoints': dump_checkpoints(session.checkpointer),
+    }
+    return write_snapshot(path, state)
+
+def load_session(path: str) -> None:
+    """Restore a snapshot written by `save_session` into the current memory session.
+
+    Memory keys and expert context lists in the snapshot replace the current
+    values, and the snapshot's checkpoints are added to the session's
+    checkpointer, so agents started with the saved thread IDs continue where
+    they stopped. An attached persistence backend is not rewritten.
+
+    Args:
+        path: Snapshot file to read
+
+    Raises:
+        SessionSnapshotError: If the file cannot be read as a snapshot
+    """
+    state = read_snapshot(path)
+    session = current_session()
+    for key, value in state['memory'].items():
+        if key in _RECORD_TYPES:
+            convert = _RECORD_TYPES[key]
+            if isinstance(value, list):
+                value = [convert(item) for item in value]
+            else:
+                value = {item_id: convert(item) for item_id, item in value.items()}
+        with _lock(key):
+            _global_memory[key] = value
+            _bump_version(key)
+    session.expert_context.update(state['expert_context'])
+    session.work_log_archive.clear()
+    if state['work_log_archive']:
+        session.work_log_archive.append(state['work_log_archive'])
+    restore_checkpoints(session.checkpointer, state['checkpoints'])
+
+def fork_session() -> MemorySession:
+    """Create a memory session for a sub-agent, seeded with the current memory.
+
+    The sub-agent sees every fact, snippet and related file stored so far but
+    writes only to its own copy, which `merge_forked_session` folds back in.
+    The fork shares the current session's checkpointer and work log limits
+    and persists nothing itself.
+
+    Returns:
+        The forked session
+    """
+    parent = current_session()
+    seed = {}
+    for key in list(parent.memory):
+        with parent.lock(key):
+            value = parent.memory[key]
+            seed[key] = value.copy() if isinstance(value, (dict, list)) else value
+
+    fork = MemorySession()
+    fork.memory = {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in seed.items()}
+    fork.forked_from = seed
+    fork.expert_context = {key: list(values) for key, values in parent.expert_context.items()}
+    fork.checkpointer = parent.checkpointer
+    fork.work_log_limits = parent.work_log_limits
+    return fork
+
+def merge_forked_session(fork: MemorySession) -> None:
+    """Fold what a forked session added into the current session.
+
+    New and changed key facts and snippets are stored as if they were emitted
+    here, so near-duplicate facts and overlapping snippets are merged as
+    usual. New related files, research notes and work log entries are
+    appended. Merging the forks of a fan-out one by one in a fixed order
+    gives the same memory however their agents interleaved. Deletions made in
+    the fork are not applied, so one sub-agent cannot remove what the others
+    rely on. The fork's work log archive file is deleted afterwards.
+
+    Args:
+        fork: A session created by `fork_session` from the current session
+    """
+    seed = fork.forked_from
+    memory = fork.memory
+
+    for fact_id, fact in sorted(memory['key_facts'].items()):
+        if seed['key_facts'].get(fact_id) != fact:
+            _store_key_fact(fact)
+
+    new_files = [path for file_id, path in sorted(memory['related_files'].items())
+                 if file_id not in seed['related_files']]
+    if new_files:
+        _store_related_files(new_files)
+
+    file_cache: FileCache = {}
+    for snippet_id, snippet in sorted(memory['key_snippets'].items()):
+        # Records are replaced, never changed in place, when a snippet changes
+        if seed['key_snippets'].get(snippet_id) is not snippet:
+            _store_key_snippet(snippet, file_cache)
+
+    new_notes = memory['research_notes'][len(seed['research_notes']):]
+    if new_notes:
+        with _lock('research_notes'):
+            for notes in new_notes:
+                _global_memory['research_notes'].append(notes)
+                _backend().put_item('research_notes', len(_global_memory['research_notes']) - 1, notes)
+            _bump_version('research_notes')
+
+    # Compacted entries are in the fork's archive, which starts out empty
+    entries = fork.work_log_archive.read() + list(memory['work_log'])
+    for entry in entries[len(seed['work_log']):]:
+        _append_work_log(WorkLogRecord.from_mapping(entry))
+    fork.work_log_archive.discard()
+
 @tool("emit_research_notes")
 def emit_research_notes(notes: str) -> str:
     """Store research notes in global memory.
@@ -50,7 +262,10 @@ def emit_research_notes(notes: str) -> str:
     Returns:
         The stored notes
     """
-    _global_memory['research_notes'].append(notes)
+    with _lock('research_notes'):
+        _global_memory['research_notes'].append(notes)
+        _backend().put_item('research_notes', len(_global_memory['research_notes']) - 1, notes)
+        _bump_version('research_notes')
     console.print(Panel(Markdown(notes), title="🔍 Research Notes"))
     return notes
 
@@ -64,27 +279,51 @@ def emit_plan(plan: str) -> str:
     Returns:
         The stored plan
     """
-    _global_memory['plans'].append(plan)
+    with _lock('plans'):
+        _global_memory['plans'].append(plan)
+        _backend().put_item('plans', len(_global_memory['plans']) - 1, plan)
+        _bump_version('plans')
     console.print(Panel(Markdown(plan), title="📋 Plan"))
     log_work_event(f"Added plan step:\n\n{plan}")
     return plan
 
 @tool("emit_task")
-def emit_task(task: str) -> str:
+def emit_task(task: str, depends_on: Optional[List[int]] = None, files: Optional[List[str]] = None) -> str:
     """Store a task in global memory.
+
+    Declaring what a task depends on and which files it writes lets tasks
+    that do not depend on each other be implemented concurrently. A task
+    declaring no files is implemented alone, after all earlier tasks and
+    before all later ones.
     
     Args:
         task: The task to store
+        depends_on: IDs of earlier tasks that must be implemented first
+        files: Paths of the files the task will create or modify
         
     Returns:
         String confirming task storage with ID number
     """
-    # Get and increment task ID
-    task_id = _global_memory['task_id_counter']
-    _global_memory['task_id_counter'] += 1
-    
-    # Store task with ID
-    _global_memory['tasks'][task_id] = task
+    with _lock('tasks'):
+        unknown = [task_id for task_id in depends_on or () if task_id not in _global_memory['tasks']]
+        if unknown:
+            return f"Unknown task ID(s) {unknown}; task not stored."
+
+        # Get and increment task ID
+        task_id = _allocate_id('task_id_counter')
+
+        # Store task with ID
+        _global_memory['tasks'][task_id] = task
+        _backend().put_item('tasks', task_id, task)
+        if depends_on:
+            _global_memory['task_dependencies'][task_id] = list(depends_on)
+            _backend().put_item('task_dependencies', task_id, list(depends_on))
+        if files:
+            written = [normalize_path(path) for path in files]
+            _global_memory['task_files'][task_id] = written
+            _backend().put_item('task_files', task_id, written)
+        _bump_version('tasks')
+        _record_change('tasks', ADDED, task_id, task)
     
     console.print(Panel(Markdown(task), title=f"✅ Task #{task_id}"))
     log_work_event(f"Task #{task_id} added:\n\n{task}")
@@ -92,9 +331,40 @@ def emit_task(task: str) -> str:
 
 
 
+def _store_key_fact(fact: str) -> Tuple[int, bool]:
+    """Store a key fact, merging it into a stored near-duplicate if there is one.
+
+    Returns:
+        The fact's ID and whether it was merged into an existing fact
+    """
+    with _lock('key_facts'):
+        index = _key_facts()
+        duplicate_id = index.find_duplicate(fact)
+        if duplicate_id is None:
+            # Get and increment fact ID
+            fact_id = _allocate_id('key_fact_id_counter')
+
+            # Store fact with ID
+            index.add(fact_id, fact)
+            _backend().put_item('key_facts', fact_id, fact)
+            _bump_version('key_facts')
+            _record_change('key_facts', ADDED, fact_id, fact)
+            return fact_id, False
+
+        # Keep the more detailed wording under the existing ID
+        if len(fact) > len(_global_memory['key_facts'][duplicate_id]):
+            index.add(duplicate_id, fact)
+            _backend().put_item('key_facts', duplicate_id, fact)
+            _bump_version('key_facts')
+            _record_change('key_facts', UPDATED, duplicate_id, fact)
+        return duplicate_id, True
+
 @tool("emit_key_facts")
 def emit_key_facts(facts: List[str]) -> str:
     """Store multiple key facts about the project or current task in global memory.
+
+    Facts that restate an already stored fact are merged into it instead of
+    being stored again.
     
     Args:
         facts: List of key facts to store
@@ -103,21 +373,23 @@ def emit_key_facts(facts: List[str]) -> str:
         List of stored fact confirmation messages
     """
     results = []
+    merged_ids = []
     for fact in facts:
-        # Get and increment fact ID
-        fact_id = _global_memory['key_fact_id_counter']
-        _global_memory['key_fact_id_counter'] += 1
-        
-        # Store fact with ID
-        _global_memory['key_facts'][fact_id] = fact
-        
-        # Display panel with ID
-        console.print(Panel(Markdown(fact), title=f"💡 Key Fact #{fact_id}", border_style="bright_cyan"))
-        
-        # Add result message
-        results.append(f"Stored fact #{fact_id}: {fact}")
+        fact_id, merged = _store_key_fact(fact)
+        if merged:
+            merged_ids.append(fact_id)
+
+        if not merged:
+            # Display panel with ID
+            console.print(Panel(Markdown(fact), title=f"💡 Key Fact #{fact_id}", border_style="bright_cyan"))
+            results.append(f"Stored fact #{fact_id}: {fact}")
+        else:
+            console.print(Panel(Markdown(fact), title=f"💡 Key Fact #{fact_id} (already known)", border_style="cyan"))
+            results.append(f"Merged into fact #{fact_id}: {fact}")
     
     log_work_event(f"Stored {len(facts)} key facts.")    
+    if merged_ids:
+        return f"Facts stored. Already known as facts {merged_ids}; not stored again."
     return "Facts stored."
 
 
@@ -133,17 +405,38 @@ def delete_key_facts(fact_ids: List[int]) -> str:
         List of success messages for deleted facts
     """
     results = []
-    for fact_id in fact_ids:
-        if fact_id in _global_memory['key_facts']:
-            # Delete the fact
-            deleted_fact = _global_memory['key_facts'].pop(fact_id)
-            success_msg = f"Successfully deleted fact #{fact_id}: {deleted_fact}"
-            console.print(Panel(Markdown(success_msg), title="Fact Deleted", border_style="green"))
-            results.append(success_msg)
+    with _lock('key_facts'):
+        index = _key_facts()
+        deleted = [(fact_id, index.remove(fact_id)) for fact_id in fact_ids
+                   if fact_id in _global_memory['key_facts']]
+        _backend().delete_items('key_facts', fact_ids)
+        _bump_version('key_facts')
+        for fact_id, _ in deleted:
+            _record_change('key_facts', REMOVED, fact_id)
+    for fact_id, deleted_fact in deleted:
+        success_msg = f"Successfully deleted fact #{fact_id}: {deleted_fact}"
+        console.print(Panel(Markdown(success_msg), title="Fact Deleted", border_style="green"))
+        results.append(success_msg)
     
     log_work_event(f"Deleted facts {fact_ids}.")        
     return "Facts deleted."
 
+def _forget_task_dependencies(task_ids: List[int]) -> None:
+    """Drop the dependencies and write-sets of deleted tasks and any dependencies on them."""
+    dependencies = _global_memory.setdefault('task_dependencies', {})
+    files = _global_memory.setdefault('task_files', {})
+    for task_id in task_ids:
+        dependencies.pop(task_id, None)
+        files.pop(task_id, None)
+    _backend().delete_items('task_dependencies', task_ids)
+    _backend().delete_items('task_files', task_ids)
+
+    removed = set(task_ids)
+    for task_id, required in list(dependencies.items()):
+        if removed.intersection(required):
+            dependencies[task_id] = [dep for dep in required if dep not in removed]
+            _backend().put_item('task_dependencies', task_id, dependencies[task_id])
+
 @tool("delete_tasks")
 def delete_tasks(task_ids: List[int]) -> str:
     """Delete multiple tasks from global memory by their IDs.
@@ -156,15 +449,20 @@ def delete_tasks(task_ids: List[int]) -> str:
         Confirmation message
     """
     results = []
-    for task_id in task_ids:
-        if task_id in _global_memory['tasks']:
-            # Delete the task
-            deleted_task = _global_memory['tasks'].pop(task_id)
-            success_msg = f"Successfully deleted task #{task_id}: {deleted_task}"
-            console.print(Panel(Markdown(success_msg), 
-                              title="Task Deleted", 
-                              border_style="green"))
-            results.append(success_msg)
+    with _lock('tasks'):
+        deleted = [(task_id, _global_memory['tasks'].pop(task_id)) for task_id in task_ids
+                   if task_id in _global_memory['tasks']]
+        _backend().delete_items('tasks', task_ids)
+        _forget_task_dependencies(task_ids)
+        _bump_version('tasks')
+        for task_id, _ in deleted:
+            _record_change('tasks', REMOVED, task_id)
+    for task_id, deleted_task in deleted:
+        success_msg = f"Successfully deleted task #{task_id}: {deleted_task}"
+        console.print(Panel(Markdown(success_msg), 
+                          title="Task Deleted", 
+                          border_style="green"))
+        results.append(success_msg)
     
     log_work_event(f"Deleted tasks {task_ids}.")        
     return "Tasks deleted."
@@ -183,16 +481,167 @@ def request_implementation() -> str:
         Empty string
     """
     _global_memory['implementation_requested'] = True
+    _backend().set_value('implementation_requested', True)
     console.print(Panel("🚀 Implementation Requested", style="yellow", padding=0))
     log_work_event("Implementation requested.")
     return ""
 
 
 
+def _key_facts() -> FactIndex:
+    """Get the key facts index, bound to the current key facts dict."""
+    return current_session().key_facts_index.bind(_global_memory['key_facts'])
+
+def _key_snippets() -> SnippetIntervalIndex:
+    """Get the key snippets index, bound to the current key snippets dict."""
+    return current_session().key_snippets_index.bind(_global_memory['key_snippets'])
+
+def resolve_snippet_id(snippet_id: int) -> int:
+    """Map the ID of a snippet that was merged into another to the surviving snippet's ID."""
+    return _global_memory.get('key_snippet_aliases', {}).get(snippet_id, snippet_id)
+
+def _add_snippet_alias(alias_id: int, snippet_id: int) -> None:
+    """Record that a snippet was merged into another, keeping aliases one hop deep."""
+    aliases = _global_memory.setdefault('key_snippet_aliases', {})
+    for existing_alias, target in list(aliases.items()):
+        if target == alias_id:
+            aliases[existing_alias] = snippet_id
+            _backend().put_item('key_snippet_aliases', existing_alias, snippet_id)
+    aliases[alias_id] = snippet_id
+    _backend().put_item('key_snippet_aliases', alias_id, snippet_id)
+
+def _stamp_key_snippet(snippet_id: int, snippet: SnippetRecord, cache: FileCache) -> None:
+    """Record the file state a snippet was taken from, if its file is readable."""
+    stamps = _global_memory.setdefault('key_snippet_stamps', {})
+    stamp = stamp_snippet(snippet, cache)
+    if stamp is not None:
+        stamps[snippet_id] = stamp
+        _backend().put_item('key_snippet_stamps', snippet_id, stamp)
+    elif stamps.pop(snippet_id, None) is not None:
+        _backend().delete_items('key_snippet_stamps', [snippet_id])
+
+def _forget_key_snippet_stamps(snippet_ids: List[int]) -> None:
+    stamps = _global_memory.setdefault('key_snippet_stamps', {})
+    for snippet_id in snippet_ids:
+        stamps.pop(snippet_id, None)
+    _backend().delete_items('key_snippet_stamps', snippet_ids)
+
+def _replace_key_snippets(index: SnippetIntervalIndex, snippet_ids: List[int], merged: SnippetRecord) -> None:
+    """Replace stored snippets with their merge, kept under the first ID.
+
+    The other IDs become aliases of it. The caller holds the key snippets lock.
+    """
+    snippet_id = snippet_ids[0]
+    for merged_id in snippet_ids[1:]:
+        index.remove(merged_id)
+        _add_snippet_alias(merged_id, snippet_id)
+    index.remove(snippet_id)
+    index.add(snippet_id, merged)
+    _backend().delete_items('key_snippets', snippet_ids[1:])
+    _forget_key_snippet_stamps(snippet_ids[1:])
+    _backend().put_item('key_snippets', snippet_id, merged)
+    for merged_id in snippet_ids[1:]:
+        _record_change('key_snippets', REMOVED, merged_id)
+    _record_change('key_snippets', UPDATED, snippet_id, merged)
+    # The merged snippet replaces an existing one in place
+    _renderer('key_snippets').invalidate()
+
+def _merge_revalidated_snippets(index: SnippetIntervalIndex, snippet_ids: List[int]) -> int:
+    """Merge revalidated snippets into current snippets they now overlap or touch.
+
+    Returns:
+        Number of snippets merged away
+    """
+    snippets = _global_memory['key_snippets']
+    file_cache: FileCache = {}
+    merged_away = 0
+    for snippet_id in snippet_ids:
+        # Stale snippets no longer match their file, so their lines are not merged
+        while snippet_id in snippets and not snippets[snippet_id].get('stale'):
+            overlapping = [other_id for other_id in index.overlapping(snippets[snippet_id])
+                           if not snippets[other_id].get('stale')]
+            if len(overlapping) < 2:
+                break
+            merged = SnippetRecord.from_mapping(merge_snippets([snippets[other_id] for other_id in overlapping]))
+            _replace_key_snippets(index, overlapping, merged)
+            _stamp_key_snippet(overlapping[0], merged, file_cache)
+            merged_away += len(overlapping) - 1
+            snippet_id = overlapping[0]
+    return merged_away
+
+def revalidate_key_snippets() -> int:
+    """Bring stored snippets up to date with their files.
+
+    Costs one stat per file with stamped snippets and only re-reads files whose
+    modification time or size changed. Moved snippets are relocated, changed
+    snippets are refreshed when their first line can still be found, and the
+    rest are flagged as stale. Relocated or refreshed snippets that now
+    overlap or touch another snippet are merged into it.
+
+    Returns:
+        Number of snippets whose content or location changed
+    """
+    if not _global_memory.get('key_snippet_stamps'):
+        return 0
+    with _lock('key_snippets'):
+        stamps = _global_memory['key_snippet_stamps']
+        index = _key_snippets()
+        changes = revalidate_snippets(_global_memory['key_snippets'], stamps, index.files())
+
+        changed = 0
+        for snippet_id, (snippet, stamp) in changes.items():
+            stamps[snippet_id] = stamp
+            _backend().put_item('key_snippet_stamps', snippet_id, stamp)
+            if snippet is not _global_memory['key_snippets'][snippet_id]:
+                snippet = SnippetRecord.from_mapping(snippet)
+                index.remove(snippet_id)
+                index.add(snippet_id, snippet)
+                _backend().put_item('key_snippets', snippet_id, snippet)
+                _record_change('key_snippets', UPDATED, snippet_id, snippet)
+                changed += 1
+        if changed:
+            changed += _merge_revalidated_snippets(index, sorted(changes))
+            _renderer('key_snippets').invalidate()
+            _bump_version('key_snippets')
+    return changed
+
+def _store_key_snippet(stored_snippet: SnippetRecord, file_cache: FileCache) -> Tuple[int, Optional[SnippetRecord], bool]:
+    """Store a key snippet, merging it into stored snippets it overlaps or touches.
+
+    Returns:
+        The snippet's ID, the snippet as stored (None if it added nothing to
+        an existing snippet) and whether it was merged into an existing snippet
+    """
+    with _lock('key_snippets'):
+        index = _key_snippets()
+        overlapping = index.overlapping(stored_snippet)
+        if overlapping:
+            # Merge into the oldest snippet covering overlapping or adjacent lines
+            snippet_id = overlapping[0]
+            existing = [_global_memory['key_snippets'][existing_id] for existing_id in overlapping]
+            merged = SnippetRecord.from_mapping(merge_snippets(existing + [stored_snippet]))
+            if len(existing) == 1 and merged['snippet'] == existing[0]['snippet'] \
+                    and merged['line_number'] == existing[0]['line_number']:
+                return snippet_id, None, True
+
+            _replace_key_snippets(index, overlapping, merged)
+            stored_snippet = merged
+        else:
+            # Get and increment snippet ID 
+            snippet_id = _allocate_id('key_snippet_id_counter')
+            index.add(snippet_id, stored_snippet)
+            _backend().put_item('key_snippets', snippet_id, stored_snippet)
+            _record_change('key_snippets', ADDED, snippet_id, stored_snippet)
+        _bump_version('key_snippets')
+        _stamp_key_snippet(snippet_id, stored_snippet, file_cache)
+    return snippet_id, stored_snippet, bool(overlapping)
+
 @tool("emit_key_snippets")
 def emit_key_snippets(snippets: List[SnippetInfo]) -> str:
     """Store multiple key source code snippets in global memory.
     Automatically adds the filepaths of the snippets to related files.
+    A snippet overlapping or adjacent to an already stored snippet of the same
+    file is merged into that snippet instead of being stored separately.
     
     Args:
         snippets: List of snippet information dictionaries containing:
@@ -210,38 +659,42 @@ def emit_key_snippets(snippets: List[SnippetInfo]) -> str:
     emit_related_files.invoke({"files": [snippet_info['filepath'] for snippet_info in snippets]})
 
     results = []
+    file_cache: FileCache = {}
     for snippet_info in snippets:
-        # Get and increment snippet ID 
-        snippet_id = _global_memory['key_snippet_id_counter']
-        _global_memory['key_snippet_id_counter'] += 1
-        
         # Store snippet info with all fields
-        _global_memory['key_snippets'][snippet_id] = {
-            'filepath': snippet_info['filepath'],
-            'line_number': snippet_info['line_number'],
-            'snippet': snippet_info['snippet'],
-            'description': snippet_info['description'],
-            'source': snippet_info['source'],
-            'relevance': snippet_info['relevance']
-        }
-        
+        stored_snippet = SnippetRecord(
+            snippet_info['filepath'],
+            snippet_info['line_number'],
+            snippet_info['snippet'],
+            snippet_info['description'],
+            snippet_info['source'],
+            snippet_info['relevance'],
+        )
+
+        snippet_id, stored, merged = _store_key_snippet(stored_snippet, file_cache)
+        if stored is None:
+            results.append(f"Snippet duplicates #{snippet_id}")
+            continue
+        stored_snippet = stored
+        title = f"📝 Key Snippet #{snippet_id} (merged)" if merged else f"📝 Key Snippet #{snippet_id}"
+
         # Format display text as markdown
         display_text = [
             f"**Source Location**:",
-            f"- File: `{snippet_info['filepath']}`",
-            f"- Line: `{snippet_info['line_number']}`",
+            f"- File: `{stored_snippet['filepath']}`",
+            f"- Line: `{stored_snippet['line_number']}`",
             "",  # Empty line before code block
             "**Code**:",
             "```python",
-            snippet_info['snippet'].rstrip(),  # Remove trailing whitespace 
+            stored_snippet['snippet'].rstrip(),  # Remove trailing whitespace 
             "```"
         ]
-        if snippet_info['description']:
-            display_text.extend(["", "**Description**:", snippet_info['description']])
+        if stored_snippet['description']:
+            display_text.extend(["", "**Description**:", stored_snippet['description']])
             
         # Display panel
         console.print(Panel(Markdown("\n".join(display_text)), 
-                          title=f"📝 Key Snippet #{snippet_id}", 
+                          title=title, 
                           border_style="bright_cyan"))
         
         results.append(f"Stored snippet #{snippet_id}")
@@ -261,10 +714,18 @@ def delete_key_snippets(snippet_ids: List[int]) -> str:
         List of success messages for deleted snippets
     """
     results = []
-    for snippet_id in snippet_ids:
-        if snippet_id in _global_memory['key_snippets']:
-            # Delete the snippet
-            deleted_snippet = _global_memory['key_snippets'].pop(snippet_id)
+    with _lock('key_snippets'):
+        index = _key_snippets()
+        snippet_ids = [resolve_snippet_id(snippet_id) for snippet_id in snippet_ids]
+        deleted = [(snippet_id, index.remove(snippet_id)) for snippet_id in snippet_ids]
+        _backend().delete_items('key_snippets', snippet_ids)
+        _forget_key_snippet_stamps(snippet_ids)
+        _bump_version('key_snippets')
+        for snippet_id, deleted_snippet in deleted:
+            if deleted_snippet is not None:
+                _record_change('key_snippets', REMOVED, snippet_id)
+    for snippet_id, deleted_snippet in deleted:
+        if deleted_snippet is not None:
             success_msg = f"Successfully deleted snippet #{snippet_id} from {deleted_snippet['filepath']}"
             console.print(Panel(Markdown(success_msg), 
                               title="Snippet Deleted", 
@@ -274,6 +735,34 @@ def delete_key_snippets(snippet_ids: List[int]) -> str:
     log_work_event(f"Deleted snippets {snippet_ids}.")        
     return "Snippets deleted."
 
+def _swap_task_dependencies(id1: int, id2: int) -> None:
+    """Move dependencies and write-sets along with two swapped tasks.
+
+    The tasks trade IDs, so references to either ID are swapped as well.
+    """
+    dependencies = _global_memory.setdefault('task_dependencies', {})
+    renamed = {id1: id2, id2: id1}
+    swapped = {renamed.get(task_id, task_id): [renamed.get(dep, dep) for dep in required]
+               for task_id, required in dependencies.items()}
+    dependencies.clear()
+    dependencies.update(swapped)
+
+    files = _global_memory.setdefault('task_files', {})
+    first, second = files.pop(id1, None), files.pop(id2, None)
+    if second is not None:
+        files[id1] = second
+    if first is not None:
+        files[id2] = first
+
+    _backend().clear_collection('task_dependencies')
+    for task_id, required in dependencies.items():
+        _backend().put_item('task_dependencies', task_id, required)
+    for task_id in (id1, id2):
+        if task_id in files:
+            _backend().put_item('task_files', task_id, files[task_id])
+        else:
+            _backend().delete_items('task_files', [task_id])
+
 @tool("swap_task_order")
 def swap_task_order(id1: int, id2: int) -> str:
     """Swap the order of two tasks in global memory by their IDs.
@@ -289,13 +778,20 @@ def swap_task_order(id1: int, id2: int) -> str:
     if id1 == id2:
         return "Cannot swap task with itself"
         
-    # Validate both IDs exist
-    if id1 not in _global_memory['tasks'] or id2 not in _global_memory['tasks']:
-        return "Invalid task ID(s)"
-        
-    # Swap the tasks
-    _global_memory['tasks'][id1], _global_memory['tasks'][id2] = \
-        _global_memory['tasks'][id2], _global_memory['tasks'][id1]
+    with _lock('tasks'):
+        # Validate both IDs exist
+        if id1 not in _global_memory['tasks'] or id2 not in _global_memory['tasks']:
+            return "Invalid task ID(s)"
+
+        # Swap the tasks
+        _global_memory['tasks'][id1], _global_memory['tasks'][id2] = \
+            _global_memory['tasks'][id2], _global_memory['tasks'][id1]
+        _backend().put_item('tasks', id1, _global_memory['tasks'][id1])
+        _backend().put_item('tasks', id2, _global_memory['tasks'][id2])
+        _swap_task_dependencies(id1, id2)
+        _bump_version('tasks')
+        _record_change('tasks', UPDATED, id1, _global_memory['tasks'][id1])
+        _record_change('tasks', UPDATED, id2, _global_memory['tasks'][id2])
     
     # Display what was swapped
     console.print(Panel(
@@ -351,20 +847,68 @@ def plan_implementation_completed(message: str) -> str:
     """
     _global_memory['plan_completed'] = True
     _global_memory['completion_message'] = message
-    _global_memory['tasks'].clear()  # Clear task list when plan is completed
-    _global_memory['task_id_counter'] = 1
+    with _lock('tasks'), _lock('task_id_counter'):
+        for task_id in sorted(_global_memory['tasks']):
+            _record_change('tasks', REMOVED, task_id)
+        _global_memory['tasks'].clear()  # Clear task list when plan is completed
+        _global_memory['task_dependencies'] = {}
+        _global_memory['task_files'] = {}
+        _global_memory['task_id_counter'] = 1
+        _backend().clear_collection('tasks')
+        _backend().clear_collection('task_dependencies')
+        _backend().clear_collection('task_files')
+        _bump_version('tasks')
+        _backend().set_value('task_id_counter', 1)
+    _backend().set_value('plan_completed', True)
     console.print(Panel(Markdown(message), title="✅ Plan Executed"))
     log_work_event(f"Plan execution completed:\n\n{message}")
     return "Plan completion noted and task list cleared."
 
+def _related_files() -> RelatedFilesIndex:
+    """Get the related files index, bound to the current related files dict."""
+    return current_session().related_files_index.bind(_global_memory['related_files'])
+
 def get_related_files() -> List[str]:
     """Get the current list of related files.
     
     Returns:
         List of formatted strings in the format 'ID#X path/to/file.py'
     """
-    files = _global_memory['related_files']
-    return [f"ID#{file_id} {filepath}" for file_id, filepath in sorted(files.items())]
+    with _lock('related_files'):
+        return [f"ID#{file_id} {filepath}" for file_id, filepath in _related_files().items()]
+
+def get_related_file_paths() -> List[str]:
+    """Get the paths of all related files in the order they were added."""
+    with _lock('related_files'):
+        return _related_files().paths()
+
+def _store_related_files(files: List[str]) -> List[Tuple[int, str, bool]]:
+    """Register related files, reusing the ID of equivalent registered paths.
+
+    Returns:
+        (ID, stored path, newly added) for each file, in order
+    """
+    stored = []
+    with _lock('related_files'):
+        index = _related_files()
+        for file in files:
+            # Check if an equivalent path is already registered
+            existing_id = index.get_id(file)
+
+            if existing_id is not None:
+                # File exists, use existing ID
+                stored.append((existing_id, _global_memory['related_files'][existing_id], False))
+            else:
+                # New file, assign new ID
+                file_id = _allocate_id('related_file_id_counter')
+
+                # Store normalized file path with ID
+                file = index.add(file_id, file)
+                _backend().put_item('related_files', file_id, file)
+                _bump_version('related_files')
+                _record_change('related_files', ADDED, file_id, file)
+                stored.append((file_id, file, True))
+    return stored
 
 @tool("emit_related_files")
 def emit_related_files(files: List[str]) -> str:
@@ -380,26 +924,10 @@ def emit_related_files(files: List[str]) -> str:
     added_files = []
     
     # Process files
-    for file in files:
-        # Check if file path already exists in values
-        existing_id = None
-        for fid, fpath in _global_memory['related_files'].items():
-            if fpath == file:
-                existing_id = fid
-                break
-                
-        if existing_id is not None:
-            # File exists, use existing ID
-            results.append(f"File ID #{existing_id}: {file}")
-        else:
-            # New file, assign new ID
-            file_id = _global_memory['related_file_id_counter']
-            _global_memory['related_file_id_counter'] += 1
-            
-            # Store file with ID
-            _global_memory['related_files'][file_id] = file
+    for file_id, file, added in _store_related_files(files):
+        if added:
             added_files.append((file_id, file))
-            results.append(f"File ID #{file_id}: {file}")
+        results.append(f"File ID #{file_id}: {file}")
     
     # Rich output - single consolidated panel
     if added_files:
@@ -412,11 +940,30 @@ def emit_related_files(files: List[str]) -> str:
     return '\n'.join(results)
 
 
+def set_work_log_limits(limits: WorkLogLimits) -> None:
+    """Set the entry and size caps of the in-memory work log."""
+    current_session().work_log_limits = limits
+
+def set_work_log_archive(path: Optional[str]) -> None:
+    """Set the file compacted work log entries are appended to.
+
+    Args:
+        path: JSONL file path, or None to use a temporary file
+    """
+    current_session().work_log_archive = WorkLogArchive(path)
+
+def _work_log_offset() -> int:
+    """Number of entries compacted out of the in-memory work log."""
+    digest = _global_memory.get('work_log_digest')
+    return digest['entries'] if digest else 0
+
 def log_work_event(event: str) -> str:
     """Add timestamped entry to work log.
     
     Internal function used to track major events during agent execution.
-    Each entry is stored with an ISO format timestamp.
+    Each entry is stored with an ISO format timestamp. Once the log exceeds
+    its entry or size cap, the oldest entries are moved to the on-disk
+    archive and summarized in a digest.
     
     Args:
         event: Description of the event to log
@@ -427,18 +974,34 @@ def log_work_event(event: str) -> str:
     Note:
         Entries can be retrieved with get_work_log() as markdown formatted text.
     """
-    from datetime import datetime
-    entry = WorkLogEntry(
-        timestamp=datetime.now().isoformat(),
-        event=event
-    )
-    _global_memory['work_log'].append(entry)
+    _append_work_log(WorkLogRecord(time.time(), event))
     return f"Event logged: {event}"
 
 
+def _append_work_log(entry: WorkLogRecord) -> None:
+    """Append an entry to the work log, compacting the log if it exceeds its caps."""
+    session = current_session()
+    with session.lock('work_log'):
+        entries = _global_memory['work_log']
+        offset = _work_log_offset()
+        entries.append(entry)
+        _backend().put_item('work_log', offset + len(entries) - 1, entry)
+
+        evicted, digest = compact(entries, _global_memory.get('work_log_digest'), session.work_log_limits)
+        if evicted:
+            session.work_log_archive.append(evicted)
+            _global_memory['work_log_digest'] = digest
+            _backend().delete_items('work_log', list(range(offset, offset + len(evicted))))
+            _backend().set_value('work_log_digest', digest)
+        _bump_version('work_log')
+
+
 def get_work_log() -> str:
     """Return formatted markdown of work log entries.
     
+    Entries compacted out of memory are summarized by a digest section at the
+    top; use get_full_work_log() for every entry.
+
     Returns:
         Markdown formatted text with timestamps as headings and events as content,
         or 'No work log entries' if the log is empty.
@@ -448,11 +1011,16 @@ def get_work_log() -> str:
 
         Task #1 added: Create login form
     """
-    if not _global_memory['work_log']:
+    with _lock('work_log'):
+        log = current_session().snapshot('work_log')
+        digest = _global_memory.get('work_log_digest')
+    if not log:
         return "No work log entries"
     
     entries = []
-    for entry in _global_memory['work_log']:
+    if digest:
+        entries.extend([format_digest(digest), ""])
+    for entry in log:
         entries.extend([
             f"## {entry['timestamp']}",
             "",
@@ -463,6 +1031,17 @@ def get_work_log() -> str:
     return "\n".join(entries).rstrip()  # Remove trailing newline
 
 
+def get_full_work_log() -> List[WorkLogRecord]:
+    """Get every work log entry, reading compacted entries back from disk.
+
+    Returns:
+        All entries since the last reset, oldest first
+    """
+    with _lock('work_log'):
+        archived = current_session().work_log_archive.read()
+        return [WorkLogRecord.from_mapping(entry) for entry in archived] + list(_global_memory['work_log'])
+
+
 def reset_work_log() -> str:
     """Clear the work log.
     
@@ -470,9 +1049,16 @@ def reset_work_log() -> str:
         Confirmation message
         
     Note:
-        This permanently removes all work log entries. The operation cannot be undone.
+        This permanently removes all work log entries, including compacted ones.
+        The operation cannot be undone.
     """
-    _global_memory['work_log'].clear()
+    with _lock('work_log'):
+        _global_memory['work_log'].clear()
+        _global_memory['work_log_digest'] = None
+        current_session().work_log_archive.clear()
+        _backend().clear_collection('work_log')
+        _backend().set_value('work_log_digest', None)
+        _bump_version('work_log')
     return "Work log cleared"
 
 
@@ -488,10 +1074,16 @@ def deregister_related_files(file_ids: List[int]) -> str:
         Success message string
     """
     results = []
-    for file_id in file_ids:
-        if file_id in _global_memory['related_files']:
-            # Delete the file reference
-            deleted_file = _global_memory['related_files'].pop(file_id)
+    with _lock('related_files'):
+        index = _related_files()
+        deleted = [(file_id, index.remove(file_id)) for file_id in file_ids]
+        _backend().delete_items('related_files', file_ids)
+        _bump_version('related_files')
+        for file_id, deleted_file in deleted:
+            if deleted_file is not None:
+                _record_change('related_files', REMOVED, file_id)
+    for file_id, deleted_file in deleted:
+        if deleted_file is not None:
             success_msg = f"Successfully removed related file #{file_id}: {deleted_file}"
             console.print(Panel(Markdown(success_msg), 
                               title="File Reference Removed", 
@@ -500,6 +1092,52 @@ def deregister_related_files(file_ids: List[int]) -> str:
             
     return "File references removed."
 
+def _format_key_fact(fact_id: int, fact: str) -> str:
+    return f"## 🔑 Key Fact #{fact_id}\n\n{fact}"
+
+def _format_key_snippet(snippet_id: int, snippet: SnippetRecord) -> str:
+    snippet_text = [
+        f"## 📝 Code Snippet #{snippet_id}",
+        "",  # Empty line for better markdown spacing
+        f"**Source Location**:",
+        f"- File: `{snippet['filepath']}`",
+        f"- Line: `{snippet['line_number']}`",
+        "",  # Empty line before code block
+        "**Code**:",
+        "```python",
+        snippet['snippet'].rstrip(),  # Remove trailing whitespace
+        "```"
+    ]
+    if snippet['description']:
+        # Add empty line and description
+        snippet_text.extend(["", "**Description**:", snippet['description']])
+    if snippet.get('stale'):
+        snippet_text.extend(["", f"**Stale**: `{snippet['filepath']}` changed and this code could not be found in it. Re-read the file before relying on this snippet."])
+    return "\n".join(snippet_text)
+
+def _format_work_log_entry(index: int, entry: WorkLogRecord) -> str:
+    return f"## {entry['timestamp']}\n{entry['event']}"
+
+# Formatters of the collections rendered through a cache
+_FORMATTERS = {
+    'key_facts': _format_key_fact,
+    'key_snippets': _format_key_snippet,
+    'work_log': _format_work_log_entry,
+}
+
+def _renderer(key: str) -> CachedRenderer:
+    """Get the session's markdown renderer for a collection, reused across prompt builds."""
+    renderers = current_session().renderers
+    if key not in renderers:
+        renderers[key] = CachedRenderer(_FORMATTERS[key])
+    return renderers[key]
+
+def _with_work_log_digest(text: str) -> str:
+    digest = _global_memory.get('work_log_digest')
+    if not digest:
+        return text
+    return f"{format_digest(digest)}\n\n{text}" if text else format_digest(digest)
+
 def get_memory_value(key: str) -> str:
     """Get a value from global memory.
     
@@ -507,6 +1145,10 @@ def get_memory_value(key: str) -> str:
     - key_facts: Returns numbered list of facts in format '#ID: fact'
     - key_snippets: Returns formatted snippets with file path, line number and content
     - All other types: Returns newline-separated list of values
+
+    Facts, snippets and the work log are rendered through a cache keyed on the
+    collection's version, so unchanged collections are not reformatted.
+    Values are read from a snapshot, so rendering never holds up writers.
     
     Args:
         key: The key to get from memory
@@ -517,53 +1159,71 @@ def get_memory_value(key: str) -> str:
         - For key_snippets: Formatted snippet blocks
         - For other types: One value per line
     """
-    values = _global_memory.get(key, [])
-    
-    if key == 'key_facts':
-        # For empty dict, return empty string
-        if not values:
-            return ""
-        # Sort by ID for consistent output and format as markdown sections
-        facts = []
-        for k, v in sorted(values.items()):
-            facts.extend([
-                f"## 🔑 Key Fact #{k}",
-                "",  # Empty line for better markdown spacing
-                v,
-                ""  # Empty line between facts
-            ])
-        return "\n".join(facts).rstrip()  # Remove trailing newline
-    
     if key == 'key_snippets':
-        if not values:
-            return ""
-        # Format each snippet with file info and content using markdown
-        snippets = []
-        for k, v in sorted(values.items()):
-            snippet_text = [
-                f"## 📝 Code Snippet #{k}",
-                "",  # Empty line for better markdown spacing
-                f"**Source Location**:",
-                f"- File: `{v['filepath']}`",
-                f"- Line: `{v['line_number']}`",
-                "",  # Empty line before code block
-                "**Code**:",
-                "```python",
-                v['snippet'].rstrip(),  # Remove trailing whitespace
-                "```"
-            ]
-            if v['description']:
-                # Add empty line and description
-                snippet_text.extend(["", "**Description**:", v['description']])
-            snippets.append("\n".join(snippet_text))
-        return "\n\n".join(snippets)
-    
-    if key == 'work_log':
-        if not values:
-            return ""
-        entries = [f"## {entry['timestamp']}\n{entry['event']}"
-                  for entry in values]
-        return "\n\n".join(entries)
+        revalidate_key_snippets()
+    values = current_session().snapshot(key)
+    if values is None:
+        values = []
+    
+    if key in _FORMATTERS:
+        rendered = _renderer(key).render(values, get_memory_version(key))
+        if key == 'work_log':
+            return _with_work_log_digest(rendered)
+        # Facts drop trailing whitespace after the last fact
+        return rendered.rstrip() if key == 'key_facts' else rendered
 
     # For other types (lists), join with newlines
-    return "\n".join(str(v) for v in values)
\ No newline at end of file
+    return "\n".join(str(v) for v in values)
+
+
+def _snippet_search_text(snippet: SnippetRecord) -> str:
+    return f"{snippet['filepath']} {snippet.get('description') or ''} {snippet['snippet']}"
+
+# How budgeted renders find the searchable text and stored relevance of each item
+_BUDGET_RANKING = {
+    'key_facts': (str, None),
+    'key_snippets': (_snippet_search_text, lambda snippet: snippet.get('relevance')),
+    'work_log': (lambda entry: entry['event'], None),
+}
+
+_BUDGET_LABELS = {
+    'key_facts': "key facts",
+    'key_snippets': "key snippets",
+    'work_log': "work log entries",
+}
+
+def render_memory_budgeted(key: str, max_tokens: int, query: str = "") -> BudgetedRender:
+    """Render a memory section so it fits within a token budget.
+
+    If the whole section fits it is returned unchanged. Otherwise items are
+    ranked by stored relevance (snippets only), recency and word overlap with
+    the query, and the best ones that fit are rendered in their usual order,
+    followed by a note listing what was left out.
+
+    Args:
+        key: One of 'key_facts', 'key_snippets' or 'work_log'
+        max_tokens: Token budget for the section
+        query: Current task text used to rank items
+
+    Returns:
+        The rendered section along with the included and omitted item IDs
+    """
+    full_text = get_memory_value(key)
+    values = current_session().snapshot(key) or []
+    keys = list(values) if isinstance(values, Mapping) else list(range(len(values)))
+    if key not in _BUDGET_RANKING or estimate_tokens(full_text) <= max_tokens:
+        return BudgetedRender(full_text, sorted(keys), [])
+
+    text_of, relevance_of = _BUDGET_RANKING[key]
+    ranking = rank_items(values, query, text_of, relevance_of)
+    result = render_within_budget(values, _renderer(key).block, ranking, max_tokens)
+
+    if key == 'key_facts':
+        result.text = result.text.rstrip()
+    elif key == 'work_log':
+        result.text = _with_work_log_digest(result.text)
+    note = f"*{len(result.omitted)} lower-priority {_BUDGET_LABELS[key]} omitted to fit the prompt budget"
+    if isinstance(values, Mapping):
+        note += ": " + ", ".join(f"#{item_id}" for item_id in result.omitted)
+    result.text = f"{result.text}\n\n{note}*" if result.text else f"{note}*"
+    return result
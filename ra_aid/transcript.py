@@ -0,0 +1,175 @@
+"""Record and replay the tool-calling turns of agent runs.
+
+A transcript is the sequence of responses a chat model gave over a run, in
+call order. `RecordingChatModel` wraps a live model and records its
+responses; `ScriptedChatModel` replays them without any network access,
+so whole research, planning and implementation runs can be repeated
+offline with the real agents, tools and memory, e.g. to benchmark the
+orchestration around the model.
+
+Agents started from tools, such as the implementation agents spawned by
+`request_task_implementation`, run to completion before their parent
+continues, so one transcript serves every agent of a run. Runs that start
+agents concurrently (`request_research_batch`, `request_plan_implementation`
+with independent tasks) do not replay deterministically.
+
+Transcripts are stored as JSON:
+
+    {"version": 1, "turns": [{"content": "...", "tool_calls": [{"name": "...", "args": {...}}]}]}
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ra_aid.exceptions import TranscriptMismatch
+
+TRANSCRIPT_VERSION = 1
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def turns_to_messages(turns: Sequence[Dict[str, Any]]) -> List[AIMessage]:
+    """Build the responses of transcript turns, numbering tool call IDs by turn."""
+    return [
+        AIMessage(content=turn.get("content", ""), tool_calls=[
+            {"name": call["name"], "args": call.get("args", {}), "id": call.get("id") or f"call-{index}-{n}"}
+            for n, call in enumerate(turn.get("tool_calls", []))
+        ])
+        for index, turn in enumerate(turns)
+    ]
+
+
+def messages_to_turns(messages: Sequence[AIMessage]) -> List[Dict[str, Any]]:
+    """Reduce responses to transcript turns: their text and tool calls."""
+    turns = []
+    for message in messages:
+        turn: Dict[str, Any] = {"content": _text(message.content)}
+        if message.tool_calls:
+            turn["tool_calls"] = [{"name": call["name"], "args": call["args"]} for call in message.tool_calls]
+        turns.append(turn)
+    return turns
+
+
+def load_transcript(path: str) -> List[AIMessage]:
+    """Load the responses recorded in a transcript file.
+
+    Raises:
+        ValueError: If the file is not a transcript of a supported version
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("version") != TRANSCRIPT_VERSION:
+        raise ValueError(f"{path} is not a version {TRANSCRIPT_VERSION} transcript")
+    return turns_to_messages(data["turns"])
+
+
+def save_transcript(path: str, messages: Sequence[AIMessage]) -> None:
+    """Write responses to a transcript file."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": TRANSCRIPT_VERSION, "turns": messages_to_turns(messages)}, f, indent=2)
+        f.write("\n")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model answering each call with the next response of a transcript.
+
+    Copies made by `bind_tools` share the responses, so every agent of a run
+    takes its turns from the same transcript.
+
+    Attributes:
+        replies: Responses still to give, consumed in order
+        tool_names: Names of the bound tools; replies calling other tools are rejected
+    """
+
+    replies: List[AIMessage]
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def remaining(self) -> int:
+        """Number of responses not given yet."""
+        return len(self.replies)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "ScriptedChatModel":
+        """Bind tools, keeping their names to check replies against."""
+        return self.model_copy(update={'tool_names': [tool.name for tool in tools]})
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        try:
+            reply = self.replies.pop(0)
+        except IndexError:
+            raise TranscriptMismatch("transcript has no responses left") from None
+        unknown = [call["name"] for call in reply.tool_calls if call["name"] not in self.tool_names]
+        if unknown:
+            raise TranscriptMismatch(f"response calls {', '.join(unknown)}, which the agent does not have")
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+class RecordingChatModel(BaseChatModel):
+    """Chat model recording the responses of the model it wraps.
+
+    Copies made by `bind_tools` share the recording.
+
+    Attributes:
+        model: Chat model, or tool-bound chat model, to call
+        responses: Responses given so far, in call order
+        wrapped_llm_type: LLM type of the wrapped model
+    """
+
+    model: Any
+    responses: List[AIMessage] = []
+    wrapped_llm_type: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        # Report the wrapped type, so provider-specific handling such as prompt caching still applies
+        return self.wrapped_llm_type or getattr(self.model, "_llm_type", "recording")
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "RecordingChatModel":
+        """Bind tools to the wrapped model."""
+        return self.model_copy(update={'model': self.model.bind_tools(tools, **kwargs)})
+
+    def _record(self, message: BaseMessage) -> ChatResult:
+        self.responses.append(message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        call_kwargs = {**kwargs, 'stop': stop} if stop else kwargs
+        return self._record(self.model.invoke(messages, **call_kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        call_kwargs = {**kwargs, 'stop': stop} if stop else kwargs
+        return self._record(await self.model.ainvoke(messages, **call_kwargs))
@@ -5,7 +5,7 @@ from components.implementation import implementation_component
 
 @pytest.fixture
 def mock_initialize_llm():
-    with patch('components.implementation.initialize_llm') as mock:
+    with patch('components.implementation.get_llm') as mock:
         yield mock
 
 @pytest.fixture
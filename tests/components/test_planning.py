@@ -5,7 +5,7 @@ from components.planning import planning_component
 
 @pytest.fixture
 def mock_initialize_llm():
-    with patch('components.planning.initialize_llm') as mock:
+    with patch('components.planning.get_llm') as mock:
         yield mock
 
 @pytest.fixture
@@ -5,7 +5,7 @@ from components.research import research_component
 
 @pytest.fixture
 def mock_initialize_llm():
-    with patch('components.research.initialize_llm') as mock:
+    with patch('components.research.get_llm') as mock:
         yield mock
 
 @pytest.fixture
@@ -0,0 +1,94 @@
+import pytest
+
+from ra_aid.exceptions import MemoryChangesExpired
+from ra_aid.memory import memory_session
+from ra_aid.memory.changes import ChangeFeed, MemoryChange
+from ra_aid.tools.memory import (
+    changes_since,
+    delete_key_facts,
+    delete_key_snippets,
+    deregister_related_files,
+    emit_key_facts,
+    emit_key_snippets,
+    emit_task,
+    get_change_version,
+    plan_implementation_completed,
+    swap_task_order,
+)
+
+def summary(changes):
+    return [(change.collection, change.action, change.item_id) for change in changes]
+
+def test_feed_versions_are_contiguous():
+    """Test every change gets the next version and can be read from any version"""
+    feed = ChangeFeed()
+    assert feed.version == 0
+    assert feed.changes_since(0) == []
+    assert feed.record('key_facts', 'added', 1, "a") == 1
+    assert feed.record('tasks', 'added', 1, "t") == 2
+    assert feed.record('key_facts', 'removed', 1) == 3
+
+    assert feed.changes_since(0)[0] == MemoryChange(1, 'key_facts', 'added', 1, "a")
+    assert [change.version for change in feed.changes_since(1)] == [2, 3]
+    assert feed.changes_since(3) == []
+    assert feed.changes_since(10) == []
+    assert [change.version for change in feed.changes_since(0, 'key_facts')] == [1, 3]
+
+def test_feed_history_is_bounded():
+    """Test old changes are dropped and asking for them raises"""
+    feed = ChangeFeed(max_changes=5)
+    for item_id in range(12):
+        feed.record('key_facts', 'added', item_id)
+    with pytest.raises(MemoryChangesExpired):
+        feed.changes_since(0)
+    assert [change.version for change in feed.changes_since(10)] == [11, 12]
+
+def test_memory_tools_record_changes():
+    """Test tool calls show up as item-level changes"""
+    with memory_session():
+        emit_key_facts.invoke({"facts": ["fact one", "fact two"]})
+        start = get_change_version()
+        delete_key_facts.invoke({"fact_ids": [1, 99]})
+        emit_task.invoke({"task": "first"})
+        emit_task.invoke({"task": "second"})
+        swap_task_order.invoke({"id1": 1, "id2": 2})
+
+        assert summary(changes_since(start)) == [
+            ('key_facts', 'removed', 1),
+            ('tasks', 'added', 1),
+            ('tasks', 'added', 2),
+            ('tasks', 'updated', 1),
+            ('tasks', 'updated', 2),
+        ]
+        # Swapped tasks carry their new text
+        assert changes_since(start)[-1].value == "first"
+        assert [change.value for change in changes_since(0, 'key_facts')][:2] == ["fact one", "fact two"]
+
+        start = get_change_version()
+        plan_implementation_completed.invoke({"message": "done"})
+        assert summary(changes_since(start)) == [('tasks', 'removed', 1), ('tasks', 'removed', 2)]
+
+def test_snippet_and_file_changes():
+    """Test snippet merges and file removals are recorded"""
+    def snippet(line_number, text):
+        return {"filepath": "a.py", "line_number": line_number, "snippet": text,
+                "description": None, "source": f"a.py:{line_number}", "relevance": 0.5}
+
+    with memory_session():
+        emit_key_snippets.invoke({"snippets": [snippet(1, "l1"), snippet(5, "l5")]})
+        assert summary(changes_since(0)) == [
+            ('related_files', 'added', 1),
+            ('key_snippets', 'added', 1),
+            ('key_snippets', 'added', 2),
+        ]
+
+        start = get_change_version()
+        emit_key_snippets.invoke({"snippets": [snippet(2, "l2\nl3\nl4")]})
+        changes = changes_since(start, 'key_snippets')
+        assert summary(changes) == [('key_snippets', 'removed', 2), ('key_snippets', 'updated', 1)]
+        assert changes[-1].value['snippet'] == "l1\nl2\nl3\nl4\nl5"
+
+        start = get_change_version()
+        delete_key_snippets.invoke({"snippet_ids": [1]})
+        deregister_related_files.invoke({"file_ids": [1, 7]})
+        assert summary(changes_since(start)) == [('key_snippets', 'removed', 1), ('related_files', 'removed', 1)]
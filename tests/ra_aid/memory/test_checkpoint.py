@@ -0,0 +1,227 @@
+import uuid
+from typing import Any, List
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.checkpoint.base import empty_checkpoint
+
+from ra_aid import agent_utils
+from ra_aid.memory import SQLiteCheckpointer, memory_session
+from ra_aid.memory.checkpoint import _CODEC_ZLIB
+
+
+def put(saver, thread_id, metadata=None, parent=None, messages=()):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": list(messages)}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    if parent:
+        config["configurable"]["checkpoint_id"] = parent
+    return saver.put(config, checkpoint, metadata or {}, {})
+
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = SQLiteCheckpointer(str(tmp_path / "checkpoints.db"), keep=2, cache_size=2)
+    yield saver
+    saver.close()
+
+
+def test_round_trip_survives_reopen(tmp_path):
+    """Test checkpoints, metadata and writes are read back from disk"""
+    path = str(tmp_path / "checkpoints.db")
+    saver = SQLiteCheckpointer(path)
+    saved = put(saver, "t1", {"step": 3, "source": "loop"}, messages=[HumanMessage(content="x" * 5000)])
+    saver.put_writes(saved, [("messages", AIMessage(content="partial"))], "task-1")
+    saver.close()
+
+    reopened = SQLiteCheckpointer(path)
+    loaded = reopened.get_tuple({"configurable": {"thread_id": "t1"}})
+    assert loaded.config == saved
+    assert loaded.metadata == {"step": 3, "source": "loop"}
+    assert loaded.checkpoint["channel_values"]["messages"][0].content == "x" * 5000
+    assert loaded.pending_writes == [("task-1", "messages", AIMessage(content="partial"))]
+    # Large checkpoints are stored compressed
+    codec, size = reopened._conn.execute("SELECT codec, length(checkpoint) FROM checkpoints").fetchone()
+    assert codec == _CODEC_ZLIB and size < 5000
+    reopened.close()
+
+
+def test_superseded_checkpoints_are_pruned(saver):
+    """Test only the newest checkpoints of a thread and their writes are kept"""
+    configs = []
+    parent = None
+    for step in range(5):
+        configs.append(put(saver, "t1", {"step": step}, parent=parent))
+        saver.put_writes(configs[-1], [("messages", step)], f"task-{step}")
+        parent = configs[-1]["configurable"]["checkpoint_id"]
+    put(saver, "t2", {"step": 0})
+
+    assert [saved.metadata["step"] for saved in saver.list({"configurable": {"thread_id": "t1"}})] == [4, 3]
+    assert saver.get_tuple(configs[0]) is None
+    assert saver._conn.execute("SELECT COUNT(*) FROM checkpoint_writes").fetchone()[0] == 2
+    latest = saver.get_tuple({"configurable": {"thread_id": "t1"}})
+    assert latest.parent_config == configs[3]
+    assert len(list(saver.list(None))) == 3
+
+
+def test_list_filters_and_limits(saver):
+    """Test list honours metadata filters, before and limit"""
+    first = put(saver, "t1", {"source": "input"})
+    second = put(saver, "t1", {"source": "loop"}, parent=first["configurable"]["checkpoint_id"])
+
+    assert [s.config for s in saver.list(None, filter={"source": "loop"})] == [second]
+    assert [s.config for s in saver.list(None, before=second)] == [first]
+    assert [s.config for s in saver.list(None, limit=1)] == [second]
+
+
+def test_special_writes_replace_earlier_ones(saver):
+    """Test an error write replaces the previous error of a task"""
+    saved = put(saver, "t1")
+    saver.put_writes(saved, [("__error__", "first")], "task")
+    saver.put_writes(saved, [("__error__", "second")], "task")
+    saver.put_writes(saved, [("messages", "kept")], "task")
+    saver.put_writes(saved, [("messages", "ignored")], "task")
+
+    assert sorted(saver.get_tuple(saved).pending_writes) == [("task", "__error__", "second"),
+                                                              ("task", "messages", "kept")]
+
+
+def test_hot_cache_is_bounded(saver):
+    """Test the in-memory cache holds at most cache_size checkpoints"""
+    for thread in range(4):
+        put(saver, f"t{thread}")
+    assert len(saver._cache) == 2
+    # Evicted checkpoints are read from disk and cached again
+    loaded = saver.get_tuple({"configurable": {"thread_id": "t0"}})
+    assert ("t0", "", loaded.config["configurable"]["checkpoint_id"]) in saver._cache
+    assert len(saver._cache) == 2
+
+
+def test_uuid_thread_ids_and_delete(saver):
+    """Test UUID thread IDs are stored as strings and threads can be deleted"""
+    thread_id = uuid.uuid4()
+    put(saver, thread_id)
+    assert saver.get_tuple({"configurable": {"thread_id": thread_id}}).config["configurable"]["thread_id"] == \
+        str(thread_id)
+
+    saver.delete_thread(thread_id)
+    assert saver.get_tuple({"configurable": {"thread_id": thread_id}}) is None
+
+
+def test_latest_run_ignores_sub_agent_threads(tmp_path):
+    """Test the latest run is the latest top-level run, not the thread that checkpointed last"""
+    path = str(tmp_path / "memory.db")
+    saver = SQLiteCheckpointer(path)
+    assert saver.latest_run_id() is None
+    saver.record_run("run-1")
+    put(saver, "run-1")
+    saver.record_run("run-2")
+    put(saver, "run-2")
+    # A sub-agent started by the run checkpoints after it
+    put(saver, "implementation-agent")
+    assert saver.latest_run_id() == "run-2"
+
+    saver.record_run("run-1")
+    saver.close()
+    assert SQLiteCheckpointer(path).latest_run_id() == "run-1"
+
+
+@pytest.mark.asyncio
+async def test_async_methods(saver):
+    """Test the async API reads what the sync API wrote"""
+    saved = await saver.aput({"configurable": {"thread_id": "t1", "checkpoint_ns": ""}},
+                             empty_checkpoint(), {"step": 1}, {})
+    await saver.aput_writes(saved, [("messages", "hi")], "task")
+
+    loaded = await saver.aget_tuple(saved)
+    assert loaded.pending_writes == [("task", "messages", "hi")]
+    assert [s.config async for s in saver.alist(None)] == [saved]
+
+
+class ScriptedModel(BaseChatModel):
+    """Chat model returning scripted replies, or raising scripted errors"""
+
+    replies: List[Any]
+    seen: List[Any] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append(list(messages))
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+def test_resume_continues_after_last_completed_step(tmp_path, monkeypatch):
+    """Test a crashed agent run resumes without repeating finished steps"""
+    monkeypatch.setattr(agent_utils, "print_agent_output", lambda chunk: None)
+    path = str(tmp_path / "memory.db")
+    tool_call = AIMessage(content="", tool_calls=[{
+        "name": "emit_key_facts", "args": {"facts": ["The API uses FastAPI"]}, "id": "call-1"}])
+
+    with memory_session() as session:
+        session.checkpointer = SQLiteCheckpointer(path)
+        crashed = ScriptedModel(replies=[tool_call, ValueError("process killed")])
+        agent, prompt, run_config = agent_utils._build_research_agent(
+            "Find the web framework", crashed, research_only=True, config={})
+        with pytest.raises(ValueError):
+            agent_utils.run_agent_with_retry(agent, prompt, run_config)
+        thread_id = run_config["configurable"]["thread_id"]
+        session.checkpointer.close()
+
+    # A new process reopens the database and picks up the thread
+    agent_utils.clear_agent_cache()
+    with memory_session() as session:
+        session.checkpointer = SQLiteCheckpointer(path)
+        resumed = ScriptedModel(replies=[AIMessage(content="FastAPI")], seen=[])
+
+        assert agent_utils.resume_agent(thread_id, resumed) == "Agent run completed successfully"
+        messages = resumed.seen[0]
+        assert [type(message) for message in messages[-3:]] == [HumanMessage, AIMessage, ToolMessage]
+        assert len(resumed.seen) == 1
+
+        # The run is complete, so there is nothing left to resume
+        assert agent_utils.resume_agent(thread_id, resumed) is None
+        with pytest.raises(ValueError):
+            agent_utils.resume_agent("unknown", resumed)
+        session.checkpointer.close()
+
+
+def test_run_stages_have_own_threads_and_resume_by_run_id(tmp_path, monkeypatch):
+    """Test research and planning of a run keep separate histories and the run resumes its last stage"""
+    monkeypatch.setattr(agent_utils, "print_agent_output", lambda chunk: None)
+    path = str(tmp_path / "memory.db")
+    # The CLI config carries the run ID, which must not become a shared thread
+    config = {"configurable": {"thread_id": "run-1"}}
+
+    agent_utils.clear_agent_cache()
+    with memory_session() as session:
+        session.checkpointer = SQLiteCheckpointer(path)
+        model = ScriptedModel(replies=[AIMessage(content="Research done"), ValueError("process killed")], seen=[])
+        agent_utils.run_research_agent("Find the web framework", model, research_only=True, config=config,
+                                       thread_id=agent_utils.stage_thread_id("run-1", "research"))
+        with pytest.raises(ValueError):
+            agent_utils.run_planning_agent("Find the web framework", model, config=config,
+                                           thread_id=agent_utils.stage_thread_id("run-1", "planning"))
+        # Planning was sent its own prompt only
+        assert [type(message) for message in model.seen[1]] == [HumanMessage]
+        session.checkpointer.close()
+
+    agent_utils.clear_agent_cache()
+    with memory_session() as session:
+        session.checkpointer = SQLiteCheckpointer(path)
+        resumed = ScriptedModel(replies=[AIMessage(content="Plan done")], seen=[])
+        assert agent_utils.resume_run("run-1", resumed, config=config) == "Agent run completed successfully"
+        assert resumed.seen[0][0].content == model.seen[1][0].content
+        assert agent_utils.resume_run("run-1", resumed, config=config) is None
+        session.checkpointer.close()
+    agent_utils.clear_agent_cache()
@@ -0,0 +1,57 @@
+from ra_aid.memory.facts import FactIndex, fact_shingles, jaccard
+
+def test_shingles_ignore_case_stopwords_and_plurals():
+    """Test rewordings differing only in casing, articles and number match"""
+    assert fact_shingles("The API returns JSON responses") == fact_shingles("api returns a JSON response.")
+    assert fact_shingles("the of and") == frozenset()
+
+def test_jaccard():
+    """Test Jaccard similarity of shingle sets"""
+    first = fact_shingles("config lives in settings.py")
+    assert jaccard(first, first) == 1.0
+    assert jaccard(first, frozenset()) == 0.0
+    assert 0.0 < jaccard(first, fact_shingles("config lives in config.toml")) < 1.0
+
+def test_find_duplicate():
+    """Test near duplicates are found and unrelated facts are not"""
+    facts = {}
+    index = FactIndex().bind(facts)
+    index.add(1, "Database migrations are managed with Alembic")
+    index.add(2, "The CLI entry point is ra_aid/__main__.py")
+    assert facts == {1: "Database migrations are managed with Alembic", 2: "The CLI entry point is ra_aid/__main__.py"}
+
+    assert index.find_duplicate("database migrations are managed with alembic.") == 1
+    assert index.find_duplicate("The CLI entry point is in ra_aid/__main__.py") == 2
+    assert index.find_duplicate("Database backups are managed with cron") is None
+    assert index.find_duplicate("the") is None
+
+def test_add_replaces_and_remove_forgets():
+    """Test replacing a fact reindexes it and removed facts are not matched"""
+    facts = {}
+    index = FactIndex().bind(facts)
+    index.add(1, "Logging is configured in ra_aid/logging_config.py")
+    index.add(1, "Tests run on GitHub Actions")
+    assert index.find_duplicate("Logging is configured in ra_aid/logging_config.py") is None
+    assert index.find_duplicate("tests run on github actions") == 1
+
+    assert index.remove(1) == "Tests run on GitHub Actions"
+    assert index.remove(1) is None
+    assert facts == {}
+    assert index.find_duplicate("tests run on github actions") is None
+
+def test_rebinds_when_dict_changes():
+    """Test the index follows facts replaced or added behind its back"""
+    index = FactIndex().bind({1: "Cache entries expire after an hour"})
+    assert index.find_duplicate("cache entries expire after an hour") == 1
+
+    facts = {5: "Requests retry three times"}
+    index.bind(facts)
+    assert index.find_duplicate("cache entries expire after an hour") is None
+    facts[6] = "Cache entries expire after an hour"
+    assert index.bind(facts).find_duplicate("cache entries expire after an hour") == 6
+
+def test_threshold():
+    """Test the similarity threshold is configurable"""
+    facts = {1: "The frontend is written in TypeScript with React and Redux"}
+    assert FactIndex().bind(facts).find_duplicate("The frontend is written in TypeScript") is None
+    assert FactIndex(threshold=0.5).bind(facts).find_duplicate("The frontend is written in TypeScript") == 1
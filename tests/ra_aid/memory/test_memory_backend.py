@@ -0,0 +1,125 @@
+import pytest
+from ra_aid.memory import MemoryBackend, SQLiteMemoryBackend
+from ra_aid.tools.memory import (
+    _global_memory,
+    set_memory_backend,
+    get_memory_backend,
+    emit_key_facts,
+    delete_key_facts,
+    emit_key_snippets,
+    emit_task,
+    swap_task_order,
+    emit_research_notes,
+    log_work_event,
+    reset_work_log,
+)
+
+@pytest.fixture
+def reset_memory():
+    """Reset global memory and detach any backend around each test"""
+    def clear():
+        _global_memory['key_facts'] = {}
+        _global_memory['key_fact_id_counter'] = 0
+        _global_memory['key_snippets'] = {}
+        _global_memory['key_snippet_id_counter'] = 0
+        _global_memory['research_notes'] = []
+        _global_memory['tasks'] = {}
+        _global_memory['task_id_counter'] = 0
+        _global_memory['related_files'] = {}
+        _global_memory['related_file_id_counter'] = 0
+        _global_memory['work_log'] = []
+        _global_memory['work_log_digest'] = None
+    clear()
+    yield
+    get_memory_backend().close()
+    set_memory_backend(MemoryBackend())
+    clear()
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "memory.db")
+
+def test_sqlite_backend_roundtrip(db_path):
+    """Test items and values survive closing and reopening the database"""
+    backend = SQLiteMemoryBackend(db_path)
+    backend.put_item('key_facts', 1, "A fact")
+    backend.put_item('key_snippets', 2, {'filepath': 'a.py', 'line_number': 3})
+    backend.set_value('key_fact_id_counter', 2)
+    backend.close()
+
+    items, values = SQLiteMemoryBackend(db_path).load()
+    assert items == {
+        'key_facts': {1: "A fact"},
+        'key_snippets': {2: {'filepath': 'a.py', 'line_number': 3}},
+    }
+    assert values == {'key_fact_id_counter': 2}
+
+def test_sqlite_backend_uses_wal(db_path):
+    """Test the database is opened in WAL mode"""
+    backend = SQLiteMemoryBackend(db_path)
+    mode = backend._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    backend.close()
+    assert mode == "wal"
+
+def test_sqlite_backend_delete_and_clear(db_path):
+    """Test deleting single items and clearing a collection"""
+    backend = SQLiteMemoryBackend(db_path)
+    for i in range(3):
+        backend.put_item('tasks', i, f"Task {i}")
+    backend.put_item('work_log', 0, {'timestamp': 't', 'event': 'e'})
+
+    backend.delete_items('tasks', [1, 999])
+    backend.clear_collection('work_log')
+
+    items, _ = backend.load()
+    backend.close()
+    assert items == {'tasks': {0: "Task 0", 2: "Task 2"}}
+
+def test_tools_write_through(reset_memory, db_path):
+    """Test memory tools persist each change and a new session restores it"""
+    set_memory_backend(SQLiteMemoryBackend(db_path))
+
+    emit_key_facts.invoke({"facts": ["First fact", "Second fact"]})
+    delete_key_facts.invoke({"fact_ids": [0]})
+    emit_task.invoke({"task": "Task A"})
+    emit_task.invoke({"task": "Task B"})
+    swap_task_order.invoke({"id1": 0, "id2": 1})
+    emit_research_notes.invoke({"notes": "Some notes"})
+    emit_key_snippets.invoke({"snippets": [{
+        "snippet": "print('hello')",
+        "source": "main.py:20",
+        "relevance": 0.6,
+        "filepath": "main.py",
+        "line_number": 20,
+        "description": None
+    }]})
+    get_memory_backend().close()
+
+    # Simulate a restart with empty in-process memory
+    _global_memory['key_facts'] = {}
+    _global_memory['tasks'] = {}
+    _global_memory['research_notes'] = []
+    _global_memory['key_snippets'] = {}
+    _global_memory['related_files'] = {}
+    _global_memory['key_fact_id_counter'] = 0
+    set_memory_backend(SQLiteMemoryBackend(db_path))
+
+    assert _global_memory['key_facts'] == {1: "Second fact"}
+    assert _global_memory['key_fact_id_counter'] == 2
+    assert _global_memory['tasks'] == {0: "Task B", 1: "Task A"}
+    assert _global_memory['research_notes'] == ["Some notes"]
+    assert _global_memory['key_snippets'][0]['filepath'] == "main.py"
+    assert _global_memory['related_files'] == {0: "main.py"}
+
+def test_work_log_reset_persists(reset_memory, db_path):
+    """Test work log entries and resets are mirrored to the backend"""
+    set_memory_backend(SQLiteMemoryBackend(db_path))
+    log_work_event("First event")
+    log_work_event("Second event")
+
+    items, _ = get_memory_backend().load()
+    assert [entry['event'] for entry in items['work_log'].values()] == ["First event", "Second event"]
+
+    reset_work_log()
+    items, _ = get_memory_backend().load()
+    assert 'work_log' not in items
@@ -0,0 +1,46 @@
+from ra_aid.memory.budget import estimate_tokens, query_terms, rank_items, render_within_budget
+
+def format_item(key, value):
+    return f"#{key}: {value}"
+
+def test_estimate_tokens():
+    """Test the four-characters-per-token estimate"""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+def test_query_terms_ignores_short_words_and_case():
+    """Test overlap terms are lowercased identifiers of three or more characters"""
+    assert query_terms("Fix the DB_pool in db.py") == {"fix", "the", "db_pool"}
+
+def test_rank_items_prefers_relevance_then_overlap_then_recency():
+    """Test ranking combines stored relevance, query overlap and recency"""
+    items = {
+        1: {"text": "database pool", "relevance": 0.2},
+        2: {"text": "unrelated", "relevance": 0.9},
+        3: {"text": "unrelated", "relevance": 0.2},
+    }
+    ranking = rank_items(items, "database pool", lambda v: v["text"], lambda v: v["relevance"])
+    assert ranking == [2, 1, 3]
+
+    # Without relevance scores, overlap beats recency
+    assert rank_items(items, "database", lambda v: v["text"])[0] == 1
+    # Without a query, the newest item comes first
+    assert rank_items(items, "", lambda v: v["text"]) == [3, 2, 1]
+
+def test_render_within_budget_keeps_original_order():
+    """Test selected items render in ID order and the rest are reported omitted"""
+    items = {1: "a" * 40, 2: "b" * 40, 3: "c" * 40}
+    result = render_within_budget(items, format_item, [3, 1, 2], max_tokens=25)
+
+    assert result.included == [1, 3]
+    assert result.omitted == [2]
+    assert result.text == f"#1: {'a' * 40}\n\n#3: {'c' * 40}"
+
+def test_render_within_budget_skips_items_that_do_not_fit():
+    """Test a large top-ranked item is skipped in favor of smaller ones"""
+    items = ["x" * 400, "small", "tiny"]
+    result = render_within_budget(items, format_item, [0, 1, 2], max_tokens=10)
+
+    assert result.included == [1, 2]
+    assert result.omitted == [0]
@@ -0,0 +1,123 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+import pytest
+
+from ra_aid.memory import MemorySession, memory_session
+from ra_aid.tools.memory import (
+    delete_key_facts,
+    emit_key_facts,
+    emit_key_snippets,
+    emit_related_files,
+    emit_task,
+    get_memory_value,
+    get_related_file_paths,
+    log_work_event,
+    swap_task_order,
+)
+
+def hammer(functions, workers=8):
+    """Run each function on a thread pool inside a copy of the current context."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, function) for function in functions]
+        return [future.result() for future in futures]
+
+@pytest.fixture
+def session():
+    with memory_session() as session:
+        yield session
+
+def test_allocate_id_is_unique_under_contention():
+    """Test concurrent ID allocation never hands out the same ID twice"""
+    session = MemorySession()
+    ids = hammer([lambda: session.allocate_id('key_fact_id_counter')] * 2000, workers=16)
+    assert sorted(ids) == list(range(1, 2001))
+    assert session.memory['key_fact_id_counter'] == 2001
+
+def test_concurrent_fact_writers_get_distinct_ids(session):
+    """Test facts emitted from many threads are all stored under distinct IDs"""
+    def writer(worker):
+        return lambda: [emit_key_facts.invoke({"facts": [f"fact {worker}.{n}"]}) for n in range(25)]
+    hammer([writer(worker) for worker in range(8)])
+
+    facts = session.memory['key_facts']
+    assert len(facts) == 200
+    assert sorted(facts) == list(range(1, 201))
+    assert sorted(facts.values()) == sorted(f"fact {worker}.{n}" for worker in range(8) for n in range(25))
+    # Every emit_key_facts call logged one event
+    assert len(session.memory['work_log']) + (session.memory['work_log_digest'] or {}).get('entries', 0) == 200
+
+def test_concurrent_task_edits(session):
+    """Test emitting and swapping tasks concurrently keeps every task exactly once"""
+    hammer([lambda n=n: emit_task.invoke({"task": f"task {n}"}) for n in range(40)])
+    hammer([lambda n=n: swap_task_order.invoke({"id1": 1 + n % 40, "id2": 1 + (n * 7) % 40}) for n in range(200)])
+
+    tasks = session.memory['tasks']
+    assert sorted(tasks) == list(range(1, 41))
+    assert sorted(tasks.values()) == sorted(f"task {n}" for n in range(40))
+
+def test_concurrent_related_files_are_registered_once(session):
+    """Test the same paths emitted from many threads get one ID each"""
+    paths = [f"src/module_{n}.py" for n in range(20)]
+    hammer([lambda: emit_related_files.invoke({"files": paths})] * 16)
+
+    assert sorted(session.memory['related_files'].values()) == sorted(paths)
+    assert sorted(get_related_file_paths()) == sorted(paths)
+
+def test_concurrent_snippet_writers(session):
+    """Test snippets of distinct files emitted concurrently all get stored"""
+    def writer(worker):
+        snippet = {"filepath": f"file_{worker}.py", "line_number": 1, "snippet": "x = 1",
+                   "description": None, "source": f"file_{worker}.py:1", "relevance": 0.5}
+        return lambda: emit_key_snippets.invoke({"snippets": [snippet]})
+    hammer([writer(worker) for worker in range(32)])
+
+    snippets = session.memory['key_snippets']
+    assert sorted(snippet['filepath'] for snippet in snippets.values()) == sorted(f"file_{n}.py" for n in range(32))
+    assert len(set(snippets)) == 32
+
+def test_readers_render_while_writers_write(session):
+    """Test rendering from snapshots is consistent while facts are added and deleted"""
+    def writer(worker):
+        def write():
+            for n in range(50):
+                # Distinct per writer, or the second copy is merged as a duplicate
+                emit_key_facts.invoke({"facts": [f"fact {worker} {n}"]})
+                log_work_event(f"event {n}")
+                if n % 5 == 0:
+                    delete_key_facts.invoke({"fact_ids": [n]})
+        return write
+
+    def reader():
+        for _ in range(100):
+            facts = get_memory_value('key_facts')
+            # Blocks are never torn: each rendered fact heading is followed by its text
+            for block in filter(None, facts.split("## 🔑 Key Fact #")):
+                fact_id, text = block.split("\n\n", 1)
+                assert text.strip().startswith("fact ")
+            get_memory_value('work_log')
+
+    hammer([writer(0), writer(1), reader, reader, reader, reader])
+    # Only IDs some writer deleted can be missing
+    missing = set(range(1, 101)) - set(session.memory['key_facts'])
+    assert missing <= set(range(5, 50, 5))
+    assert set(session.memory['key_facts']) <= set(range(1, 101))
+
+def test_snapshots_are_immutable_and_reused(session):
+    """Test snapshots cannot be mutated and are only copied after a change"""
+    emit_key_facts.invoke({"facts": ["one"]})
+    first = session.snapshot('key_facts')
+    assert isinstance(first, MappingProxyType)
+    with pytest.raises(TypeError):
+        first[99] = "nope"
+    assert session.snapshot('key_facts') is first
+
+    emit_key_facts.invoke({"facts": ["two"]})
+    second = session.snapshot('key_facts')
+    assert second is not first
+    assert dict(first) == {1: "one"}
+    assert dict(second) == {1: "one", 2: "two"}
+
+    log_work_event("logged")
+    assert isinstance(session.snapshot('work_log'), tuple)
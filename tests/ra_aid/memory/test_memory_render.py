@@ -0,0 +1,92 @@
+from ra_aid.memory.render import CachedRenderer
+
+class CountingFormatter:
+    """Formatter that records which items it was asked to format"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, key, value):
+        self.calls.append(key)
+        return f"#{key}: {value}"
+
+def test_unchanged_collection_is_not_reformatted():
+    """Test rendering twice at the same version reuses the cached text"""
+    formatter = CountingFormatter()
+    renderer = CachedRenderer(formatter)
+    items = {1: "a", 2: "b"}
+
+    first = renderer.render(items, 1)
+    second = renderer.render(items, 1)
+
+    assert first == "#1: a\n\n#2: b"
+    assert second is first
+    assert formatter.calls == [1, 2]
+
+def test_appended_items_only_format_new_blocks():
+    """Test a new item at a higher ID appends just its own block"""
+    formatter = CountingFormatter()
+    renderer = CachedRenderer(formatter)
+    items = {1: "a", 2: "b"}
+    renderer.render(items, 1)
+
+    items[3] = "c"
+    assert renderer.render(items, 2) == "#1: a\n\n#2: b\n\n#3: c"
+    assert formatter.calls == [1, 2, 3]
+
+def test_deletion_rejoins_cached_blocks():
+    """Test deletions rebuild the text without reformatting kept items"""
+    formatter = CountingFormatter()
+    renderer = CachedRenderer(formatter)
+    items = {1: "a", 2: "b", 3: "c"}
+    renderer.render(items, 1)
+
+    del items[2]
+    items[4] = "d"
+    assert renderer.render(items, 2) == "#1: a\n\n#3: c\n\n#4: d"
+    assert formatter.calls == [1, 2, 3, 4]
+
+def test_out_of_order_ids_render_sorted():
+    """Test dict collections always render in ascending ID order"""
+    renderer = CachedRenderer(CountingFormatter())
+    items = {5: "e"}
+    renderer.render(items, 1)
+
+    items[2] = "b"
+    assert renderer.render(items, 2) == "#2: b\n\n#5: e"
+
+def test_replaced_collection_and_direct_mutation_are_detected():
+    """Test a new container, or a size change without a version bump, re-renders"""
+    renderer = CachedRenderer(CountingFormatter())
+    items = {1: "a"}
+    renderer.render(items, 1)
+
+    items[2] = "b"
+    assert renderer.render(items, 1) == "#1: a\n\n#2: b"
+    assert renderer.render({7: "x"}, 1) == "#7: x"
+    assert renderer.render({}, 1) == ""
+
+def test_list_collection_append_and_reset():
+    """Test list collections append incrementally and rebuild after a reset"""
+    formatter = CountingFormatter()
+    renderer = CachedRenderer(formatter, separator="\n")
+    entries = ["a", "b"]
+    assert renderer.render(entries, 1) == "#0: a\n#1: b"
+
+    entries.append("c")
+    assert renderer.render(entries, 2) == "#0: a\n#1: b\n#2: c"
+    assert formatter.calls == [0, 1, 2]
+
+    entries.clear()
+    entries.extend(["x", "y", "z", "w"])
+    assert renderer.render(entries, 3) == "#0: x\n#1: y\n#2: z\n#3: w"
+
+def test_invalidate_picks_up_in_place_replacement():
+    """Test invalidate forces replaced values to be reformatted"""
+    renderer = CachedRenderer(CountingFormatter())
+    items = {1: "a"}
+    renderer.render(items, 1)
+
+    items[1] = "changed"
+    items[2] = "b"
+    renderer.invalidate()
+    assert renderer.render(items, 2) == "#1: changed\n\n#2: b"
@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from components.memory import get_memory, initialize_memory
+from ra_aid.memory import MemorySession, current_session, memory_session
+from ra_aid.tools.expert import emit_expert_context, expert_context
+from ra_aid.tools.memory import (
+    _global_memory,
+    emit_key_facts,
+    emit_related_files,
+    get_memory_value,
+    get_related_files,
+)
+
+def test_sessions_are_isolated():
+    """Test memory tools inside a session do not touch other sessions"""
+    default = current_session()
+    with memory_session() as first:
+        emit_key_facts.invoke({"facts": ["first fact"]})
+        with memory_session() as second:
+            assert get_memory_value('key_facts') == ""
+            emit_key_facts.invoke({"facts": ["second fact"]})
+            assert current_session() is second
+        assert "first fact" in get_memory_value('key_facts')
+        assert "second fact" not in get_memory_value('key_facts')
+        assert current_session() is first
+    assert current_session() is default
+    assert first.memory['key_facts'] == {1: "first fact"}
+    assert second.memory['key_facts'] == {1: "second fact"}
+
+def test_session_can_be_resumed():
+    """Test re-entering a session sees its earlier state"""
+    session = MemorySession()
+    with memory_session(session):
+        emit_related_files.invoke({"files": ["a.py"]})
+    with memory_session(session):
+        assert get_related_files() == ["ID#1 a.py"]
+        assert _global_memory['related_file_id_counter'] == 2
+
+def test_expert_and_component_memory_follow_session():
+    """Test the expert context and WebUI component state are per session"""
+    with memory_session() as first:
+        emit_expert_context.invoke("first context")
+        initialize_memory()
+        get_memory()['config'] = {'provider': 'anthropic'}
+        with memory_session():
+            assert expert_context['text'] == []
+            initialize_memory()
+            assert get_memory()['config'] == {}
+    assert first.expert_context['text'] == ["first context"]
+    assert first.component_memory['config'] == {'provider': 'anthropic'}
+
+def test_concurrent_threads_with_copied_context():
+    """Test threads started with a copy of the context write to their own session"""
+    def run(index):
+        with memory_session() as session:
+            def work():
+                for fact_index in range(20):
+                    emit_key_facts.invoke({"facts": [f"fact {index}.{fact_index}"]})
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(contextvars.copy_context().run, work).result()
+            return session
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        sessions = list(executor.map(run, range(4)))
+    for index, session in enumerate(sessions):
+        assert list(session.memory['key_facts'].values()) == [f"fact {index}.{n}" for n in range(20)]
+
+def test_concurrent_asyncio_tasks():
+    """Test asyncio tasks each see the session they entered"""
+    async def run(index):
+        with memory_session() as session:
+            for fact_index in range(5):
+                emit_key_facts.invoke({"facts": [f"fact {index}.{fact_index}"]})
+                await asyncio.sleep(0)
+            return session.memory['key_facts']
+
+    async def main():
+        return await asyncio.gather(*(run(index) for index in range(3)))
+
+    for index, facts in enumerate(asyncio.run(main())):
+        assert list(facts.values()) == [f"fact {index}.{n}" for n in range(5)]
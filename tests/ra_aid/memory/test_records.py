@@ -0,0 +1,94 @@
+import sys
+from datetime import datetime
+
+import pytest
+
+from ra_aid.memory import SQLiteMemoryBackend
+from ra_aid.memory.records import SnippetRecord, WorkLogRecord
+
+def snippet_dict(**overrides):
+    snippet = {
+        'filepath': "src/app.py",
+        'line_number': 10,
+        'snippet': "def main():\n    pass",
+        'description': "Entry point",
+        'source': "src/app.py:10",
+        'relevance': 0.5,
+    }
+    snippet.update(overrides)
+    return snippet
+
+def test_snippet_record_equals_dict():
+    """Test a record compares equal to the dict it was built from, both ways"""
+    snippet = snippet_dict()
+    record = SnippetRecord.from_mapping(snippet)
+    assert record == snippet
+    assert snippet == record
+    assert dict(record) == snippet
+    assert record['source'] == "src/app.py:10"
+    assert record.get('missing') is None
+    with pytest.raises(KeyError):
+        record['missing']
+
+def test_snippet_record_from_record_is_identity():
+    """Test converting a record again returns the same object"""
+    record = SnippetRecord.from_mapping(snippet_dict())
+    assert SnippetRecord.from_mapping(record) is record
+
+def test_stale_key_only_present_when_set():
+    """Test 'stale' is only a key of stale snippets"""
+    record = SnippetRecord.from_mapping(snippet_dict())
+    assert 'stale' not in record
+    assert len(record) == 6
+
+    stale = record.replace(stale=True)
+    assert stale['stale'] is True
+    assert len(stale) == 7
+    assert stale == dict(snippet_dict(), stale=True)
+    assert 'stale' not in record
+
+def test_replace_recomputes_default_source():
+    """Test the default source follows the line number, a custom one is kept"""
+    record = SnippetRecord.from_mapping(snippet_dict())
+    assert record.replace(line_number=20)['source'] == "src/app.py:20"
+
+    custom = SnippetRecord.from_mapping(snippet_dict(source="generated by tool"))
+    assert custom.replace(line_number=20)['source'] == "generated by tool"
+
+def test_snippet_filepaths_are_shared():
+    """Test snippets of one file share a single path string"""
+    first = SnippetRecord.from_mapping(snippet_dict(filepath="".join(["src/", "app.py"])))
+    second = SnippetRecord.from_mapping(snippet_dict(filepath="".join(["src/", "app.py"])))
+    assert first.filepath is second.filepath
+
+def test_work_log_record_timestamp_round_trip():
+    """Test the ISO timestamp is produced on access and parsed back"""
+    now = datetime.now()
+    record = WorkLogRecord(now.timestamp(), "Task #1 added")
+    assert isinstance(record['timestamp'], str)
+    assert datetime.fromisoformat(record['timestamp']) == now
+    assert record == {'timestamp': now.isoformat(), 'event': "Task #1 added"}
+
+    parsed = WorkLogRecord.from_mapping(dict(record))
+    assert parsed == record
+    assert parsed.time == pytest.approx(record.time)
+
+def test_records_have_no_instance_dict():
+    """Test records keep their fields in slots and are smaller than a dict"""
+    snippet = SnippetRecord.from_mapping(snippet_dict())
+    entry = WorkLogRecord(0.0, "event")
+    for record in (snippet, entry):
+        assert not hasattr(record, '__dict__')
+    assert sys.getsizeof(snippet) < sys.getsizeof(snippet_dict())
+    assert sys.getsizeof(entry) < sys.getsizeof({'timestamp': "", 'event': "event"})
+
+def test_records_persist_as_json(tmp_path):
+    """Test the SQLite backend stores records like the dicts they replace"""
+    backend = SQLiteMemoryBackend(str(tmp_path / "memory.db"))
+    backend.put_item('key_snippets', 1, SnippetRecord.from_mapping(snippet_dict()))
+    backend.put_item('work_log', 1, WorkLogRecord(0.0, "event"))
+    items, _ = backend.load()
+    backend.close()
+
+    assert items['key_snippets'] == {1: snippet_dict()}
+    assert items['work_log'] == {1: {'timestamp': datetime.fromtimestamp(0.0).isoformat(), 'event': "event"}}
@@ -0,0 +1,43 @@
+import os
+from ra_aid.memory.related_files import RelatedFilesIndex, normalize_path
+
+def test_normalize_path_collapses_equivalent_spellings():
+    """Test relative, dotted and absolute spellings normalize to one path"""
+    assert normalize_path("./src/app.py") == os.path.join("src", "app.py")
+    assert normalize_path("src//lib/../app.py") == os.path.join("src", "app.py")
+    assert normalize_path(os.path.join(os.getcwd(), "src", "app.py")) == os.path.join("src", "app.py")
+
+def test_normalize_path_keeps_paths_outside_cwd_absolute():
+    """Test absolute paths outside the working directory are left absolute"""
+    outside = os.path.abspath(os.path.join(os.getcwd(), os.pardir, "elsewhere.py"))
+    assert normalize_path(outside) == outside
+
+def test_index_add_lookup_remove():
+    """Test ID lookups by any spelling and removal"""
+    files = {}
+    index = RelatedFilesIndex().bind(files)
+    assert index.add(0, "./a.py") == "a.py"
+    index.add(1, "b.py")
+
+    assert files == {0: "a.py", 1: "b.py"}
+    assert index.get_id("a.py") == 0
+    assert index.get_id(os.path.join(os.getcwd(), "b.py")) == 1
+    assert index.get_id("c.py") is None
+
+    assert index.remove(0) == "a.py"
+    assert index.remove(0) is None
+    assert index.get_id("a.py") is None
+    assert index.paths() == ["b.py"]
+
+def test_index_rebuilds_when_dict_replaced_or_mutated():
+    """Test the index follows a replaced or externally mutated backing dict"""
+    index = RelatedFilesIndex().bind({0: "a.py"})
+    assert index.get_id("a.py") == 0
+
+    replacement = {5: "z.py"}
+    index.bind(replacement)
+    assert index.get_id("a.py") is None
+    assert index.get_id("z.py") == 5
+
+    replacement[6] = "y.py"
+    assert index.bind(replacement).get_id("y.py") == 6
@@ -0,0 +1,95 @@
+import operator
+from typing import Annotated, List
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from typing_extensions import TypedDict
+
+from ra_aid.exceptions import SessionSnapshotError
+from ra_aid.memory import memory_session
+from ra_aid.memory.work_log import WorkLogLimits
+from ra_aid.tools.expert import expert_context
+from ra_aid.tools.memory import (
+    _global_memory,
+    emit_key_facts,
+    emit_key_snippets,
+    emit_task,
+    get_full_work_log,
+    get_memory_value,
+    load_session,
+    log_work_event,
+    save_session,
+    set_work_log_limits,
+)
+
+class State(TypedDict):
+    messages: Annotated[List, operator.add]
+
+def build_graph(checkpointer):
+    """A one-node graph that answers every message, checkpointing each step"""
+    def respond(state):
+        return {"messages": [AIMessage(content=f"reply {len(state['messages'])}")]}
+
+    graph = StateGraph(State)
+    graph.add_node("respond", respond)
+    graph.add_edge(START, "respond")
+    graph.add_edge("respond", END)
+    return graph.compile(checkpointer=checkpointer)
+
+def test_round_trip(tmp_path):
+    """Test memory, expert context and checkpoints survive a save and load"""
+    path = str(tmp_path / "session.bin")
+    config = {"configurable": {"thread_id": "research-1"}}
+
+    with memory_session() as saved:
+        emit_key_facts.invoke({"facts": ["The API is served by FastAPI"]})
+        emit_key_snippets.invoke({"snippets": [{
+            "filepath": "app.py", "line_number": 1, "snippet": "app = FastAPI()",
+            "description": None, "source": "app.py:1", "relevance": 0.5,
+        }]})
+        emit_task.invoke({"task": "Add a health endpoint"})
+        expert_context['text'].append("Deployment uses Docker")
+        build_graph(saved.checkpointer).invoke({"messages": [HumanMessage(content="hi")]}, config)
+        memory_before = dict(saved.memory)
+        facts_before = get_memory_value('key_facts')
+        assert save_session(path) > 0
+
+    with memory_session() as restored:
+        load_session(path)
+        assert restored.memory == memory_before
+        assert type(restored.memory['key_snippets'][1]) is type(memory_before['key_snippets'][1])
+        assert get_memory_value('key_facts') == facts_before
+        assert restored.expert_context['text'] == ["Deployment uses Docker"]
+
+        # The agent thread resumes from its last checkpoint
+        graph = build_graph(restored.checkpointer)
+        assert [message.content for message in graph.get_state(config).values['messages']] == ["hi", "reply 1"]
+        result = graph.invoke({"messages": [HumanMessage(content="again")]}, config)
+        assert [message.content for message in result['messages']] == ["hi", "reply 1", "again", "reply 3"]
+
+        # IDs continue after the restored counters
+        emit_key_facts.invoke({"facts": ["Health checks hit /healthz"]})
+        assert sorted(_global_memory['key_facts']) == [1, 2]
+
+def test_archived_work_log_is_included(tmp_path):
+    """Test compacted work log entries travel with the snapshot"""
+    path = str(tmp_path / "session.bin")
+    with memory_session():
+        set_work_log_limits(WorkLogLimits(max_entries=4, keep_recent=2))
+        for n in range(6):
+            log_work_event(f"event {n}")
+        full_log = get_full_work_log()
+        save_session(path)
+
+    with memory_session():
+        load_session(path)
+        assert get_full_work_log() == full_log
+
+def test_rejects_other_files(tmp_path):
+    """Test loading a file that is not a snapshot raises"""
+    path = tmp_path / "notes.txt"
+    path.write_text("not a snapshot")
+    with memory_session():
+        with pytest.raises(SessionSnapshotError):
+            load_session(str(path))
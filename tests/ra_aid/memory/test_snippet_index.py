@@ -0,0 +1,50 @@
+from ra_aid.memory.snippets import SnippetIntervalIndex, merge_snippets, snippet_span
+
+def make_snippet(filepath, line_number, snippet, **extra):
+    return dict(filepath=filepath, line_number=line_number, snippet=snippet,
+                source=f"{filepath}:{line_number}", relevance=0.5, description=None, **extra)
+
+def test_snippet_span():
+    """Test spans cover one line per snippet line and need a valid line number"""
+    assert snippet_span(make_snippet("a.py", 5, "a\nb\nc")) == (5, 7)
+    assert snippet_span(make_snippet("a.py", 5, "")) == (5, 5)
+    assert snippet_span(make_snippet("a.py", 0, "a")) is None
+    assert snippet_span(make_snippet("a.py", None, "a")) is None
+
+def test_overlapping_finds_touching_ranges_only():
+    """Test lookups match overlapping and adjacent ranges in the same file"""
+    snippets = {}
+    index = SnippetIntervalIndex().bind(snippets)
+    index.add(1, make_snippet("a.py", 1, "a\nb"))      # lines 1-2
+    index.add(2, make_snippet("a.py", 10, "a\nb\nc"))  # lines 10-12
+    index.add(3, make_snippet("b.py", 1, "a"))
+
+    assert index.overlapping(make_snippet("a.py", 3, "x")) == [1]
+    assert index.overlapping(make_snippet("./a.py", 4, "x")) == []
+    assert index.overlapping(make_snippet("a.py", 2, "\n".join("x" * 8))) == [1, 2]
+    assert index.overlapping(make_snippet("a.py", 13, "x")) == [2]
+    assert index.overlapping(make_snippet("c.py", 1, "x")) == []
+
+    index.remove(1)
+    assert 1 not in snippets
+    assert index.overlapping(make_snippet("a.py", 3, "x")) == []
+
+def test_overlapping_finds_ranges_inside_longer_ones():
+    """Test lookups find every overlapping range when stored ranges nest"""
+    index = SnippetIntervalIndex().bind({})
+    index.add(1, make_snippet("a.py", 1, "\n".join("x" * 17)))  # lines 1-17
+    index.add(2, make_snippet("a.py", 7, "a\nb"))               # lines 7-8, inside #1
+
+    assert index.overlapping(make_snippet("a.py", 10, "a\nb")) == [1]
+    assert index.overlapping(make_snippet("a.py", 9, "a")) == [1, 2]
+    assert index.overlapping(make_snippet("a.py", 19, "a")) == []
+
+def test_merge_snippets_prefers_later_lines():
+    """Test merged text lays lines out by number with later snippets winning"""
+    merged = merge_snippets([
+        make_snippet("a.py", 1, "one\ntwo\nthree"),
+        make_snippet("a.py", 3, "THREE\nfour"),
+    ])
+    assert merged['line_number'] == 1
+    assert merged['snippet'] == "one\ntwo\nTHREE\nfour"
+    assert merged['source'] == "a.py:1"
@@ -0,0 +1,107 @@
+import os
+
+from ra_aid.memory.staleness import region_hash, revalidate_snippets, stamp_snippet
+
+def make_snippet(filepath, line_number, snippet):
+    return dict(filepath=filepath, line_number=line_number, snippet=snippet,
+                source=f"{filepath}:{line_number}", relevance=0.5, description=None)
+
+def write_lines(path, lines, mtime_ns=None):
+    path.write_text("\n".join(lines) + "\n")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def stamped(path, line_number, snippet):
+    snippets = {0: make_snippet(str(path), line_number, snippet)}
+    stamps = {0: stamp_snippet(snippets[0])}
+    return snippets, stamps, {str(path): [0]}
+
+def test_region_hash_ignores_trailing_whitespace():
+    """Test region hashes cover the requested lines only"""
+    assert region_hash(["a", "b  ", "c"], 2, 1) == region_hash(["x", "b"], 2, 1)
+    assert region_hash(["a", "b"], 1, 2) != region_hash(["a", "c"], 1, 2)
+
+def test_stamp_requires_readable_file(tmp_path):
+    """Test snippets without a line number or file are not stamped"""
+    path = tmp_path / "a.py"
+    write_lines(path, ["one", "two"])
+    assert stamp_snippet(make_snippet(str(path), 1, "one"))['size'] == path.stat().st_size
+    assert stamp_snippet(make_snippet(str(path), None, "one")) is None
+    assert stamp_snippet(make_snippet(str(tmp_path / "missing.py"), 1, "one")) is None
+
+def test_unchanged_stat_skips_file(tmp_path):
+    """Test files whose mtime and size match the stamp are not re-read"""
+    path = tmp_path / "a.py"
+    write_lines(path, ["one", "two"], mtime_ns=1_000_000_000)
+    snippets, stamps, files = stamped(path, 1, "one")
+
+    # Same size and mtime: content is not inspected, even though it changed
+    write_lines(path, ["ONE", "two"], mtime_ns=1_000_000_000)
+    assert revalidate_snippets(snippets, stamps, files) == {}
+
+def test_change_elsewhere_keeps_snippet(tmp_path):
+    """Test edits outside the snippet only refresh the stamp"""
+    path = tmp_path / "a.py"
+    write_lines(path, ["one", "two", "three"], mtime_ns=1_000_000_000)
+    snippets, stamps, files = stamped(path, 1, "one\ntwo")
+
+    write_lines(path, ["one", "two", "changed three"], mtime_ns=2_000_000_000)
+    changes = revalidate_snippets(snippets, stamps, files)
+    snippet, stamp = changes[0]
+    assert snippet is snippets[0]
+    assert stamp['mtime_ns'] == 2_000_000_000
+    assert stamp['hash'] == stamps[0]['hash']
+
+def test_moved_snippet_is_relocated(tmp_path):
+    """Test snippets whose lines moved intact get their new line number"""
+    path = tmp_path / "a.py"
+    write_lines(path, ["def f():", "    return 1"])
+    snippets, stamps, files = stamped(path, 1, "def f():\n    return 1")
+
+    write_lines(path, ["import os", "", "def f():", "    return 1"])
+    snippet, _ = revalidate_snippets(snippets, stamps, files)[0]
+    assert snippet['line_number'] == 3
+    assert snippet['source'] == f"{path}:3"
+    assert snippet['snippet'] == "def f():\n    return 1"
+    assert 'stale' not in snippet
+
+def test_edited_snippet_is_refreshed(tmp_path):
+    """Test snippets whose body changed are re-read at their anchor line"""
+    path = tmp_path / "a.py"
+    write_lines(path, ["def f():", "    return 1"])
+    snippets, stamps, files = stamped(path, 1, "def f():\n    return 1")
+
+    write_lines(path, ["# header", "def f():", "    return 2"])
+    snippet, stamp = revalidate_snippets(snippets, stamps, files)[0]
+    assert snippet['line_number'] == 2
+    assert snippet['snippet'] == "def f():\n    return 2"
+    assert stamp['hash'] == region_hash(["# header", "def f():", "    return 2"], 2, 2)
+
+def test_lost_snippet_is_flagged_stale(tmp_path):
+    """Test snippets that cannot be found again are flagged stale, and unflagged on revert"""
+    path = tmp_path / "a.py"
+    write_lines(path, ["def f():", "    return 1"])
+    snippets, stamps, files = stamped(path, 1, "def f():\n    return 1")
+
+    write_lines(path, ["def g():", "    return 3", "x = 1"])
+    snippet, stamp = revalidate_snippets(snippets, stamps, files)[0]
+    assert snippet['stale'] is True
+    assert snippet['snippet'] == "def f():\n    return 1"
+    assert stamp['hash'] == stamps[0]['hash']
+
+    snippets[0], stamps[0] = snippet, stamp
+    write_lines(path, ["def f():", "    return 1"])
+    snippet, _ = revalidate_snippets(snippets, stamps, files)[0]
+    assert 'stale' not in snippet
+
+def test_missing_file_flags_stale(tmp_path):
+    """Test snippets of deleted files are flagged stale once"""
+    path = tmp_path / "a.py"
+    write_lines(path, ["one"])
+    snippets, stamps, files = stamped(path, 1, "one")
+
+    path.unlink()
+    snippet, _ = revalidate_snippets(snippets, stamps, files)[0]
+    assert snippet['stale'] is True
+    snippets[0] = snippet
+    assert revalidate_snippets(snippets, stamps, files) == {}
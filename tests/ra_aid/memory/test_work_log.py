@@ -0,0 +1,104 @@
+import gc
+import os
+
+from ra_aid.memory.work_log import (
+    WorkLogArchive,
+    WorkLogLimits,
+    compact,
+    event_kind,
+    format_digest,
+)
+
+def make_entries(events, start=0):
+    return [{'timestamp': f"t{start + i}", 'event': event} for i, event in enumerate(events)]
+
+def test_event_kind_strips_ids_and_counts():
+    """Test events differing only by IDs or counts share a kind"""
+    assert event_kind("Task #3 added:\n\nWrite tests") == "Task added"
+    assert event_kind("Stored 12 key facts.") == "Stored key facts"
+    assert event_kind("Deleted snippets [1, 2].") == "Deleted snippets"
+    assert event_kind("Implementation requested.") == "Implementation requested"
+    assert event_kind("   ") == "Other"
+
+def test_compact_within_caps_is_noop():
+    """Test logs within their caps are left alone"""
+    entries = make_entries(["a", "b"])
+    assert compact(entries, None, WorkLogLimits(max_entries=2, max_bytes=100, keep_recent=1)) == ([], None)
+    assert len(entries) == 2
+
+def test_compact_keeps_recent_entries_and_counts_the_rest():
+    """Test compaction folds the oldest entries into counts by kind"""
+    limits = WorkLogLimits(max_entries=4, max_bytes=10_000, keep_recent=2)
+    entries = make_entries(["Task #1 added:", "Task #2 added:", "Stored 3 key facts.", "Task #3 added:", "Task completed"])
+
+    evicted, digest = compact(entries, None, limits)
+    assert [entry['event'] for entry in evicted] == ["Task #1 added:", "Task #2 added:", "Stored 3 key facts."]
+    assert [entry['event'] for entry in entries] == ["Task #3 added:", "Task completed"]
+    assert digest == {'entries': 3, 'first_timestamp': "t0", 'last_timestamp': "t2",
+                      'kinds': {"Task added": 2, "Stored key facts": 1}}
+
+    # A later compaction extends the same digest
+    entries.extend(make_entries(["Task #4 added:"] * 3, start=5))
+    evicted, digest = compact(entries, digest, limits)
+    assert len(evicted) == 3
+    assert digest['entries'] == 6
+    assert digest['first_timestamp'] == "t0"
+    assert digest['kinds']["Task added"] == 4
+
+def test_compact_enforces_byte_cap_but_keeps_latest():
+    """Test large entries are compacted until the log fits, keeping the newest one"""
+    limits = WorkLogLimits(max_entries=10, max_bytes=10, keep_recent=5)
+    entries = make_entries(["x" * 6, "y" * 6, "z" * 20])
+    evicted, _ = compact(entries, None, limits)
+    assert len(evicted) == 2
+    assert [entry['event'] for entry in entries] == ["z" * 20]
+
+def test_format_digest_orders_by_count():
+    """Test digests list the most frequent kinds first"""
+    text = format_digest({'entries': 3, 'first_timestamp': "t0", 'last_timestamp': "t2",
+                          'kinds': {"Stored key facts": 1, "Task added": 2}})
+    assert text.splitlines() == [
+        "## Earlier work (compacted)",
+        "3 earlier entries from t0 to t2:",
+        "- Task added: 2",
+        "- Stored key facts: 1",
+    ]
+
+def test_archive_round_trip(tmp_path):
+    """Test archived entries are read back in order and cleared"""
+    archive = WorkLogArchive(str(tmp_path / "log.jsonl"))
+    assert archive.read() == []
+    archive.append(make_entries(["a", "b"]))
+    archive.append(make_entries(["c"], start=2))
+    assert [entry['event'] for entry in archive.read()] == ["a", "b", "c"]
+    archive.clear()
+    assert archive.read() == []
+
+def test_archive_defaults_to_temporary_file():
+    """Test an archive without a path creates one on first write"""
+    archive = WorkLogArchive()
+    archive.append(make_entries(["a"]))
+    try:
+        assert archive.read() == make_entries(["a"])
+    finally:
+        os.unlink(archive.path)
+
+def test_temporary_archive_is_deleted_with_the_archive(tmp_path):
+    """Test temporary archive files are deleted when discarded or collected, given ones are kept"""
+    archive = WorkLogArchive()
+    archive.append(make_entries(["a"]))
+    path = archive.path
+    archive.discard()
+    assert not os.path.exists(path)
+    assert archive.read() == []
+
+    archive.append(make_entries(["b"]))
+    path = archive.path
+    del archive
+    gc.collect()
+    assert not os.path.exists(path)
+
+    archive = WorkLogArchive(str(tmp_path / "log.jsonl"))
+    archive.append(make_entries(["c"]))
+    archive.discard()
+    assert archive.read() == make_entries(["c"])
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from anthropic import APITimeoutError
+
+import ra_aid.agent_utils as agent_utils
+from ra_aid.agent_utils import CancellationToken, arun_agent_with_retry
+from ra_aid.exceptions import AgentInterrupt
+from ra_aid.memory import memory_session
+
+
+class FakeAgent:
+    """Agent whose astream yields chunks, failing the first `failures` attempts"""
+
+    def __init__(self, chunks=3, failures=0, chunk_delay=0):
+        self.chunks = chunks
+        self.failures = failures
+        self.chunk_delay = chunk_delay
+        self.attempts = 0
+        self.seen = 0
+
+    async def astream(self, input, config):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise APITimeoutError(request=None)
+        for index in range(self.chunks):
+            await asyncio.sleep(self.chunk_delay)
+            self.seen += 1
+            yield {"agent": {"messages": []}, "index": index}
+
+
+@pytest.fixture(autouse=True)
+def quiet_output(monkeypatch):
+    """Keep agent output and retry messages off the console"""
+    monkeypatch.setattr(agent_utils, "print_agent_output", lambda chunk: None)
+    monkeypatch.setattr(agent_utils, "print_error", lambda message: None)
+
+
+@pytest.mark.asyncio
+async def test_arun_agent_streams_to_completion():
+    """Test the async runner consumes the stream and restores the agent depth"""
+    with memory_session() as session:
+        agent = FakeAgent()
+
+        result = await arun_agent_with_retry(agent, "prompt", {})
+
+        assert result == "Agent run completed successfully"
+        assert agent.seen == 3
+        assert session.memory.get('agent_depth', 0) == 0
+
+
+@pytest.mark.asyncio
+async def test_arun_agent_retries_api_errors(monkeypatch):
+    """Test API errors are retried after a backoff wait"""
+    with memory_session():
+        waits = []
+
+        async def sleep(self, delay):
+            waits.append(delay)
+            return False
+
+        monkeypatch.setattr(CancellationToken, "sleep", sleep)
+        agent = FakeAgent(failures=2)
+
+        result = await arun_agent_with_retry(agent, "prompt", {})
+
+        assert result == "Agent run completed successfully"
+        assert agent.attempts == 3
+        # Jittered exponential backoff
+        assert len(waits) == 2
+        assert 0.5 <= waits[0] <= 1
+        assert 1 <= waits[1] <= 2
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_stream_between_chunks():
+    """Test cancelling the token stops the run at the next chunk"""
+    with memory_session() as session:
+        token = CancellationToken()
+        agent = FakeAgent(chunks=100, chunk_delay=0.01)
+
+        async def cancel_soon():
+            await asyncio.sleep(0.05)
+            token.cancel()
+
+        with pytest.raises(AgentInterrupt):
+            await asyncio.gather(arun_agent_with_retry(agent, "prompt", {}, token), cancel_soon())
+
+        assert 0 < agent.seen < 100
+        assert session.memory.get('agent_depth', 0) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_from_thread_ends_backoff_wait():
+    """Test a cancel from another thread wakes a run waiting to retry"""
+    with memory_session():
+        token = CancellationToken()
+        agent = FakeAgent(failures=10)
+        threading.Timer(0.05, token.cancel).start()
+
+        start = time.monotonic()
+        with pytest.raises(AgentInterrupt):
+            await arun_agent_with_retry(agent, "prompt", {}, token)
+
+        # The first backoff is one second; cancellation must not wait it out
+        assert time.monotonic() - start < 0.5
+        assert agent.attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_token_sleep_times_out():
+    """Test sleeping on an uncancelled token waits out the delay"""
+    token = CancellationToken()
+
+    assert await token.sleep(0.01) is False
+    token.cancel()
+    assert await token.sleep(10) is True
+    assert token.cancelled
+
+
+@pytest.mark.asyncio
+async def test_agents_run_concurrently_on_one_loop():
+    """Test several agents interleave on one event loop"""
+    with memory_session() as session:
+        agents = [FakeAgent(chunks=5, chunk_delay=0.02) for _ in range(8)]
+
+        start = time.monotonic()
+        results = await asyncio.gather(*(arun_agent_with_retry(agent, "prompt", {}) for agent in agents))
+
+        assert results == ["Agent run completed successfully"] * 8
+        # Sequential runs would take 8 * 5 * 0.02 = 0.8s
+        assert time.monotonic() - start < 0.5
+        assert session.memory.get('agent_depth', 0) == 0
+
+
+@pytest.fixture
+def compiled(monkeypatch):
+    """Count agent compilations, starting from an empty cache"""
+    calls = []
+
+    def create_react_agent(model, tools, checkpointer=None, **kwargs):
+        calls.append((model, tools, checkpointer))
+        return object()
+
+    monkeypatch.setattr(agent_utils, "create_react_agent", create_react_agent)
+    agent_utils.clear_agent_cache()
+    yield calls
+    agent_utils.clear_agent_cache()
+
+
+class FakeTool:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_get_agent_reuses_compiled_agent(compiled):
+    """Test an agent is compiled once per model, tool set and checkpointer"""
+    model, checkpointer = object(), object()
+    tools = [FakeTool("read_file"), FakeTool("emit_key_facts")]
+
+    first = agent_utils.get_agent(model, tools, checkpointer)
+    again = agent_utils.get_agent(model, list(tools), checkpointer)
+
+    assert again is first
+    assert len(compiled) == 1
+
+
+def test_get_agent_compiles_per_key(compiled):
+    """Test a different model, tool set or checkpointer compiles a new agent"""
+    model, checkpointer = object(), object()
+    tools = [FakeTool("read_file")]
+
+    base = agent_utils.get_agent(model, tools, checkpointer)
+    agents = [
+        agent_utils.get_agent(object(), tools, checkpointer),
+        agent_utils.get_agent(model, tools + [FakeTool("ask_human")], checkpointer),
+        agent_utils.get_agent(model, tools, object()),
+    ]
+
+    assert len(compiled) == 4
+    assert all(agent is not base for agent in agents)
+
+
+def test_get_agent_evicts_least_recently_used(compiled, monkeypatch):
+    """Test the cache drops the least recently used agent when full"""
+    monkeypatch.setattr(agent_utils, "AGENT_CACHE_SIZE", 2)
+    models = [object() for _ in range(3)]
+    tools = [FakeTool("read_file")]
+
+    first = agent_utils.get_agent(models[0], tools)
+    agent_utils.get_agent(models[1], tools)
+    assert agent_utils.get_agent(models[0], tools) is first
+    agent_utils.get_agent(models[2], tools)
+
+    assert agent_utils.get_agent(models[0], tools) is first
+    assert len(compiled) == 3
+    agent_utils.get_agent(models[1], tools)
+    assert len(compiled) == 4
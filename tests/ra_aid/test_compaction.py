@@ -0,0 +1,113 @@
+from typing import Any, List
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+
+from ra_aid import agent_utils
+from ra_aid.compaction import (
+    CompactionLimits,
+    compact_messages,
+    configure_compaction,
+    get_compaction_limits,
+    message_tokens,
+)
+
+
+def history(outputs):
+    """A conversation with one tool call and tool output per entry"""
+    messages = [HumanMessage(content="Find the handlers", id="h")]
+    for n, output in enumerate(outputs):
+        messages.append(AIMessage(content="", id=f"a{n}", tool_calls=[
+            {"name": "ripgrep_search", "args": {"pattern": f"p{n}"}, "id": f"call-{n}"}]))
+        messages.append(ToolMessage(content=output, id=f"t{n}", name="ripgrep_search", tool_call_id=f"call-{n}"))
+    return messages
+
+
+@pytest.fixture
+def limits():
+    previous = get_compaction_limits()
+    yield
+    configure_compaction(previous)
+
+
+def test_history_within_threshold_is_untouched():
+    """Test nothing is elided until the history crosses the threshold"""
+    messages = history(["x" * 4000] * 3)
+    assert compact_messages(messages, CompactionLimits(max_tokens=4000)) == []
+
+
+def test_old_tool_outputs_are_stubbed():
+    """Test old large outputs become stubs and the recent window is kept"""
+    outputs = ["src/app.py:1:def handler():\n" + "x" * 4000, "small", "y" * 4000, "z" * 4000]
+    messages = history(outputs)
+    stubs = compact_messages(messages, CompactionLimits(max_tokens=2000, keep_recent=2, min_tokens=100))
+
+    # The last output is in the recent window and the small one is not worth a stub
+    assert [stub.id for stub in stubs] == ["t0", "t2"]
+    assert stubs[0].tool_call_id == "call-0"
+    assert "ripgrep_search" in stubs[0].content
+    assert "src/app.py:1:def handler():" in stubs[0].content
+    assert sum(message_tokens(stub) for stub in stubs) < 200
+
+
+def test_stubs_are_not_compacted_again():
+    """Test an already compacted history yields no further stubs"""
+    limits = CompactionLimits(max_tokens=10, keep_recent=2, min_tokens=100)
+    messages = history(["x" * 4000] * 3)
+    stubs = {stub.id: stub for stub in compact_messages(messages, limits)}
+    compacted = [stubs.get(message.id, message) for message in messages]
+
+    assert compact_messages(compacted, limits) == []
+
+
+def test_compaction_can_be_turned_off(limits):
+    """Test no stubs are produced while compaction is off"""
+    configure_compaction(None)
+    assert compact_messages(history(["x" * 400000])) == []
+
+
+class ScriptedModel(BaseChatModel):
+    """Chat model returning scripted replies and recording what it was sent"""
+
+    replies: List[Any]
+    seen: List[Any] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append(list(messages))
+        return ChatResult(generations=[ChatGeneration(message=self.replies.pop(0))])
+
+
+def test_agents_compact_before_model_calls(limits):
+    """Test a running agent sends stubs for old outputs and keeps them in its state"""
+    @tool
+    def read_file_tool(filepath: str) -> str:
+        """Read a file."""
+        return f"{filepath}\n" + "x" * 8000
+
+    configure_compaction(CompactionLimits(max_tokens=3000, keep_recent=2))
+    calls = [AIMessage(content="", tool_calls=[{"name": "read_file_tool", "args": {"filepath": f"f{n}.py"},
+                                                "id": f"call-{n}"}]) for n in range(3)]
+    model = ScriptedModel(replies=calls + [AIMessage(content="done")], seen=[])
+    agent_utils.clear_agent_cache()
+    agent = agent_utils.get_agent(model, [read_file_tool], MemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+    agent.invoke({"messages": [HumanMessage(content="Read the files")]}, config)
+    agent_utils.clear_agent_cache()
+
+    last_request = model.seen[-1]
+    assert [len(message.content) < 300 for message in last_request if isinstance(message, ToolMessage)] == \
+        [True, True, False]
+    state = agent.get_state(config).values["messages"]
+    assert "elided from history" in state[2].content
+    assert state[2].tool_call_id == "call-0"
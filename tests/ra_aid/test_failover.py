@@ -0,0 +1,191 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ra_aid.exceptions import CircuitOpenError
+from ra_aid.failover import FailoverChatModel, LatencyStats, latency_stats
+from ra_aid.prompt_cache import add_cache_breakpoints, supports_prompt_caching
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={})
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering after a delay, or failing with an error"""
+
+    reply: str
+    delay: float = 0.0
+    error: Optional[Exception] = None
+    calls: List[Any] = []
+    cancelled: List[str] = []
+    tools: Optional[List[str]] = None
+    llm_type: str = "fake"
+    inputs: List[Any] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm_type
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={'tools': [getattr(tool, 'name', None) or tool.__name__ for tool in tools]})
+
+    def _result(self):
+        if self.error is not None:
+            raise self.error
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(self.reply)
+        self.inputs.append(messages)
+        time.sleep(self.delay)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(self.reply)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(self.reply)
+            raise
+        return self._result()
+
+
+def failover(*models, hedge=False, names=None):
+    names = names or [f"{model.reply}-{id(model)}" for model in models]
+    return FailoverChatModel(models=list(models), names=names, hedge=hedge)
+
+
+def prime(name, seconds, count=20):
+    for _ in range(count):
+        latency_stats(name).record(seconds)
+
+
+def test_fails_over_when_provider_is_down():
+    """Test outages, rate limits and open circuits move the call to the next model"""
+    model = failover(
+        FakeChatModel(reply="anthropic", error=FakeAPIError(529), calls=[]),
+        FakeChatModel(reply="openrouter", error=CircuitOpenError("openrouter/claude", 10), calls=[]),
+        FakeChatModel(reply="compatible", calls=[]),
+    )
+
+    assert model.invoke([HumanMessage(content="hi")]).content == "compatible"
+
+
+def test_request_errors_are_not_retried_elsewhere():
+    """Test an error caused by the request is raised without failing over"""
+    backup = FakeChatModel(reply="backup", calls=[])
+    model = failover(FakeChatModel(reply="main", error=FakeAPIError(400), calls=[]), backup)
+
+    with pytest.raises(FakeAPIError):
+        model.invoke([HumanMessage(content="hi")])
+    assert backup.calls == []
+
+
+def test_raises_last_error_when_all_fail():
+    """Test the last provider's error is raised when every provider fails"""
+    model = failover(
+        FakeChatModel(reply="main", error=FakeAPIError(503), calls=[]),
+        FakeChatModel(reply="backup", error=FakeAPIError(429), calls=[]),
+    )
+
+    with pytest.raises(FakeAPIError, match="status 429"):
+        model.invoke([HumanMessage(content="hi")])
+
+
+def test_slow_call_is_hedged():
+    """Test a call past the main model's p95 latency is raced against the fallback"""
+    main = FakeChatModel(reply="main", delay=0.5, calls=[])
+    backup = FakeChatModel(reply="backup", delay=0.01, calls=[])
+    model = failover(main, backup, hedge=True, names=["main-hedged", "backup-hedged"])
+    prime("main-hedged", 0.02)
+
+    start = time.monotonic()
+    assert model.invoke([HumanMessage(content="hi")]).content == "backup"
+    assert time.monotonic() - start < 0.3
+
+
+def test_request_error_of_one_leg_waits_for_the_other():
+    """Test a hedge rejecting the request does not fail a slow call that still succeeds"""
+    main = FakeChatModel(reply="main", delay=0.2, calls=[])
+    backup = FakeChatModel(reply="backup", error=FakeAPIError(400), calls=[])
+    model = failover(main, backup, hedge=True, names=["main-rejected", "backup-rejected"])
+    prime("main-rejected", 0.02)
+    assert model.invoke([HumanMessage(content="hi")]).content == "main"
+    assert asyncio.run(model.ainvoke([HumanMessage(content="hi")])).content == "main"
+
+    main.error = FakeAPIError(503)
+    with pytest.raises(FakeAPIError, match="status 400"):
+        model.invoke([HumanMessage(content="hi")])
+
+
+def test_no_hedge_without_latency_history():
+    """Test calls are not hedged until the model's p95 latency is known"""
+    backup = FakeChatModel(reply="backup", calls=[])
+    model = failover(FakeChatModel(reply="main", delay=0.05, calls=[]), backup, hedge=True)
+
+    assert model.invoke([HumanMessage(content="hi")]).content == "main"
+    assert backup.calls == []
+
+
+def test_async_hedge_cancels_loser():
+    """Test the losing request is cancelled once the hedge answers"""
+    main = FakeChatModel(reply="main", delay=5, calls=[], cancelled=[])
+    backup = FakeChatModel(reply="backup", delay=0.01, calls=[], cancelled=[])
+    model = failover(main, backup, hedge=True, names=["main-async", "backup-async"])
+    prime("main-async", 0.02)
+
+    async def run():
+        result = await model.ainvoke([HumanMessage(content="hi")])
+        await asyncio.sleep(0)
+        return result
+
+    start = time.monotonic()
+    assert asyncio.run(run()).content == "backup"
+    assert time.monotonic() - start < 1
+    assert main.cancelled == ["main"]
+
+
+def test_bind_tools_binds_every_model():
+    """Test tools are bound to each model in its own format"""
+    def read_file():
+        """Read a file"""
+
+    model = failover(FakeChatModel(reply="main", calls=[]), FakeChatModel(reply="backup", calls=[]))
+    bound = model.bind_tools([read_file])
+
+    assert [member.tools for member in bound.models] == [["read_file"], ["read_file"]]
+    assert bound.names == model.names
+
+
+def test_cache_breakpoints_only_reach_models_that_cache():
+    """Test the primary's type is reported and breakpoints are dropped for other providers"""
+    backup = FakeChatModel(reply="openai", llm_type="openai-chat", calls=[], inputs=[])
+    model = failover(FakeChatModel(reply="anthropic", llm_type="anthropic-chat", error=FakeAPIError(529), calls=[]),
+                     backup)
+    assert supports_prompt_caching(model)
+    assert supports_prompt_caching(model.bind_tools([]))
+
+    model.invoke(add_cache_breakpoints([HumanMessage(content="Add a route")]))
+    assert backup.inputs[0][0].content == [{"type": "text", "text": "Add a route"}]
+
+
+def test_latency_percentile():
+    """Test percentiles need enough samples and use recent calls"""
+    stats = LatencyStats(window=100, min_samples=10)
+    for n in range(9):
+        stats.record(n)
+    assert stats.percentile(0.95) is None
+
+    for n in range(9, 100):
+        stats.record(n)
+    assert stats.percentile(0.95) == 95
@@ -6,7 +6,10 @@ from langchain_anthropic.chat_models import ChatAnthropic
 from dataclasses import dataclass
 
 from ra_aid.env import validate_environment
-from ra_aid.llm import initialize_llm, initialize_expert_llm
+from ra_aid.llm import initialize_llm, initialize_expert_llm, get_llm, get_llm_from_config, get_expert_llm, clear_llm_clients
+from ra_aid.failover import FailoverChatModel
+from ra_aid.prompt_cache import CacheUsageCallback
+from ra_aid.rate_limit import get_rate_limiter
 
 @pytest.fixture
 def clean_env(monkeypatch):
@@ -225,3 +228,91 @@ def mock_anthropic():
     with patch('ra_aid.llm.ChatAnthropic') as mock:
         mock.return_value = Mock(spec=ChatAnthropic)
         yield mock
+
+@pytest.fixture
+def registry(clean_env, mock_openai, mock_anthropic):
+    """Start from an empty client registry, building a distinct mock per client"""
+    mock_openai.side_effect = lambda **kwargs: Mock(spec=ChatOpenAI)
+    mock_anthropic.side_effect = lambda **kwargs: Mock(spec=ChatAnthropic)
+    clear_llm_clients()
+    yield mock_openai, mock_anthropic
+    clear_llm_clients()
+
+def test_get_llm_shares_clients(registry, monkeypatch):
+    """Test one client is built per provider and model"""
+    mock_openai, mock_anthropic = registry
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+
+    assert get_llm("openai", "gpt-4") is get_llm("openai", "gpt-4")
+    assert get_llm("anthropic", "claude-3") is get_llm("anthropic", "claude-3")
+    assert get_llm("openai", "gpt-4o") is not get_llm("openai", "gpt-4")
+    assert mock_openai.call_count == 2
+    assert mock_anthropic.call_count == 1
+
+def test_get_llm_pools_openai_connections(registry, monkeypatch):
+    """Test OpenAI-style clients share one HTTP client across models and endpoints"""
+    mock_openai, _ = registry
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+
+    get_llm("openai", "gpt-4")
+    get_llm("openrouter", "mistral-large")
+
+    http_clients = [call.kwargs["http_client"] for call in mock_openai.call_args_list]
+    assert http_clients[0] is http_clients[1]
+    limiter = get_rate_limiter("openrouter", "mistral-large")
+    callbacks = mock_openai.call_args.kwargs["callbacks"]
+    mock_openai.assert_called_with(
+        api_key="test-key",
+        base_url="https://openrouter.ai/api/v1",
+        model="mistral-large",
+        http_client=http_clients[0],
+        rate_limiter=limiter,
+        callbacks=callbacks
+    )
+    assert callbacks[0] is limiter.callback
+    assert isinstance(callbacks[1], CacheUsageCallback) and callbacks[1].name == "openrouter/mistral-large"
+
+def test_get_llm_keys_by_base_url(registry, monkeypatch):
+    """Test OpenAI-compatible clients for different endpoints are kept apart"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_API_BASE", "http://first")
+    first = get_llm("openai-compatible", "local-model")
+    monkeypatch.setenv("OPENAI_API_BASE", "http://second")
+
+    assert get_llm("openai-compatible", "local-model") is not first
+
+def test_get_expert_llm_uses_expert_credentials(registry, monkeypatch):
+    """Test the expert client is keyed by its own credentials"""
+    mock_openai, _ = registry
+    monkeypatch.setenv("OPENAI_API_KEY", "main-key")
+    monkeypatch.setenv("EXPERT_OPENAI_API_KEY", "expert-key")
+
+    main = get_llm("openai", "o1-preview")
+    expert = get_expert_llm()
+
+    assert expert is not main
+    assert expert is get_expert_llm("openai", "o1-preview")
+    assert mock_openai.call_args.kwargs["api_key"] == "expert-key"
+
+def test_get_llm_unsupported_provider(registry):
+    """Test the registry rejects unknown providers"""
+    with pytest.raises(ValueError, match=r"Unsupported provider: unknown"):
+        get_llm("unknown", "model")
+
+def test_get_llm_with_fallbacks(registry, monkeypatch):
+    """Test fallbacks wrap the shared clients of each provider in order"""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    fallbacks = [("openrouter", "anthropic/claude-3.5-sonnet")]
+
+    model = get_llm("anthropic", "claude-3", fallbacks=fallbacks, hedge=True)
+
+    assert isinstance(model, FailoverChatModel)
+    assert model.models == [get_llm("anthropic", "claude-3"), get_llm("openrouter", "anthropic/claude-3.5-sonnet")]
+    assert model.names == ["anthropic/claude-3", "openrouter/anthropic/claude-3.5-sonnet"]
+    assert model.hedge is True
+    assert get_llm("anthropic", "claude-3", fallbacks=fallbacks, hedge=True) is model
+    assert get_llm_from_config({"provider": "anthropic", "model": "claude-3",
+                                "fallbacks": fallbacks, "hedge": True}) is model
@@ -0,0 +1,127 @@
+import string
+from typing import Any, List
+
+import pytest
+from langchain_anthropic import ChatAnthropic
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult, LLMResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+
+from ra_aid import agent_utils, prompts
+from ra_aid.prompt_cache import (
+    CACHE_CONTROL,
+    CacheUsageCallback,
+    add_cache_breakpoints,
+    clear_cache_usage,
+    get_cache_usage,
+)
+from ra_aid.prompts import TASK_CONTEXT_HEADER
+
+PROMPT = "Research the code base." + TASK_CONTEXT_HEADER + "User query: add a health check"
+
+
+@pytest.mark.parametrize("name", [
+    "RESEARCH_PROMPT", "RESEARCH_ONLY_PROMPT", "WEB_RESEARCH_PROMPT", "PLANNING_PROMPT", "IMPLEMENTATION_PROMPT"])
+def test_agent_prompts_put_context_last(name):
+    """Test task and memory fields come after the instructions of every agent prompt"""
+    instructions, context = getattr(prompts, name).split(TASK_CONTEXT_HEADER)
+    # Only per-configuration sections may appear in the instructions
+    fields = {field for _, field, _, _ in string.Formatter().parse(instructions) if field}
+    assert fields <= {"expert_section", "human_section", "web_research_section", "research_only_note"}
+    assert any(field in context for field in ("{base_task}", "{web_research_query}"))
+
+
+def test_breakpoints_mark_instructions_and_latest_message():
+    """Test the prompt is split after its instructions and the last message is marked"""
+    messages = [
+        HumanMessage(content=PROMPT, id="h"),
+        AIMessage(content="", id="a", tool_calls=[{"name": "list_directory_tree", "args": {}, "id": "call-1"}]),
+        ToolMessage(content="src/\ntests/", id="t", tool_call_id="call-1"),
+    ]
+    marked = add_cache_breakpoints(messages)
+
+    assert marked[0].content == [
+        {"type": "text", "text": "Research the code base.", "cache_control": CACHE_CONTROL},
+        {"type": "text", "text": TASK_CONTEXT_HEADER.lstrip() + "User query: add a health check"},
+    ]
+    assert marked[1] is messages[1]
+    assert marked[2].content == [{"type": "text", "text": "src/\ntests/", "cache_control": CACHE_CONTROL}]
+    # The originals are left as they were
+    assert messages[0].content == PROMPT and messages[2].content == "src/\ntests/"
+
+
+def test_anthropic_request_carries_breakpoints():
+    """Test ChatAnthropic sends the breakpoints, including on tool results"""
+    model = ChatAnthropic(api_key="test", model_name="claude-3-5-sonnet-20241022")
+    messages = add_cache_breakpoints([
+        HumanMessage(content=PROMPT),
+        AIMessage(content="", tool_calls=[{"name": "list_directory_tree", "args": {}, "id": "call-1"}]),
+        ToolMessage(content="src/", tool_call_id="call-1"),
+    ])
+    payload = model._get_request_payload(messages)
+
+    first, _, last = payload["messages"]
+    assert first["content"][0]["cache_control"] == CACHE_CONTROL
+    assert "cache_control" not in first["content"][1]
+    assert last["content"][0]["type"] == "tool_result"
+    assert last["content"][0]["cache_control"] == CACHE_CONTROL
+
+
+class ScriptedAnthropic(BaseChatModel):
+    """Chat model identifying as Anthropic that records what it was sent"""
+
+    replies: List[Any]
+    seen: List[Any] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "anthropic-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append(list(messages))
+        return ChatResult(generations=[ChatGeneration(message=self.replies.pop(0))])
+
+
+def test_agents_send_breakpoints_but_store_plain_messages():
+    """Test Anthropic agents mark the model input only, not their state"""
+    @tool
+    def list_directory_tree(path: str) -> str:
+        """List a directory."""
+        return "src/"
+
+    model = ScriptedAnthropic(replies=[
+        AIMessage(content="", tool_calls=[{"name": "list_directory_tree", "args": {"path": "."}, "id": "call-1"}]),
+        AIMessage(content="done"),
+    ], seen=[])
+    agent_utils.clear_agent_cache()
+    agent = agent_utils.get_agent(model, [list_directory_tree], MemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+    agent.invoke({"messages": [HumanMessage(content=PROMPT)]}, config)
+    agent_utils.clear_agent_cache()
+
+    second_request = model.seen[1]
+    assert second_request[0].content[0]["cache_control"] == CACHE_CONTROL
+    assert second_request[-1].content[-1]["cache_control"] == CACHE_CONTROL
+    assert agent.get_state(config).values["messages"][0].content == PROMPT
+
+
+def test_cache_usage_is_recorded_per_model():
+    """Test cache reads and writes reported by calls are totalled per model"""
+    clear_cache_usage()
+    callback = CacheUsageCallback("anthropic/claude")
+    for read, written in ((0, 3000), (3000, 200)):
+        message = AIMessage(content="ok", usage_metadata={
+            "input_tokens": 3500, "output_tokens": 20, "total_tokens": 3520,
+            "input_token_details": {"cache_read": read, "cache_creation": written}})
+        callback.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+    usage = get_cache_usage()["anthropic/claude"]
+    assert (usage.calls, usage.input_tokens, usage.cache_read_tokens, usage.cache_write_tokens) == \
+        (2, 7000, 3000, 3200)
+    assert usage.hit_rate == pytest.approx(3000 / 7000)
+    clear_cache_usage()
@@ -0,0 +1,184 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from ra_aid import rate_limit
+from ra_aid.exceptions import CircuitOpenError
+from ra_aid.rate_limit import (
+    CircuitBreaker,
+    ProviderLimiter,
+    TokenBucket,
+    configure_rate_limit,
+    get_rate_limiter,
+    retry_after,
+    retry_delay,
+)
+
+
+class FakeAPIError(Exception):
+    """API error with a status code and response headers, like the provider SDKs raise"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def llm_result(total_tokens):
+    message = AIMessage(content="ok", usage_metadata={
+        "input_tokens": total_tokens - 10, "output_tokens": 10, "total_tokens": total_tokens})
+    return LLMResult(generations=[[ChatGeneration(message=message)]])
+
+
+def test_token_bucket_queues_reservations():
+    """Test reservations beyond the burst wait in arrival order"""
+    bucket = TokenBucket(per_minute=60)
+    now = time.monotonic()
+
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == pytest.approx(1.0)
+    assert bucket.reserve(1, now) == pytest.approx(2.0)
+    assert bucket.reserve(1, now + 2) == pytest.approx(1.0)
+
+
+def test_retry_delay_is_jittered_and_capped():
+    """Test backoff grows exponentially with jitter and stops at the cap"""
+    for attempt in range(3):
+        step = 2 ** attempt
+        assert step / 2 <= retry_delay(attempt) <= step
+    assert rate_limit.RETRY_MAX_DELAY / 2 <= retry_delay(19) <= rate_limit.RETRY_MAX_DELAY
+    assert len({retry_delay(5) for _ in range(10)}) > 1
+
+
+def test_retry_delay_honours_retry_after():
+    """Test a longer retry-after or open circuit wait wins over the backoff"""
+    assert retry_after(FakeAPIError(429, {"retry-after": "12"})) == 12
+    assert retry_after(FakeAPIError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert 12 <= retry_delay(0, FakeAPIError(429, {"retry-after": "12"})) <= 13
+    assert 30 <= retry_delay(0, CircuitOpenError("anthropic/claude", 30)) <= 31
+
+
+def test_rate_limit_error_slows_and_pauses():
+    """Test a 429 halves the rate, learns the ceiling and pauses every caller"""
+    limiter = ProviderLimiter("anthropic/claude", requests_per_minute=600)
+    limiter.callback.on_llm_error(FakeAPIError(429, {
+        "retry-after": "0.2",
+        "anthropic-ratelimit-requests-limit": "100",
+        "anthropic-ratelimit-tokens-limit": "40000",
+    }))
+
+    assert limiter.requests_per_minute == 50
+    assert limiter.max_requests_per_minute == 100
+    assert limiter.tokens.per_minute == 40000
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+    assert limiter.acquire(blocking=False) is False
+
+
+def test_success_restores_rate():
+    """Test successful calls raise a lowered rate back to the ceiling"""
+    limiter = ProviderLimiter("openai/gpt-4", requests_per_minute=200)
+    limiter.record_error(FakeAPIError(429))
+    assert limiter.requests_per_minute == 100
+
+    for _ in range(10):
+        limiter.callback.on_llm_end(llm_result(100))
+    assert limiter.requests_per_minute == 200
+
+
+def test_tokens_are_charged_after_calls():
+    """Test calls wait once the tokens already used exceed the budget"""
+    limiter = ProviderLimiter("openai/gpt-4", requests_per_minute=6000, tokens_per_minute=6000)
+
+    assert limiter.acquire(blocking=False) is True
+    limiter.callback.on_llm_end(llm_result(6100))
+    assert limiter.acquire(blocking=False) is False
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.5
+
+
+def test_circuit_opens_and_fails_fast():
+    """Test repeated outages open the circuit until a trial call succeeds"""
+    limiter = ProviderLimiter("anthropic/claude", failure_threshold=3, reset_timeout=0.1)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.callback.on_llm_error(FakeAPIError(529))
+
+    with pytest.raises(CircuitOpenError) as raised:
+        limiter.acquire()
+    assert 0 < raised.value.retry_after <= 0.1
+
+    time.sleep(0.12)
+    limiter.acquire()
+    # Only one trial call goes out while the provider is probed
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire()
+    limiter.callback.on_llm_end(llm_result(50))
+    assert limiter.acquire() is True
+
+
+def test_failed_trial_reopens_circuit():
+    """Test a failed trial call opens the circuit for another timeout"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure(now=0)
+    breaker.before_call(now=10, name="p")
+    breaker.record_failure(now=10)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call(now=15, name="p")
+
+
+def test_unfinished_trial_is_given_up_on():
+    """Test a trial call that never reports back, e.g. when cancelled, does not keep the circuit open"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure(now=0)
+    breaker.before_call(now=10, name="p")
+
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call(now=15, name="p")
+    assert raised.value.retry_after == 5
+    breaker.before_call(now=20, name="p")
+    assert breaker.trial_running
+
+    limiter = ProviderLimiter("anthropic/claude", failure_threshold=1, reset_timeout=0)
+    limiter.record_error(FakeAPIError(529))
+    assert limiter.acquire() is True
+    # The trial was cancelled before any callback ran
+    assert limiter.acquire() is True
+
+
+def test_client_errors_do_not_open_circuit():
+    """Test errors caused by the request itself leave the circuit closed"""
+    limiter = ProviderLimiter("anthropic/claude", failure_threshold=1)
+    limiter.record_error(FakeAPIError(400))
+
+    assert not limiter.circuit.is_open
+
+
+def test_threads_share_capacity():
+    """Test concurrent callers of one model are spread out by its limiter"""
+    rate_limit.clear_rate_limiters()
+    try:
+        configure_rate_limit("anthropic", "claude", requests_per_minute=600)
+        limiter = get_rate_limiter("anthropic", "claude")
+        assert get_rate_limiter("anthropic", "claude") is limiter
+
+        times = []
+        threads = [threading.Thread(target=lambda: times.append(limiter.acquire() and time.monotonic()))
+                   for _ in range(12)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 10 per second with a burst of 10: the last two wait 0.1s and 0.2s
+        assert max(times) - start >= 0.15
+    finally:
+        rate_limit.clear_rate_limiters()
@@ -0,0 +1,155 @@
+import os
+from typing import Any, List
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from ra_aid import llm
+from ra_aid.exceptions import ResponseCacheMiss
+from ra_aid.response_cache import (
+    CachingChatModel,
+    ResponseCache,
+    configure_response_cache,
+    request_key,
+)
+
+
+class CountingModel(BaseChatModel):
+    """Chat model answering with a numbered reply and counting its calls"""
+
+    calls: List[Any] = []
+    tools: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={'tools': [tool.name for tool in tools]})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(messages)
+        reply = AIMessage(content=f"reply {len(self.calls)}", tool_calls=[
+            {"name": "read_file_tool", "args": {"filepath": "app.py"}, "id": f"call-{len(self.calls)}"}])
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+@tool
+def read_file_tool(filepath: str) -> str:
+    """Read a file."""
+    return ""
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+    yield cache
+    cache.close()
+
+
+def caching(cache, mode="read-through", model=None):
+    return CachingChatModel(model=model or CountingModel(calls=[]), store=cache, mode=mode,
+                            label="fake/model", identity="fake/model")
+
+
+def test_key_ignores_message_ids():
+    """Test requests differing only in generated message IDs share a key"""
+    first = [HumanMessage(content="hi", id="run-1")]
+    second = [HumanMessage(content="hi", id="run-2")]
+
+    assert request_key("m", first) == request_key("m", second)
+    assert request_key("m", first) != request_key("other", first)
+    assert request_key("m", first) != request_key("m", first, options={"stop": ["\n"]})
+    assert request_key("m", first) != request_key("m", [HumanMessage(content="hello")])
+
+
+def test_read_through_calls_once(cache):
+    """Test a repeated request is answered from the cache"""
+    model = caching(cache)
+    first = model.invoke([HumanMessage(content="hi", id="a")])
+    second = model.invoke([HumanMessage(content="hi", id="b")])
+
+    assert len(model.model.calls) == 1
+    assert second.content == first.content == "reply 1"
+    assert second.tool_calls == first.tool_calls
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_tools_are_part_of_the_key(cache):
+    """Test the same messages with different bound tools are cached apart"""
+    inner = CountingModel(calls=[])
+    plain = caching(cache, model=inner)
+    bound = plain.bind_tools([read_file_tool])
+
+    plain.invoke("hi")
+    bound.invoke("hi")
+    assert bound.model.tools == ["read_file_tool"]
+    assert len(inner.calls) == 2
+
+
+def test_record_and_replay_modes(cache):
+    """Test record always calls and stores, and replay never calls"""
+    recorder = caching(cache, mode="record")
+    recorder.invoke("hi")
+    recorder.invoke("hi")
+    assert len(recorder.model.calls) == 2
+
+    replayer = caching(cache, mode="replay")
+    assert replayer.invoke("hi").content == "reply 2"
+    with pytest.raises(ResponseCacheMiss):
+        replayer.invoke("something new")
+    assert replayer.model.calls == []
+
+
+@pytest.mark.asyncio
+async def test_async_calls_use_the_cache(cache):
+    """Test async calls read and write the same entries"""
+    model = caching(cache)
+    await model.ainvoke("hi")
+    assert (await model.ainvoke("hi")).content == "reply 1"
+    assert model.invoke("hi").content == "reply 1"
+    assert len(model.model.calls) == 1
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    """Test the cache stays under its size limit by dropping the least recently used entries"""
+    path = str(tmp_path / "responses.db")
+    cache = ResponseCache(path, max_bytes=8_000)
+    for key in ("k0", "k1", "k2"):
+        cache.put(key, AIMessage(content=os.urandom(1500).hex()))
+    cache.get("k0")
+    cache.put("k3", ToolMessage(content=os.urandom(1500).hex(), tool_call_id="call-1"))
+    cache.put("k4", AIMessage(content=os.urandom(1500).hex()))
+
+    assert cache.get("k1") is None
+    assert all(cache.get(key) is not None for key in ("k0", "k2", "k3", "k4"))
+    assert cache.size <= 8_000
+    size = cache.size
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert (len(reopened), reopened.size) == (4, size)
+    reopened.close()
+
+
+def test_initialized_models_are_wrapped_when_configured(tmp_path, monkeypatch):
+    """Test initialize_llm and initialize_expert_llm wrap models only while a cache is configured"""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("EXPERT_OPENAI_API_KEY", "test-key")
+    assert not isinstance(llm.initialize_llm("anthropic", "claude-3-5-sonnet-20241022"), CachingChatModel)
+
+    configure_response_cache(str(tmp_path / "responses.db"), "replay")
+    try:
+        model = llm.initialize_llm("anthropic", "claude-3-5-sonnet-20241022")
+        expert = llm.initialize_expert_llm("openai", "o1-preview")
+        assert isinstance(model, CachingChatModel) and isinstance(expert, CachingChatModel)
+        assert model.mode == "replay" and model.label == "anthropic/claude-3-5-sonnet-20241022"
+        # Provider-specific handling such as prompt cache breakpoints still applies
+        assert model._llm_type == "anthropic-chat"
+        with pytest.raises(ResponseCacheMiss):
+            model.invoke("hi")
+    finally:
+        configure_response_cache(None)
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from ra_aid.task_scheduler import FAILED, SKIPPED, SUCCEEDED, TaskGraph, run_task_graph
+
+def test_undeclared_tasks_run_in_plan_order():
+    """Test tasks without dependencies or files keep the strict plan order"""
+    graph = TaskGraph([1, 2, 3])
+    assert graph.dependencies == {1: set(), 2: {1}, 3: {1, 2}}
+    assert graph.order == [1, 2, 3]
+
+def test_declared_tasks_are_independent():
+    """Test tasks only wait for declared dependencies and earlier writers of their files"""
+    graph = TaskGraph(
+        [1, 2, 3, 4],
+        dependencies={3: [1]},
+        files={1: ["a.py"], 2: ["b.py"], 3: ["c.py"], 4: ["./b.py"]},
+    )
+    assert graph.dependencies == {1: set(), 2: set(), 3: {1}, 4: {2}}
+
+def test_undeclared_task_is_a_barrier():
+    """Test a task that could touch anything runs between the tasks around it"""
+    graph = TaskGraph([1, 2, 3, 4], files={1: ["a.py"], 2: ["b.py"], 4: ["c.py"]})
+    assert graph.dependencies == {1: set(), 2: set(), 3: {1, 2}, 4: {3}}
+
+def test_task_without_files_is_a_barrier_despite_dependencies():
+    """Test tasks declaring dependencies but no files never run alongside each other"""
+    graph = TaskGraph([1, 2, 3], dependencies={2: [1], 3: [1]})
+    assert graph.dependencies == {1: set(), 2: {1}, 3: {1, 2}}
+
+    graph = TaskGraph([1, 2, 3, 4], dependencies={3: [1]}, files={1: ["a.py"], 2: ["b.py"], 4: ["c.py"]})
+    assert graph.dependencies == {1: set(), 2: set(), 3: {1, 2}, 4: {3}}
+
+def test_dependencies_come_first_in_order():
+    """Test the run order puts dependencies before dependents, otherwise plan order"""
+    graph = TaskGraph([1, 2, 3], dependencies={1: [3]}, files={1: ["a"], 2: ["b"], 3: ["c"]})
+    assert graph.order == [2, 3, 1]
+
+def test_invalid_graphs_raise():
+    """Test unknown dependencies and cycles are rejected"""
+    with pytest.raises(ValueError, match="unknown"):
+        TaskGraph([1], dependencies={1: [7]})
+    with pytest.raises(ValueError, match="cycle"):
+        TaskGraph([1, 2], dependencies={1: [2], 2: [1]})
+
+def test_from_memory():
+    """Test the graph of the tasks in agent memory is in ID order"""
+    memory = {'tasks': {2: "b", 1: "a"}, 'task_dependencies': {2: [1]}, 'task_files': {1: ["a.py"]}}
+    graph = TaskGraph.from_memory(memory)
+    assert graph.order == [1, 2]
+    assert graph.dependencies == {1: set(), 2: {1}}
+
+def test_independent_tasks_run_concurrently():
+    """Test independent tasks overlap, up to the worker limit"""
+    files = {task_id: [f"{task_id}.py"] for task_id in range(1, 7)}
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def run(task_id):
+        with lock:
+            active.append(task_id)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(task_id)
+        return task_id * 10
+
+    outcomes = run_task_graph(TaskGraph(list(files), files=files), run, max_workers=3)
+    assert max(peak) == 3
+    assert {task_id: outcome.result for task_id, outcome in outcomes.items()} == {
+        task_id: task_id * 10 for task_id in files}
+
+def test_dependents_start_after_dependencies_complete():
+    """Test a task starts only after its dependencies, and completion callbacks run first"""
+    events = []
+    graph = TaskGraph([1, 2, 3], dependencies={3: [1, 2]}, files={1: ["a"], 2: ["b"], 3: ["c"]})
+
+    def run(task_id):
+        events.append(("start", task_id))
+        time.sleep(0.02 if task_id == 1 else 0)
+
+    run_task_graph(graph, run, max_workers=3, on_complete=lambda outcome: events.append(("done", outcome.task_id)))
+    assert events.index(("start", 3)) > events.index(("done", 1))
+    assert events.index(("start", 3)) > events.index(("done", 2))
+
+def test_failure_skips_dependents():
+    """Test a failed task's dependents are skipped and unrelated tasks still run"""
+    graph = TaskGraph([1, 2, 3], dependencies={2: [1]}, files={1: ["a"], 2: ["b"], 3: ["c"]})
+
+    def run(task_id):
+        if task_id == 1:
+            raise RuntimeError("tests failed")
+
+    outcomes = run_task_graph(graph, run, max_workers=1, fail_fast=False)
+    assert outcomes[1].status == FAILED
+    assert outcomes[1].error == "tests failed"
+    assert outcomes[2].status == SKIPPED
+    assert outcomes[3].status == SUCCEEDED
+
+def test_fail_fast_starts_nothing_new():
+    """Test no task starts after a failure when failing fast"""
+    started = []
+
+    def run(task_id):
+        started.append(task_id)
+        if task_id == 1:
+            raise RuntimeError("boom")
+
+    outcomes = run_task_graph(TaskGraph([1, 2, 3]), run, max_workers=2)
+    assert started == [1]
+    assert [outcomes[task_id].status for task_id in (1, 2, 3)] == [FAILED, SKIPPED, SKIPPED]
+
+
+@pytest.mark.parametrize("max_workers", [0, -1])
+def test_max_workers_below_one_raise(max_workers):
+    """Test a pool that could never start a task is rejected instead of waiting forever"""
+    with pytest.raises(ValueError):
+        run_task_graph(TaskGraph([1]), lambda task_id: None, max_workers=max_workers)
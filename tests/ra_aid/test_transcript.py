@@ -0,0 +1,111 @@
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ra_aid import agent_utils
+from ra_aid.exceptions import TranscriptMismatch
+from ra_aid.llm import clear_llm_clients, register_llm_client
+from ra_aid.memory import memory_session
+from ra_aid.tools import emit_task, task_completed
+from ra_aid.tools.memory import _global_memory
+from ra_aid.transcript import (
+    RecordingChatModel,
+    ScriptedChatModel,
+    load_transcript,
+    save_transcript,
+    turns_to_messages,
+)
+
+
+def call(name, **args):
+    return {"name": name, "args": args}
+
+
+class EchoModel(BaseChatModel):
+    """Chat model answering with the text it was sent last"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=messages[-1].content))])
+
+
+def test_transcript_round_trip(tmp_path):
+    """Test saved responses load back with their text and tool calls"""
+    path = str(tmp_path / "run.json")
+    messages = turns_to_messages([
+        {"content": "", "tool_calls": [call("emit_task", task="Add the route")]},
+        {"content": "Done."},
+    ])
+    save_transcript(path, messages)
+    loaded = load_transcript(path)
+
+    assert [message.content for message in loaded] == ["", "Done."]
+    assert loaded[0].tool_calls[0]["name"] == "emit_task"
+    assert loaded[0].tool_calls[0]["args"] == {"task": "Add the route"}
+    assert loaded[0].tool_calls[0]["id"] == "call-0-0"
+
+    (tmp_path / "other.json").write_text('{"turns": []}')
+    with pytest.raises(ValueError):
+        load_transcript(str(tmp_path / "other.json"))
+
+
+def test_scripted_model_checks_replies_against_bound_tools():
+    """Test replies are given in order and must call tools the agent has"""
+    model = ScriptedChatModel(replies=turns_to_messages([
+        {"tool_calls": [call("emit_task", task="Add the route")]},
+        {"tool_calls": [call("run_programming_task", instructions="Edit it")]},
+    ]))
+    bound = model.bind_tools([emit_task, task_completed])
+
+    assert bound.invoke("plan").tool_calls[0]["name"] == "emit_task"
+    with pytest.raises(TranscriptMismatch):
+        bound.invoke("plan")
+    assert model.remaining == 0
+    with pytest.raises(TranscriptMismatch):
+        bound.invoke("plan")
+
+
+def test_recording_model_records_every_bound_copy():
+    """Test responses of tool-bound copies are recorded in call order"""
+    model = RecordingChatModel(model=EchoModel(), wrapped_llm_type="echo")
+    model.invoke("first")
+    model.bind_tools([emit_task]).invoke([HumanMessage(content="second")])
+
+    assert [message.content for message in model.responses] == ["first", "second"]
+    assert model._llm_type == "echo"
+
+
+def test_replayed_planning_spawns_implementation_in_its_own_thread():
+    """Test a replayed planning run drives an implementation agent started from a tool"""
+    model = ScriptedChatModel(replies=turns_to_messages([
+        {"tool_calls": [call("emit_task", task="Add the route")]},
+        {"tool_calls": [call("request_task_implementation", task_spec="Add the route")]},
+        {"tool_calls": [call("task_completed", message="Route added")]},
+        {"content": "Task done."},
+        {"tool_calls": [call("plan_implementation_completed", message="All done")]},
+        {"content": "Plan done."},
+    ]))
+    register_llm_client("anthropic", "claude-3-5-sonnet-20241022", model)
+    agent_utils.clear_agent_cache()
+    # The config is shared with agents started from tools, thread ID included
+    config = {"configurable": {"thread_id": "planning"}, "provider": "anthropic",
+              "model": "claude-3-5-sonnet-20241022"}
+    try:
+        with memory_session() as session:
+            _global_memory['config'] = config
+            agent_utils.run_planning_agent("Add a route", model, config=config, thread_id="planning")
+            threads = {saved.config["configurable"]["thread_id"] for saved in session.checkpointer.list(None)}
+            assert _global_memory['plan_completed']
+    finally:
+        clear_llm_clients()
+        agent_utils.clear_agent_cache()
+
+    assert model.remaining == 0
+    assert "planning" in threads and len(threads) == 2
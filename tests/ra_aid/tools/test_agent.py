@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import ra_aid.agent_utils
+import ra_aid.tools.agent
+from ra_aid.memory import memory_session
+from ra_aid.memory.work_log import WorkLogLimits
+from ra_aid.tools.agent import request_plan_implementation, request_research_batch
+from ra_aid.tools.memory import (
+    _global_memory,
+    emit_key_facts,
+    emit_key_snippets,
+    emit_related_files,
+    emit_research_notes,
+    emit_task,
+    fork_session,
+    get_full_work_log,
+    log_work_event,
+    merge_forked_session,
+    set_work_log_archive,
+    set_work_log_limits,
+)
+
+
+def snippet(filepath, line_number, code):
+    return {"filepath": filepath, "line_number": line_number, "snippet": code,
+            "description": None, "source": f"{filepath}:{line_number}", "relevance": 0.5}
+
+
+@pytest.fixture
+def fake_research(monkeypatch):
+    """Replace the research agent with one that records findings per query"""
+    findings = {
+        "auth": (["Sessions are stored in Redis"], [snippet("auth.py", 1, "def login():")]),
+        "billing": (["Invoices are generated nightly by a cron job"], [snippet("billing.py", 5, "def invoice():")]),
+        "search": (["Search uses an Elasticsearch index"], [snippet("auth.py", 2, "    check()")]),
+    }
+    delays = {"auth": 0.05, "billing": 0.0, "search": 0.02}
+
+    def run_research_agent(query, model, **kwargs):
+        # Finish in a different order than the queries were given
+        time.sleep(delays[query])
+        facts, snippets = findings[query]
+        emit_key_facts.invoke({"facts": facts})
+        emit_key_snippets.invoke({"snippets": snippets})
+        emit_research_notes.invoke({"notes": f"Notes on {query}"})
+        _global_memory['completion_message'] = f"Researched {query}"
+
+    monkeypatch.setattr(ra_aid.agent_utils, "run_research_agent", run_research_agent)
+    monkeypatch.setattr(ra_aid.tools.agent, "get_llm_from_config", lambda config: None)
+
+
+def test_batch_merges_in_query_order(fake_research):
+    """Test sub-agents run in their own memory and are merged in query order"""
+    with memory_session() as session:
+        emit_key_facts.invoke({"facts": ["The service is written in Go"]})
+        result = request_research_batch.invoke({"queries": ["auth", "billing", "search"]})
+
+        assert result["success"] is True
+        assert [item["completion_message"] for item in result["results"]] == [
+            "Researched auth", "Researched billing", "Researched search"]
+        assert session.memory['key_facts'] == {
+            1: "The service is written in Go",
+            2: "Sessions are stored in Redis",
+            3: "Invoices are generated nightly by a cron job",
+            4: "Search uses an Elasticsearch index",
+        }
+        assert session.memory['related_files'] == {1: "auth.py", 2: "billing.py"}
+        # The adjacent auth.py snippets of two agents are merged into one
+        assert {key: value['snippet'] for key, value in session.memory['key_snippets'].items()} == {
+            1: "def login():\n    check()", 2: "def invoice():"}
+        assert session.memory['research_notes'] == ["Notes on auth", "Notes on billing", "Notes on search"]
+        # Sub-agent completion state stays in the sub-agents' memory
+        assert session.memory['completion_message'] == ''
+
+
+def test_batch_reports_failures(fake_research, monkeypatch):
+    """Test a failing query is reported without losing the others' findings"""
+    run = ra_aid.agent_utils.run_research_agent
+
+    def failing(query, model, **kwargs):
+        if query == "billing":
+            raise RuntimeError("no access")
+        return run(query, model, **kwargs)
+
+    monkeypatch.setattr(ra_aid.agent_utils, "run_research_agent", failing)
+    with memory_session() as session:
+        result = request_research_batch.invoke({"queries": ["auth", "billing"]})
+        assert result["success"] is False
+        assert result["results"][1] == {"query": "billing", "completion_message": None,
+                                        "success": False, "reason": "error: no access"}
+        assert list(session.memory['key_facts'].values()) == ["Sessions are stored in Redis"]
+
+
+def interruptible_agent(started):
+    """Agent stand-in that runs until interrupted"""
+    def run(*args, **kwargs):
+        with ra_aid.agent_utils.InterruptibleSection():
+            started.append(threading.current_thread())
+            while True:
+                ra_aid.agent_utils.check_interrupt()
+                time.sleep(0.01)
+    return run
+
+
+def interrupt_when_started(started, count):
+    """Send SIGINT, as Ctrl-C would, once a number of agents are running"""
+    def interrupt():
+        while len(started) < count:
+            time.sleep(0.01)
+        ra_aid.agent_utils._request_interrupt(None, None)
+    thread = threading.Thread(target=interrupt, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_interrupt_stops_every_research_agent(monkeypatch):
+    """Test one interrupt stops all running agents and queued queries never start"""
+    started = []
+    monkeypatch.setattr(ra_aid.agent_utils, "run_research_agent", interruptible_agent(started))
+    monkeypatch.setattr(ra_aid.tools.agent, "get_llm_from_config", lambda config: None)
+    monkeypatch.setattr(ra_aid.tools.agent, "MAX_CONCURRENT_RESEARCH_AGENTS", 2)
+    monkeypatch.setattr(ra_aid.tools.agent, "ask_human", SimpleNamespace(invoke=lambda args: "Wrong module"))
+
+    with memory_session():
+        interrupter = interrupt_when_started(started, 2)
+        result = request_research_batch.invoke({"queries": ["auth", "billing", "search"]})
+        interrupter.join()
+
+    assert len(started) == 2
+    assert [(item["success"], item["reason"]) for item in result["results"]] == [(False, "Wrong module")] * 3
+    assert ra_aid.agent_utils._INTERRUPT_CONTEXT is None
+
+
+def test_fork_is_isolated_until_merged():
+    """Test a fork writes only to its own memory and merges additions back"""
+    with memory_session() as session:
+        emit_key_facts.invoke({"facts": ["Config is read from settings.toml"]})
+        emit_related_files.invoke({"files": ["settings.toml"]})
+        log_work_event("Parent event")
+        fork = fork_session()
+
+        with memory_session(fork):
+            emit_key_facts.invoke({"facts": ["Config is read from settings.toml and the environment"]})
+            emit_related_files.invoke({"files": ["settings.toml", "env.py"]})
+            log_work_event("Fork event")
+        assert session.memory['key_facts'] == {1: "Config is read from settings.toml"}
+        assert session.memory['related_files'] == {1: "settings.toml"}
+
+        merge_forked_session(fork)
+        # The restated fact is merged into the existing one
+        assert session.memory['key_facts'] == {1: "Config is read from settings.toml and the environment"}
+        assert session.memory['related_files'] == {1: "settings.toml", 2: "env.py"}
+        events = [entry['event'] for entry in session.memory['work_log']]
+        assert events[events.index("Parent event"):] == ["Parent event", "Stored 1 key facts.", "Fork event"]
+
+
+def test_merged_fork_leaves_no_archive_file(tmp_path):
+    """Test the temporary archive of a fork's compacted work log is deleted once merged"""
+    with memory_session():
+        set_work_log_archive(str(tmp_path / "work_log.jsonl"))
+        set_work_log_limits(WorkLogLimits(max_entries=40, max_bytes=10_000, keep_recent=2))
+        fork = fork_session()
+        fork.work_log_limits = WorkLogLimits(max_entries=2, max_bytes=10_000, keep_recent=1)
+        with memory_session(fork):
+            for step in range(4):
+                log_work_event(f"Step {step}")
+        path = fork.work_log_archive.path
+        assert os.path.exists(path)
+
+        merge_forked_session(fork)
+        assert not os.path.exists(path)
+        assert [entry['event'] for entry in get_full_work_log()] == [f"Step {step}" for step in range(4)]
+
+
+def test_plan_implementation_runs_tasks_by_dependency(monkeypatch):
+    """Test planned tasks run in dependency order and a failure skips dependents"""
+    started = []
+
+    def run_task_implementation_agent(task, **kwargs):
+        started.append(task)
+        if task == "Add view":
+            raise RuntimeError("tests failed")
+        emit_key_facts.invoke({"facts": [f"{task} is done"]})
+
+    monkeypatch.setattr(ra_aid.agent_utils, "run_task_implementation_agent", run_task_implementation_agent)
+    monkeypatch.setattr(ra_aid.tools.agent, "get_llm_from_config", lambda config: None)
+
+    with memory_session() as session:
+        emit_task.invoke({"task": "Add model", "files": ["models.py"]})
+        emit_task.invoke({"task": "Add view", "depends_on": [1], "files": ["views.py"]})
+        emit_task.invoke({"task": "Add template", "depends_on": [2], "files": ["view.html"]})
+        result = request_plan_implementation.invoke({})
+
+        assert started == ["Add model", "Add view"]
+        assert [(item["task_id"], item["status"]) for item in result["results"]] == [
+            (1, "succeeded"), (2, "failed"), (3, "skipped")]
+        assert result["results"][1]["reason"] == "tests failed"
+        assert result["success"] is False
+        # Findings of the implementation agents are merged back
+        assert list(session.memory['key_facts'].values()) == ["Add model is done"]
+
+
+def test_interrupt_stops_every_implementation_agent(monkeypatch):
+    """Test one interrupt stops all running tasks and no further task starts"""
+    started = []
+    monkeypatch.setattr(ra_aid.agent_utils, "run_task_implementation_agent", interruptible_agent(started))
+    monkeypatch.setattr(ra_aid.tools.agent, "get_llm_from_config", lambda config: None)
+    monkeypatch.setattr(ra_aid.tools.agent, "ask_human", SimpleNamespace(invoke=lambda args: "Wrong approach"))
+
+    with memory_session() as session:
+        session.memory['config'] = {"max_parallel_tasks": 2}
+        emit_task.invoke({"task": "Add model", "files": ["models.py"]})
+        emit_task.invoke({"task": "Add view", "files": ["views.py"]})
+        emit_task.invoke({"task": "Add template", "files": ["view.html"]})
+        interrupter = interrupt_when_started(started, 2)
+        result = request_plan_implementation.invoke({})
+        interrupter.join()
+
+    assert len(started) == 2
+    assert [(item["status"], item["reason"]) for item in result["results"]] == [
+        ("failed", "Wrong approach"), ("failed", "Wrong approach"), ("skipped", None)]
@@ -1,4 +1,5 @@
 import pytest
+from ra_aid.memory.work_log import WorkLogLimits
 from ra_aid.tools.memory import (
     _global_memory,
     get_memory_value,
@@ -14,7 +15,11 @@ from ra_aid.tools.memory import (
     swap_task_order,
     log_work_event,
     reset_work_log,
-    get_work_log
+    get_work_log,
+    get_full_work_log,
+    set_work_log_archive,
+    set_work_log_limits,
+    render_memory_budgeted
 )
 
 @pytest.fixture
@@ -24,26 +29,36 @@ def reset_memory():
     _global_memory['key_fact_id_counter'] = 0
     _global_memory['key_snippets'] = {}
     _global_memory['key_snippet_id_counter'] = 0
+    _global_memory['key_snippet_aliases'] = {}
+    _global_memory['key_snippet_stamps'] = {}
     _global_memory['research_notes'] = []
     _global_memory['plans'] = []
     _global_memory['tasks'] = {}
     _global_memory['task_id_counter'] = 0
+    _global_memory['task_dependencies'] = {}
+    _global_memory['task_files'] = {}
     _global_memory['related_files'] = {}
     _global_memory['related_file_id_counter'] = 0
     _global_memory['work_log'] = []
+    _global_memory['work_log_digest'] = None
     yield
     # Clean up after test
     _global_memory['key_facts'] = {}
     _global_memory['key_fact_id_counter'] = 0
     _global_memory['key_snippets'] = {}
     _global_memory['key_snippet_id_counter'] = 0
+    _global_memory['key_snippet_aliases'] = {}
+    _global_memory['key_snippet_stamps'] = {}
     _global_memory['research_notes'] = []
     _global_memory['plans'] = []
     _global_memory['tasks'] = {}
     _global_memory['task_id_counter'] = 0
+    _global_memory['task_dependencies'] = {}
+    _global_memory['task_files'] = {}
     _global_memory['related_files'] = {}
     _global_memory['related_file_id_counter'] = 0
     _global_memory['work_log'] = []
+    _global_memory['work_log_digest'] = None
 
 def test_emit_key_facts_single_fact(reset_memory):
     """Test emitting a single key fact using emit_key_facts"""
@@ -170,6 +185,28 @@ def test_emit_key_facts(reset_memory):
     # Verify counter incremented correctly
     assert _global_memory['key_fact_id_counter'] == 3
 
+def test_emit_key_facts_merges_near_duplicates(reset_memory):
+    """Test restated facts are merged into the existing fact ID"""
+    emit_key_facts.invoke({"facts": ["The project uses pytest for its test suite"]})
+    result = emit_key_facts.invoke({"facts": [
+        "project uses PyTest for the test suites",
+        "The project uses pytest for its test suite and fixtures",
+        "The web UI is built with Streamlit",
+    ]})
+
+    assert result == "Facts stored. Already known as facts [0, 0]; not stored again."
+    # The more detailed wording replaces the stored one under the same ID
+    assert _global_memory['key_facts'] == {
+        0: "The project uses pytest for its test suite and fixtures",
+        1: "The web UI is built with Streamlit",
+    }
+    assert _global_memory['key_fact_id_counter'] == 2
+
+    # A deleted fact no longer absorbs restatements
+    delete_key_facts.invoke({"fact_ids": [0]})
+    emit_key_facts.invoke({"facts": ["The project uses pytest for its test suite"]})
+    assert _global_memory['key_facts'][2] == "The project uses pytest for its test suite"
+
 def test_delete_key_facts(reset_memory):
     """Test deleting multiple key facts"""
     # Add some test facts
@@ -559,3 +596,206 @@ def test_swap_task_order_after_delete(reset_memory):
     # Verify swap worked
     assert _global_memory['tasks'][0] == "Task 3"
     assert _global_memory['tasks'][2] == "Task 1"
+
+def test_task_dependencies_and_files(reset_memory):
+    """Test task dependencies and write-sets follow deletes and swaps"""
+    emit_task.invoke({"task": "Add model", "files": ["./models.py"]})
+    emit_task.invoke({"task": "Add view", "depends_on": [0], "files": ["views.py"]})
+    emit_task.invoke({"task": "Add docs", "depends_on": [0, 1]})
+    assert emit_task.invoke({"task": "Orphan", "depends_on": [9]}) == "Unknown task ID(s) [9]; task not stored."
+    assert _global_memory['task_dependencies'] == {1: [0], 2: [0, 1]}
+    assert _global_memory['task_files'] == {0: ["models.py"], 1: ["views.py"]}
+
+    # Swapped tasks trade IDs, so their metadata and references to them move too
+    swap_task_order.invoke({"id1": 0, "id2": 1})
+    assert _global_memory['tasks'][0] == "Add view"
+    assert _global_memory['task_dependencies'] == {0: [1], 2: [1, 0]}
+    assert _global_memory['task_files'] == {0: ["views.py"], 1: ["models.py"]}
+
+    delete_tasks.invoke({"task_ids": [1]})
+    assert _global_memory['task_dependencies'] == {0: [], 2: [0]}
+    assert _global_memory['task_files'] == {0: ["views.py"]}
+
+def test_emit_related_files_normalizes_paths(reset_memory):
+    """Test equivalent path spellings collapse to a single related file"""
+    result = emit_related_files.invoke({"files": ["./test.py", "test.py", "dir/../test.py"]})
+    assert result == "File ID #0: test.py\nFile ID #0: test.py\nFile ID #0: test.py"
+    assert _global_memory['related_files'] == {0: "test.py"}
+    assert get_related_files() == ["ID#0 test.py"]
+
+def test_deregister_then_reemit_related_file(reset_memory):
+    """Test a deregistered file gets a new ID when emitted again"""
+    emit_related_files.invoke({"files": ["file1.py", "file2.py"]})
+    deregister_related_files.invoke({"file_ids": [0]})
+
+    result = emit_related_files.invoke({"files": ["file1.py"]})
+    assert result == "File ID #2: file1.py"
+    assert get_related_files() == ["ID#1 file2.py", "ID#2 file1.py"]
+
+def test_render_memory_budgeted_fits(reset_memory):
+    """Test a section within budget renders exactly like get_memory_value"""
+    emit_key_facts.invoke({"facts": ["First fact", "Second fact"]})
+    result = render_memory_budgeted('key_facts', 1000)
+    assert result.text == get_memory_value('key_facts')
+    assert result.included == [0, 1]
+    assert result.omitted == []
+
+def test_render_memory_budgeted_omits_and_reports(reset_memory):
+    """Test an over-budget section keeps the best items and notes the rest"""
+    emit_key_snippets.invoke({"snippets": [
+        {
+            "snippet": "def connect_pool():\n    " + "x = 1\n    " * 30,
+            "source": "db.py:1",
+            "relevance": 0.9,
+            "filepath": "db.py",
+            "line_number": 1,
+            "description": "Database pool"
+        },
+        {
+            "snippet": "def render():\n    " + "y = 2\n    " * 30,
+            "source": "ui.py:1",
+            "relevance": 0.1,
+            "filepath": "ui.py",
+            "line_number": 1,
+            "description": None
+        }
+    ]})
+
+    result = render_memory_budgeted('key_snippets', 150, query="connect_pool")
+    assert result.included == [0]
+    assert result.omitted == [1]
+    assert "connect_pool" in result.text
+    assert "def render" not in result.text
+    assert "1 lower-priority key snippets omitted to fit the prompt budget: #1" in result.text
+
+def make_snippet(filepath, line_number, snippet, relevance=0.5, description=None):
+    return {
+        "snippet": snippet,
+        "source": f"{filepath}:{line_number}",
+        "relevance": relevance,
+        "filepath": filepath,
+        "line_number": line_number,
+        "description": description
+    }
+
+def test_emit_key_snippets_skips_duplicates(reset_memory):
+    """Test an identical or contained snippet is not stored again"""
+    emit_key_snippets.invoke({"snippets": [make_snippet("a.py", 10, "line10\nline11\nline12")]})
+    emit_key_snippets.invoke({"snippets": [
+        make_snippet("a.py", 10, "line10\nline11\nline12"),
+        make_snippet("./a.py", 11, "line11"),
+    ]})
+
+    assert list(_global_memory['key_snippets']) == [0]
+    assert _global_memory['key_snippet_id_counter'] == 1
+
+def test_emit_key_snippets_merges_overlapping_and_adjacent(reset_memory):
+    """Test overlapping and adjacent snippets of one file merge into the oldest"""
+    emit_key_snippets.invoke({"snippets": [
+        make_snippet("a.py", 1, "l1\nl2", relevance=0.3, description="Start"),
+        make_snippet("a.py", 10, "l10\nl11", relevance=0.9),
+        make_snippet("b.py", 2, "other"),
+    ]})
+    # Overlaps snippet #0 and is adjacent to nothing else
+    emit_key_snippets.invoke({"snippets": [make_snippet("a.py", 2, "l2\nl3", description="More")]})
+
+    merged = _global_memory['key_snippets'][0]
+    assert merged['line_number'] == 1
+    assert merged['snippet'] == "l1\nl2\nl3"
+    assert merged['description'] == "Start\nMore"
+    assert 1 in _global_memory['key_snippets']
+
+    # Bridges #0 (ends at 3) and #1 (starts at 10), so both collapse into #0
+    emit_key_snippets.invoke({"snippets": [make_snippet("a.py", 4, "\n".join(f"l{n}" for n in range(4, 10)))]})
+    assert sorted(_global_memory['key_snippets']) == [0, 2]
+    merged = _global_memory['key_snippets'][0]
+    assert merged['snippet'] == "\n".join(f"l{n}" for n in range(1, 12))
+    assert merged['relevance'] == 0.9
+    assert _global_memory['key_snippet_aliases'] == {1: 0}
+    assert get_memory_value('key_snippets').count("Code Snippet #0") == 1
+
+def test_delete_key_snippets_resolves_aliases(reset_memory):
+    """Test deleting a merged-away snippet ID deletes the snippet holding it"""
+    emit_key_snippets.invoke({"snippets": [
+        make_snippet("a.py", 1, "l1"),
+        make_snippet("a.py", 5, "l5"),
+    ]})
+    emit_key_snippets.invoke({"snippets": [make_snippet("a.py", 2, "l2\nl3\nl4")]})
+    assert _global_memory['key_snippet_aliases'] == {1: 0}
+
+    delete_key_snippets.invoke({"snippet_ids": [1]})
+    assert _global_memory['key_snippets'] == {}
+
+def test_key_snippets_revalidated_on_render(reset_memory, tmp_path):
+    """Test rendering snippets picks up moved code and flags lost code"""
+    path = tmp_path / "a.py"
+    path.write_text("def f():\n    return 1\n")
+    emit_key_snippets.invoke({"snippets": [make_snippet(str(path), 1, "def f():\n    return 1")]})
+    assert 0 in _global_memory['key_snippet_stamps']
+    assert "**Stale**" not in get_memory_value('key_snippets')
+
+    path.write_text("import os\n\ndef f():\n    return 1\n")
+    assert "- Line: `3`" in get_memory_value('key_snippets')
+    assert _global_memory['key_snippets'][0]['line_number'] == 3
+
+    path.write_text("def g():\n    pass\n\n\n\n")
+    assert "**Stale**" in get_memory_value('key_snippets')
+
+    delete_key_snippets.invoke({"snippet_ids": [0]})
+    assert _global_memory['key_snippet_stamps'] == {}
+
+def test_revalidated_snippets_merge_when_they_overlap(reset_memory, tmp_path):
+    """Test snippets moved into each other by an edit are merged, and later snippets merge into them"""
+    path = tmp_path / "f.py"
+    lines = [f"line{n}" for n in range(1, 41)]
+    path.write_text("\n".join(lines) + "\n")
+    emit_key_snippets.invoke({"snippets": [
+        make_snippet(str(path), 1, "\n".join(lines[0:20])),
+        make_snippet(str(path), 30, "\n".join(lines[29:31])),
+    ]})
+
+    # Delete lines 2-25 and edit line 2, so #1 moves inside the refreshed #0
+    edited = lines[:1] + lines[25:]
+    edited[1] = "edited"
+    path.write_text("\n".join(edited) + "\n")
+    get_memory_value('key_snippets')
+    assert sorted(_global_memory['key_snippets']) == [0]
+    assert _global_memory['key_snippet_aliases'] == {1: 0}
+    merged = _global_memory['key_snippets'][0]
+    assert merged['line_number'] == 1
+    assert "line30\nline31" in merged['snippet']
+
+    emit_key_snippets.invoke({"snippets": [make_snippet(str(path), 3, "line28\nline29")]})
+    assert sorted(_global_memory['key_snippets']) == [0]
+
+def test_work_log_compacts_to_digest(reset_memory, tmp_path):
+    """Test the work log stays bounded and the full log is read back from disk"""
+    set_work_log_archive(str(tmp_path / "work_log.jsonl"))
+    set_work_log_limits(WorkLogLimits(max_entries=4, max_bytes=10_000, keep_recent=2))
+    try:
+        for task_id in range(1, 6):
+            log_work_event(f"Task #{task_id} added:\n\nStep {task_id}")
+        log_work_event("Implementation requested.")
+
+        # The fifth entry crossed the cap and left the two newest verbatim
+        assert [entry['event'] for entry in _global_memory['work_log']] == [
+            "Task #4 added:\n\nStep 4", "Task #5 added:\n\nStep 5", "Implementation requested."
+        ]
+        assert _global_memory['work_log_digest']['kinds'] == {"Task added": 3}
+
+        rendered = get_memory_value('work_log')
+        assert rendered.startswith("## Earlier work (compacted)")
+        assert "- Task added: 3" in rendered
+        assert "Step 5" in rendered and "Step 1" not in rendered
+        assert get_work_log().startswith("## Earlier work (compacted)")
+
+        full_log = get_full_work_log()
+        assert len(full_log) == 6
+        assert full_log[0]['event'] == "Task #1 added:\n\nStep 1"
+
+        reset_work_log()
+        assert get_full_work_log() == []
+        assert get_memory_value('work_log') == ""
+    finally:
+        set_work_log_archive(None)
+        set_work_log_limits(WorkLogLimits())
@@ -5,6 +5,7 @@ import threading
 from queue import Queue, Empty
 from webui.socket_interface import SocketInterface
 from components.memory import initialize_memory, _global_memory
+from ra_aid.memory.session import MemorySession, memory_session
 from components.research import research_component
 from components.planning import planning_component
 from components.implementation import implementation_component
@@ -486,5 +487,12 @@ def main():
     process_message_queue()
     render_messages()
 
+def run():
+    """Run the app against the memory session of this browser session."""
+    if 'memory_session' not in st.session_state:
+        st.session_state.memory_session = MemorySession()
+    with memory_session(st.session_state.memory_session):
+        main()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run()